@@ -1,11 +1,19 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional
+from typing import List, Optional
+import os
 import uuid
 import datetime as dt
 
 from .schemas import SuggestedReply, ChatMessageResponse
+from .utils.session_lifecycle import SessionLifecycle
+
+
+# Per-session transcript bounds: the newest messages are kept, each cut to a
+# maximum length, so one session cannot grow without limit.
+MAX_SESSION_MESSAGES = int(os.getenv("CHAT_SESSION_MAX_MESSAGES", "200"))
+MAX_MESSAGE_CHARS = int(os.getenv("CHAT_MESSAGE_MAX_CHARS", "4000"))
 
 
 @dataclass
@@ -39,14 +47,20 @@ class ChatEngine:
   """
 
   def __init__(self) -> None:
-    self.sessions: Dict[str, SessionState] = {}
+    # Idle sessions expire; LRU / memory caps keep the map bounded.
+    self.sessions = SessionLifecycle(
+      "chat",
+      idle_ttl=float(os.getenv("CHAT_SESSION_IDLE_TTL", "1800")),
+      max_entries=int(os.getenv("CHAT_SESSION_MAX_ENTRIES", "50000")),
+      max_bytes=int(os.getenv("CHAT_SESSION_MAX_MB", "256")) * 1024 * 1024,
+    )
 
   # Session management ----------------------------------------------------- #
 
   def create_session(self) -> SessionState:
     session_id = str(uuid.uuid4())
     session = SessionState(id=session_id)
-    self.sessions[session_id] = session
+    self.sessions.put(session_id, session)
     return session
 
   def get_session(self, session_id: str) -> Optional[SessionState]:
@@ -55,11 +69,14 @@ class ChatEngine:
   # Chat flow -------------------------------------------------------------- #
 
   def handle_message(self, session_id: str, message_text: str) -> ChatMessageResponse:
+    # Unknown / expired ids restart the flow under the same id, so clients
+    # keep working after the idle TTL; the LRU / memory caps bound the map.
     session = self.sessions.get(session_id)
     if not session:
-      session = self.create_session()
+      session = SessionState(id=session_id)
+      self.sessions.put(session_id, session)
 
-    session.messages.append(Message(role="user", content=message_text))
+    self._add_message(session, "user", message_text)
     session.updated_at = dt.datetime.utcnow()
 
     # Normalise input for simple keyword rules
@@ -260,9 +277,14 @@ class ChatEngine:
   # Helpers ---------------------------------------------------------------- #
 
   def _add_bot_message(self, session: SessionState, content: str) -> None:
-    session.messages.append(Message(role="assistant", content=content))
+    self._add_message(session, "assistant", content)
     session.updated_at = dt.datetime.utcnow()
 
+  def _add_message(self, session: SessionState, role: str, content: str) -> None:
+    session.messages.append(Message(role=role, content=content[:MAX_MESSAGE_CHARS]))
+    if len(session.messages) > MAX_SESSION_MESSAGES:
+      del session.messages[:-MAX_SESSION_MESSAGES]
+
   def _compute_recommendation(self, session: SessionState) -> str:
     domain = session.domain or "other"
     urgency = session.urgency or "exploring"
@@ -0,0 +1,284 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+import datetime as dt
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+
+from .database import SessionLocal
+from .models import ChatMessage
+from .reasoning.metrics import LATENCY
+
+logger = logging.getLogger(__name__)
+
+_TICK = dt.timedelta(microseconds=1)
+
+
+def utcnow() -> dt.datetime:
+  return dt.datetime.now(dt.timezone.utc)
+
+
+class ChatMessageWriter:
+  """Write-behind queue for chat_messages rows.
+
+  Endpoints enqueue rows and return immediately; a background thread
+  bulk-inserts them in batches of `batch_size`, or every `flush_interval`
+  seconds, whichever comes first. stop() drains whatever is left.
+
+  `session_factory` is any SQLAlchemy sessionmaker (Postgres in prod,
+  SQLite works the same way for local runs).
+
+  If the database is unreachable (connection-level errors), the batch goes
+  back to the front of the queue and flushing pauses with exponential
+  backoff (`retry_base` .. `retry_max` seconds). Any other batch failure
+  is retried row by row so a single bad row cannot take unrelated
+  sessions' turns down with it; rows that still fail are logged and kept
+  in `dead_letters` (the newest `dead_letter_max`).
+
+  Nothing is dropped silently: rows over `max_queued` while the database
+  is down, dead letters pushed out of the list, and rows still queued when
+  stop() gives up are logged and counted in `rows_dropped`.
+  """
+
+  def __init__(
+    self,
+    session_factory: Callable,
+    batch_size: int = 100,
+    flush_interval: float = 0.5,
+    max_pending: int = 10000,
+    dead_letter_max: int = 1000,
+    max_queued: int = 100000,
+    retry_base: float = 0.5,
+    retry_max: float = 30.0,
+  ) -> None:
+    self._session_factory = session_factory
+    self.batch_size = batch_size
+    self.flush_interval = flush_interval
+    self.max_pending = max_pending
+    self.max_queued = max_queued
+    self.retry_base = retry_base
+    self.retry_max = retry_max
+
+    self._pending: Deque[Dict] = deque()
+    self._cond = threading.Condition()
+    self._flush_lock = threading.Lock()
+    self._thread: Optional[threading.Thread] = None
+    self._stopping = False
+    # database unreachable: no flush before _retry_at (time.monotonic())
+    self._retry_at = 0.0
+    self._retry_delay = 0.0
+
+    self.rows_written = 0
+    self.rows_failed = 0
+    self.rows_dropped = 0
+    self.dead_letters: Deque[Dict] = deque(maxlen=dead_letter_max)
+
+  # Producer side ---------------------------------------------------------- #
+
+  def enqueue(self, session_id: str, sender: str, message: str) -> None:
+    self.enqueue_many([(session_id, sender, message)])
+
+  def enqueue_many(self, messages: List[Tuple]) -> None:
+    """Queue rows together, in order.
+
+    Each row is (session_id, sender, message) or (session_id, sender,
+    message, created_at); rows without a stamp get the enqueue time (the
+    turn, not the flush). Within one call a session's rows get strictly
+    increasing stamps in the order given, so a reply never sorts before
+    the message it answers.
+    """
+    now = utcnow()
+    last: Dict[str, dt.datetime] = {}
+    rows = []
+    for session_id, sender, message, *stamp in messages:
+      created_at = stamp[0] if stamp else now
+      previous = last.get(session_id)
+      if previous is not None and created_at <= previous:
+        created_at = previous + _TICK
+      last[session_id] = created_at
+      rows.append({"session_id": session_id, "sender": sender, "message": message, "created_at": created_at})
+    self._ensure_started()
+    with self._cond:
+      self._pending.extend(rows)
+      self._trim_locked()
+      backlog = len(self._pending)
+      if backlog >= self.batch_size:
+        self._cond.notify()
+
+    # Backpressure: if the flusher can't keep up, the caller helps out.
+    if backlog >= self.max_pending:
+      self.flush()
+
+  def pending(self) -> int:
+    with self._cond:
+      return len(self._pending)
+
+  # Flushing --------------------------------------------------------------- #
+
+  def _take_batch(self) -> List[Dict]:
+    with self._cond:
+      n = min(self.batch_size, len(self._pending))
+      return [self._pending.popleft() for _ in range(n)]
+
+  def _requeue(self, rows: List[Dict]) -> None:
+    # back to the front, original order kept
+    with self._cond:
+      self._pending.extendleft(reversed(rows))
+      self._trim_locked()
+
+  def _trim_locked(self) -> None:
+    excess = len(self._pending) - self.max_queued
+    if excess <= 0:
+      return
+    for _ in range(excess):
+      self._pending.popleft()
+    self.rows_dropped += excess
+    logger.error("chat_messages queue over %d rows; dropped the %d oldest", self.max_queued, excess)
+
+  def flush(self, force: bool = False) -> int:
+    """Write everything pending now. Returns the number of rows written.
+
+    While backing off from an unreachable database this writes nothing,
+    unless `force` (one more attempt, e.g. at shutdown).
+    """
+    written = 0
+    with self._flush_lock:
+      if force:
+        self._retry_at = 0.0
+      while time.monotonic() >= self._retry_at:
+        batch = self._take_batch()
+        if not batch:
+          break
+        written += self._write(batch)
+    return written
+
+  def _unreachable(self, exc: Exception) -> bool:
+    return isinstance(exc, (OperationalError, InterfaceError)) or (
+      isinstance(exc, DBAPIError) and exc.connection_invalidated
+    )
+
+  def _backoff(self, rows: List[Dict]) -> None:
+    self._requeue(rows)
+    self._retry_delay = min(self.retry_max, max(self.retry_base, self._retry_delay * 2))
+    self._retry_at = time.monotonic() + self._retry_delay
+    logger.warning(
+      "chat_messages: database unreachable, %d rows queued; retrying in %.1fs",
+      self.pending(), self._retry_delay, exc_info=True,
+    )
+
+  def _write(self, rows: List[Dict]) -> int:
+    t0 = time.perf_counter()
+    db = None
+    try:
+      try:
+        db = self._session_factory()
+        db.execute(insert(ChatMessage), rows)
+        db.commit()
+      except Exception as exc:
+        if db is not None:
+          db.rollback()
+        if db is None or self._unreachable(exc):
+          self._backoff(rows)
+          return 0
+        if len(rows) == 1:
+          self._dead_letter(rows[0])
+          return 0
+        logger.warning("chat_messages batch of %d rows failed; retrying row by row", len(rows), exc_info=True)
+        return self._write_rows(db, rows)
+      self._retry_delay = 0.0
+      self.rows_written += len(rows)
+      return len(rows)
+    finally:
+      if db is not None:
+        db.close()
+      if LATENCY.enabled:
+        LATENCY.observe("db_flush", time.perf_counter() - t0)
+
+  def _write_rows(self, db, rows: List[Dict]) -> int:
+    written = 0
+    for i, row in enumerate(rows):
+      try:
+        db.execute(insert(ChatMessage), [row])
+        db.commit()
+        written += 1
+      except Exception as exc:
+        db.rollback()
+        if self._unreachable(exc):
+          self._backoff(rows[i:])
+          break
+        self._dead_letter(row)
+    self.rows_written += written
+    return written
+
+  def _dead_letter(self, row: Dict) -> None:
+    self.rows_failed += 1
+    if len(self.dead_letters) == self.dead_letters.maxlen:
+      self.rows_dropped += 1
+      evicted = self.dead_letters[0]
+      logger.error(
+        "chat_messages dead letter discarded (session_id=%.100r, sender=%r)",
+        evicted.get("session_id"), evicted.get("sender"),
+      )
+    self.dead_letters.append(row)
+    logger.error(
+      "chat_messages row failed (session_id=%.100r, sender=%r)",
+      row.get("session_id"), row.get("sender"), exc_info=True,
+    )
+
+  # Background thread ------------------------------------------------------ #
+
+  def _ensure_started(self) -> None:
+    if self._thread is not None:
+      return
+    with self._cond:
+      if self._thread is None:
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="chat-writer", daemon=True)
+        self._thread.start()
+
+  def start(self) -> None:
+    self._ensure_started()
+
+  def _run(self) -> None:
+    while True:
+      with self._cond:
+        if not self._stopping:
+          backoff = self._retry_at - time.monotonic()
+          if backoff > 0:
+            self._cond.wait(backoff)
+          elif len(self._pending) < self.batch_size:
+            self._cond.wait(self.flush_interval)
+        stopping = self._stopping
+      self.flush()
+      if stopping:
+        return
+
+  def stop(self, timeout: Optional[float] = 5.0) -> None:
+    """Stop the flusher and write everything still queued (one last try)."""
+    thread = self._thread
+    if thread is not None:
+      with self._cond:
+        self._stopping = True
+        self._cond.notify()
+      thread.join(timeout)
+      self._thread = None
+    self.flush(force=True)
+    left = self.pending()
+    if left:
+      with self._cond:
+        self._pending.clear()
+      self.rows_dropped += left
+      logger.error("chat_messages: %d queued rows not written at shutdown", left)
+
+
+chat_writer = ChatMessageWriter(
+  SessionLocal,
+  batch_size=int(os.getenv("CHAT_WRITE_BATCH_SIZE", "100")),
+  flush_interval=int(os.getenv("CHAT_WRITE_FLUSH_MS", "500")) / 1000.0,
+)
@@ -1,10 +1,17 @@
 from __future__ import annotations
 
 from typing import Optional, List, Dict, Any
-from fastapi import FastAPI, HTTPException, Depends, Header,BackgroundTasks
+from fastapi import FastAPI, HTTPException, Depends, Header,BackgroundTasks, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel,EmailStr
 import json
+import logging
+import asyncio
+import uuid
+import time
 from datetime import datetime, timedelta
 import os
 import httpx
@@ -31,7 +38,7 @@ from .schemas import (
   )
 
 # import the models
-from .models import ChatMessage, Meeting, DiscoverySprint
+from .models import Meeting, DiscoverySprint
 
 
 from .audit_engine import run_audit
@@ -39,6 +46,8 @@ from .build_estimator_engine import run_estimator
 from .chat_engine import chat_engine
 from .content_store import STORE
 from .database import get_db
+from .chat_persistence import chat_writer, utcnow
+from .utils.session_lifecycle import start_sweeper, stop_sweeper, lifecycle_stats
 
 
 # NEW: Architecture Blueprint Tool
@@ -47,16 +56,28 @@ from .labs.ai_readiness_engine import run_ai_readiness
 
 
 # NEW: ARE-3.5 reasoning engine imports
+from .reasoning.classifier import current_registry, publish_registry, start_registry_watcher, stop_registry_watcher
+from .reasoning.counters import TURN_COUNTERS, load_dumps, merge_snapshots, start_dumper, stop_dumper, worker_id
 from .reasoning.engine import ReasoningEngine
+from .reasoning.incremental import TypingState, TypingTracker
+from .reasoning.offload import ProcessOffload
 from .reasoning.memory import SessionMemory
+from .reasoning.metrics import LATENCY, EVENTS
+from .reasoning.prepare import clip_input
+from .reasoning.registry import load_registry_file, validate_registry
+from .reasoning.session_store import SessionStore, make_session_store
+from .reasoning.templates import SystemResponse, Turn
 
 from .auth import router as AuthRouter
+from .auth_interceptor import get_current_user_role, role_checker
 from .chat_message import router as chat_message_router
 from .jobs_admin import router as jobs_admin_router
 from .chatbot import router as chatbot_router
 from .book_a_discovery_sprint import router as book_a_discovery_sprint_router
 
 
+logger = logging.getLogger(__name__)
+
 app = FastAPI(title="Ameotech Website Backend", version="0.2.0")
 
 # CORS: allow local dev by default
@@ -82,18 +103,133 @@ app.include_router(book_a_discovery_sprint_router)
 
 
 # ----------------------
-# In-memory store for reasoning sessions (ARE-3.5)
+# Session store for reasoning sessions (ARE-3.5)
 # ----------------------
+# REASON_SESSION_STORE=memory | sqlite:///path.db | redis://host:6379/0
+# Use a shared backend when running more than one worker.
+
+REASON_SESSIONS: SessionStore = make_session_store()
+# Registry swaps are published to a shared store; every worker polls it
+# every REASON_REGISTRY_POLL_SECS seconds. WEB_CONCURRENCY is the worker count.
+REASON_REGISTRY_POLL_SECS = float(os.getenv("REASON_REGISTRY_POLL_SECS", "5"))
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+# REASON_TURN_BUDGET_MS=N: past N ms a turn skips fuzzy matching, scoring, debug meta.
+# It lowers p99 where turns run one at a time (REASON_PROCESS_WORKERS; e.g.
+# 0.5 ms, see `bench budget`); with many threads, GIL waits dominate the tail.
+REASON_TURN_BUDGET_MS = float(os.getenv("REASON_TURN_BUDGET_MS", "0")) or None
+reason_engine = ReasoningEngine(budget_ms=REASON_TURN_BUDGET_MS)
+reason_typing = TypingTracker(max_bytes=int(os.getenv("REASON_TYPING_MAX_MB", "64")) * 1024 * 1024)
+# REASON_PROCESS_WORKERS=N runs text turns on N worker processes (started at startup)
+REASON_PROCESS_WORKERS = int(os.getenv("REASON_PROCESS_WORKERS", "0"))
+reason_offload: Optional[ProcessOffload] = None
+# REASON_COUNTERS_DIR=/shared/dir: workers dump turn counters there so
+# /admin/reason/counters can merge them
+REASON_COUNTERS_DIR = os.getenv("REASON_COUNTERS_DIR")
+# REASON_DEBUG=1 honours "debug" from any client (dev only); otherwise it
+# needs an admin JWT, since debug meta exposes scores, timings and state
+REASON_DEBUG = os.getenv("REASON_DEBUG") == "1"
+# REASON_BATCH_WORKERS=N overlaps the session store I/O of N batch sessions;
+# engine turns hold the GIL, so more threads add no CPU parallelism
+REASON_BATCH_WORKERS = int(os.getenv("REASON_BATCH_WORKERS", "1"))
+REASON_BATCH_MAX_TURNS = int(os.getenv("REASON_BATCH_MAX_TURNS", "500"))
+
+# chat_messages.session_id is String(100)
+MAX_SESSION_ID_CHARS = 100
+
+
+def require_session_id(value) -> str:
+  session_id = str(value or "")
+  if not session_id:
+    raise HTTPException(status_code=400, detail="session_id is required")
+  if len(session_id) > MAX_SESSION_ID_CHARS:
+    raise HTTPException(status_code=400, detail=f"session_id is longer than {MAX_SESSION_ID_CHARS} characters")
+  return session_id
+
+
+def require_option_id(value) -> Optional[str]:
+  # a quick-reply id is a string; anything else would reach the engine's dict lookups
+  if value is not None and not isinstance(value, str):
+    raise HTTPException(status_code=400, detail="option_id must be a string")
+  return value
+
+
+def allow_debug(requested, authorization: Optional[str]) -> bool:
+  if not requested:
+    return False
+  if REASON_DEBUG:
+    return True
+  if not authorization:
+    return False
+  try:
+    role_checker(["Admin"])(get_current_user_role(authorization))
+  except HTTPException:
+    return False
+  return True
 
-REASON_SESSIONS: Dict[str, SessionMemory] = {}
-reason_engine = ReasoningEngine()
 
 def get_reason_session(session_id: str) -> SessionMemory:
-  session = REASON_SESSIONS.get(session_id)
-  if not session:
-    session = SessionMemory(session_id=session_id)
-    REASON_SESSIONS[session_id] = session
-  return session
+  return REASON_SESSIONS.get_or_create(session_id)
+
+
+def run_reason_turn(
+  session: SessionMemory,
+  message: str,
+  page: str,
+  debug: bool = False,
+  option_id: Optional[str] = None,
+  typing: Optional[TypingState] = None,
+):
+  """One engine turn, in-process or on the process pool; returns (session, result)."""
+  if reason_offload is None:
+    result = reason_engine.process(
+      session=session,
+      user_raw_message=message,
+      page=page,
+      debug=debug,
+      option_id=option_id,
+      typing=typing,
+    )
+    return session, result
+  return reason_offload.process(session, message, page, debug=debug, option_id=option_id, typing=typing)
+
+
+def stored_reason_turn(session_id: str, message: str, page: str, **kwargs):
+  """
+  Load the session from REASON_SESSIONS, run one turn and store it back;
+  returns (session, result). Blocking: async callers run it in the thread pool
+  as one call, so no store round-trip happens on the event loop.
+  """
+  session, result = run_reason_turn(get_reason_session(session_id), message, page, **kwargs)
+  REASON_SESSIONS.put(session)
+  return session, result
+
+
+@app.on_event("startup")
+def start_chat_writer():
+  global reason_offload
+  chat_writer.start()
+  if REASON_PROCESS_WORKERS > 0:
+    reason_offload = ProcessOffload(reason_engine, REASON_PROCESS_WORKERS)
+  if REASON_COUNTERS_DIR:
+    start_dumper(TURN_COUNTERS, REASON_COUNTERS_DIR)
+  if REASON_SESSIONS.shared:
+    start_registry_watcher(REASON_SESSIONS, REASON_REGISTRY_POLL_SECS)
+  # Expire idle chat / reasoning sessions in the background
+  start_sweeper(interval=float(os.getenv("SESSION_SWEEP_INTERVAL", "30")))
+
+
+@app.on_event("shutdown")
+def flush_chat_writer():
+  # Drain queued chat turns before the worker exits
+  chat_writer.stop()
+  stop_sweeper()
+  if reason_offload is not None:
+    reason_offload.shutdown()
+  if REASON_COUNTERS_DIR:
+    stop_dumper()
+    TURN_COUNTERS.dump(REASON_COUNTERS_DIR)
+  stop_registry_watcher()
+
 
 SALES_WEBHOOK_URL = os.getenv("SALES_WEBHOOK_URL")
 
@@ -137,10 +273,8 @@ def create_chat_session() -> ChatSessionCreateResponse:
 
 @app.post("/chat/message", response_model=ChatMessageResponse)
 def chat_message(payload: ChatMessageRequest) -> ChatMessageResponse:
-  try:
-    return chat_engine.handle_message(payload.session_id, payload.message)
-  except KeyError:
-    raise HTTPException(status_code=404, detail="Session not found")
+  # an expired / unknown session_id starts over at the intro stage
+  return chat_engine.handle_message(require_session_id(payload.session_id), payload.message)
 
 
 
@@ -232,7 +366,7 @@ def get_job(slug: str) -> ContentItem:
 # ----------------------
 
 @app.post("/reason/chat-route")
-def reason_chat_route(payload: dict, db: Session = Depends(get_db)):
+def reason_chat_route(payload: dict, authorization: Optional[str] = Header(default=None)):
   """
   Route a chat message through the new ARE-3.5 reasoning engine (no LLM).
   Expected payload from frontend:
@@ -241,53 +375,323 @@ def reason_chat_route(payload: dict, db: Session = Depends(get_db)):
       "message": str,
       "page": str,
       "context": {...},
-      "history": [...]
+      "option_id": str,   # optional: id of a clicked show_options option
+      "debug": bool       # optional: per-stage timings in meta (admin JWT or REASON_DEBUG=1)
     }
+  No "history" needed: the session keeps its recent turns server-side
+  (SessionMemory.recent_turns, in meta["history"] when debug); a history
+  array from older clients is ignored.
+  A known option_id skips text analysis (quick-reply fast path).
+  Messages over REASON_MAX_INPUT_CHARS are truncated; long ones are
+  analysed on a head / tail / keyword-dense window (see reasoning.prepare).
+  Both chat turns are persisted write-behind (see chat_persistence).
   """
-  session_id = payload.get("session_id")
-  if not session_id:
-    raise HTTPException(status_code=400, detail="session_id is required")
+  session_id = require_session_id(payload.get("session_id"))
 
-  message = payload.get("message") or ""
+  option_id = require_option_id(payload.get("option_id"))
+  # capped before persistence and analysis (REASON_MAX_INPUT_CHARS)
+  message = clip_input(str(payload.get("message") or option_id or ""))
   page = payload.get("page") or "/"
+  debug = allow_debug(payload.get("debug"), authorization)
 
+  chat_writer.enqueue(session_id, "user", message)
 
-  try:
-        user_record = ChatMessage(
-            session_id=session_id,
-            sender="user",
-            message=message
-        )
-        db.add(user_record)
-        db.commit()
-        db.refresh(user_record)
-  except Exception as e:
-        db.rollback()
-        print("DB error:", e)
-  
-  session = get_reason_session(session_id)
-
-  result = reason_engine.process(
-    session=session,
-    user_raw_message=message,
-    page=page,
+  session, result = stored_reason_turn(
+    session_id,
+    message,
+    page,
+    debug=debug,
+    option_id=option_id,
+    typing=reason_typing.take(session_id),
   )
 
   bot_reply = result.bot_reply or ""
 
+  chat_writer.enqueue(session_id, "assistant", bot_reply)
+
+  return _reason_response(result)
+
+
+REASON_WS_FLUSH_TURNS = int(os.getenv("REASON_WS_FLUSH_TURNS", "5"))
+REASON_WS_FLUSH_SECS = float(os.getenv("REASON_WS_FLUSH_SECS", "2.0"))
+
+
+def _ws_frame(raw: str) -> dict:
+  # JSON frames carry a type; anything else is plain user text
+  try:
+    frame = json.loads(raw)
+  except ValueError:
+    return {"type": "message", "message": raw}
+  return frame if isinstance(frame, dict) else {"type": "message", "message": raw}
+
+
+@app.websocket("/reason/ws")
+async def reason_ws(websocket: WebSocket):
+  """
+  Chat over one WebSocket: /reason/ws?session_id=...&page=...
+  The session is loaded from REASON_SESSIONS once, on connect, and kept on
+  the connection. With a shared store it is written back after every turn
+  (other workers may serve the same id); otherwise it is written with the
+  chat rows, on flush and on disconnect. Turns, store round-trips included,
+  and typing analysis run off the event loop (thread pool; engine turns on
+  the process pool when enabled).
+
+  Client frames (JSON, or plain text = a message):
+    {"type": "message", "message": str, "page": str, "debug": bool}  # debug: see chat-route
+    {"type": "option", "option_id": str}     # quick-reply click
+    {"type": "typing", "text": str}          # draft; analysis precomputed
+    {"type": "ping"}
+  Server frames:
+    {"type": "session", "session_id": str}  # once, after connect
+    {"type": "typing"}                      # a reply is being prepared
+    {"type": "reply", ...chat-route fields}
+    {"type": "pong"} / {"type": "error", "detail": str}
+
+  Chat rows are stamped when their turn completes and queued for
+  persistence every REASON_WS_FLUSH_TURNS turns, after
+  REASON_WS_FLUSH_SECS without traffic, and on disconnect.
+  """
+  session_id = websocket.query_params.get("session_id") or str(uuid.uuid4())
+  if len(session_id) > MAX_SESSION_ID_CHARS:
+    await websocket.close(code=1008)
+    return
+  await websocket.accept()
+
+  page = websocket.query_params.get("page") or "/"
+  authorization = websocket.headers.get("authorization")
+  typing = TypingState()
+  rows: list = []
+  session = await run_in_threadpool(get_reason_session, session_id)
+  store_each_turn = REASON_SESSIONS.shared
+
+  def flush():
+    if rows:
+      chat_writer.enqueue_many(rows)
+      rows.clear()
+      if not store_each_turn:
+        REASON_SESSIONS.put(session)
+
+  def turn(message: str, page: str, **kwargs):
+    turn_session, result = run_reason_turn(session, message, page, **kwargs)
+    if store_each_turn:
+      REASON_SESSIONS.put(turn_session)
+    return turn_session, result
+
+  await websocket.send_json({"type": "session", "session_id": session_id})
   try:
-        bot_record = ChatMessage(
-            session_id=session_id,
-            sender="assistant",
-            message=bot_reply
+    while True:
+      try:
+        raw = await asyncio.wait_for(
+          websocket.receive_text(),
+          timeout=REASON_WS_FLUSH_SECS if rows else None,
         )
-        db.add(bot_record)
-        db.commit()
-        db.refresh(bot_record)
-  except Exception as e:
-        db.rollback()
-        print("DB error:", e)
-  
+      except asyncio.TimeoutError:
+        flush()
+        continue
+
+      frame = _ws_frame(raw)
+      if frame.get("type") == "ping":
+        await websocket.send_json({"type": "pong"})
+        continue
+      if frame.get("type") == "typing":
+        # draft update: precompute analysis, no reply
+        await run_in_threadpool(typing.update, str(frame.get("text") or ""))
+        continue
+
+      option_id = frame.get("option_id")
+      if option_id is not None and not isinstance(option_id, str):
+        await websocket.send_json({"type": "error", "detail": "option_id must be a string"})
+        continue
+      message = clip_input(str(frame.get("message") or option_id or ""))
+      if not message:
+        await websocket.send_json({"type": "error", "detail": "message or option_id is required"})
+        continue
+      page = frame.get("page") or page
+
+      await websocket.send_json({"type": "typing"})
+      received = utcnow()
+      session, result = await run_in_threadpool(
+        turn,
+        message,
+        page,
+        debug=allow_debug(frame.get("debug"), authorization),
+        option_id=option_id,
+        typing=typing,
+      )
+      typing = TypingState()
+      rows.append((session_id, "user", message, received))
+      rows.append((session_id, "assistant", result.bot_reply or "", utcnow()))
+      await websocket.send_json({"type": "reply", **_reason_response(result)})
+
+      if len(rows) >= 2 * REASON_WS_FLUSH_TURNS:
+        flush()
+  except WebSocketDisconnect:
+    pass
+  finally:
+    flush()
+
+
+REASON_STREAM_CHUNK_CHARS = int(os.getenv("REASON_STREAM_CHUNK_CHARS", "40"))
+
+
+def _sse(event: str, data: dict) -> str:
+  return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _reply_chunks(text: str, size: int):
+  # word-aligned chunks of roughly `size` characters
+  chunk = ""
+  for word in text.split(" "):
+    candidate = f"{chunk} {word}" if chunk else word
+    if chunk and len(candidate) > size:
+      yield chunk + " "
+      chunk = word
+    else:
+      chunk = candidate
+  if chunk:
+    yield chunk
+
+
+@app.post("/reason/chat-route/stream")
+def reason_chat_route_stream(payload: dict, authorization: Optional[str] = Header(default=None)):
+  """
+  Server-sent events variant of /reason/chat-route (same payload).
+  Events, in order:
+    route  {"session_id", "intent", "intent_confidence", "action", "action_payload", "registry_version"}
+    delta  {"text": str}   # bot reply, word-aligned chunks
+    done   {"meta": {...}}
+  The route event is sent as soon as routing returns; the reply is
+  humanized after it. The session is stored and both chat turns are queued
+  for persistence once the stream ends (or the client goes away), so no
+  store or DB write sits before the first byte. Turns always run in this
+  process, also with REASON_PROCESS_WORKERS (a pool turn cannot stream).
+  """
+  session_id = require_session_id(payload.get("session_id"))
+
+  option_id = require_option_id(payload.get("option_id"))
+  message = clip_input(str(payload.get("message") or option_id or ""))
+  page = payload.get("page") or "/"
+  debug = allow_debug(payload.get("debug"), authorization)
+  typing = reason_typing.take(session_id)
+  received = utcnow()
+  # filled in by events(), persisted by finish()
+  turn: dict = {}
+
+  def events():
+    routed = reason_engine.route(
+      get_reason_session(session_id), message, page, debug=debug, option_id=option_id, typing=typing,
+    )
+    turn["routed"] = routed
+    yield _sse("route", {
+      "session_id": session_id,
+      "intent": routed.intent,
+      "intent_confidence": routed.confidence,
+      "action": routed.action.action,
+      "action_payload": routed.action.action_payload,
+      "registry_version": routed.registry_version,
+    })
+    result = reason_engine.complete(routed)
+    turn["result"], turn["replied"] = result, utcnow()
+    for chunk in _reply_chunks(result.bot_reply or "", REASON_STREAM_CHUNK_CHARS):
+      yield _sse("delta", {"text": chunk})
+    yield _sse("done", {"meta": result.meta})
+
+  def finish():
+    # after the response, also when the client disconnected mid-stream
+    routed = turn.get("routed")
+    if routed is None:
+      chat_writer.enqueue(session_id, "user", message)
+      return
+    result = turn.get("result") or reason_engine.complete(routed)
+    REASON_SESSIONS.put(routed.session)
+    chat_writer.enqueue_many([
+      (session_id, "user", message, received),
+      (session_id, "assistant", result.bot_reply or "", turn.get("replied") or utcnow()),
+    ])
+
+  return StreamingResponse(
+    events(),
+    media_type="text/event-stream",
+    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    background=BackgroundTask(finish),
+  )
+
+
+@app.post("/reason/typing")
+def reason_typing_event(payload: dict):
+  """
+  Draft of the message being typed: {"session_id": str, "text": str}.
+  Analysis is precomputed incrementally; when the same text is then sent
+  to /reason/chat-route (or /stream), only routing is left to do.
+  Works for a new session id too (its first message); typing state is
+  bounded by reason_typing's entry / byte caps and idle TTL, not by
+  REASON_SESSIONS.
+  """
+  session_id = require_session_id(payload.get("session_id"))
+  reason_typing.update(session_id, str(payload.get("text") or ""))
+  return {"ok": True}
+
+
+@app.post("/reason/chat-route/batch")
+def reason_chat_route_batch(payload: dict, authorization: Optional[str] = Header(default=None)):
+  """
+  Route many chat turns in one request.
+  Expected payload:
+    {
+      "turns": [
+        {"session_id": str, "message": str, "page": str, "option_id": str},
+        ...
+      ],
+      "debug": bool   # admin JWT or REASON_DEBUG=1, as for /reason/chat-route
+    }
+  Turns of the same session are processed in the order given; different
+  sessions are processed in parallel. All turns are queued for persistence
+  together, each row stamped when its turn completed. Results are returned
+  in input order.
+  """
+  raw_turns = payload.get("turns")
+  if not isinstance(raw_turns, list):
+    raise HTTPException(status_code=400, detail="turns must be a list")
+  if len(raw_turns) > REASON_BATCH_MAX_TURNS:
+    raise HTTPException(status_code=413, detail=f"At most {REASON_BATCH_MAX_TURNS} turns per batch")
+
+  turns: List[Turn] = []
+  for item in raw_turns:
+    if not isinstance(item, dict) or not item.get("session_id"):
+      raise HTTPException(status_code=400, detail="every turn needs a session_id")
+    option_id = require_option_id(item.get("option_id"))
+    turns.append(Turn(
+      session_id=require_session_id(item["session_id"]),
+      message=clip_input(str(item.get("message") or option_id or "")),
+      page=item.get("page") or "/",
+      option_id=option_id,
+    ))
+
+  completed: Dict[int, datetime] = {}
+
+  def stamp(index: int, result: SystemResponse):
+    completed[index] = utcnow()
+
+  results = reason_engine.process_many(
+    turns,
+    load_session=get_reason_session,
+    save_session=REASON_SESSIONS.put,
+    max_workers=REASON_BATCH_WORKERS,
+    debug=allow_debug(payload.get("debug"), authorization),
+    on_result=stamp,
+  )
+
+  # both rows carry the turn's completion time; enqueue_many puts the reply after
+  rows = []
+  for index, (turn, result) in enumerate(zip(turns, results)):
+    rows.append((turn.session_id, "user", turn.message, completed[index]))
+    rows.append((turn.session_id, "assistant", result.bot_reply or "", completed[index]))
+  chat_writer.enqueue_many(rows)
+
+  return {"results": [_reason_response(result) for result in results]}
+
+
+def _reason_response(result: SystemResponse) -> dict:
   # SystemResponse → plain dict
   return {
     "session_id": result.session_id,
@@ -297,6 +701,7 @@ def reason_chat_route(payload: dict, db: Session = Depends(get_db)):
     "action_payload": result.action_payload,
     "bot_reply": result.bot_reply,
     "meta": result.meta,
+    "registry_version": result.registry_version,
   }
 
 
@@ -608,6 +1013,100 @@ def admin_archive_content(item_id: str, role: str = Depends(get_role)) -> Conten
     raise HTTPException(status_code=404, detail="Content item not found")
   return updated
 
+@app.get("/admin/reason/latency")
+def admin_reason_latency(role: str = Depends(role_checker(["Admin"]))):
+  """
+  Per-stage latency histograms (p50/p95/p99) for the reasoning engine,
+  overall and per intent / state. Collected when REASON_TIMINGS=1.
+  Always-on event counters (e.g. input_truncated) are under "events".
+  """
+  return {**LATENCY.snapshot(), "events": EVENTS.snapshot()}
+
+@app.get("/admin/reason/counters")
+def admin_reason_counters(minutes: int = 60, role: str = Depends(role_checker(["Admin"]))):
+  """
+  Intent / state / action / frustration / escalation counts: totals since
+  each worker started plus per-minute rows for the last `minutes` minutes.
+  With REASON_COUNTERS_DIR set, merged with the other workers' latest dumps.
+  """
+  snapshots = [TURN_COUNTERS.snapshot(minutes)]
+  if REASON_COUNTERS_DIR:
+    snapshots += load_dumps(REASON_COUNTERS_DIR, exclude_worker=worker_id())
+  return merge_snapshots(snapshots, since=(time.time() // 60 - minutes + 1) * 60)
+
+@app.get("/admin/reason/transitions")
+def admin_reason_transitions(role: str = Depends(role_checker(["Admin"]))):
+  """
+  Observed state transitions since the worker started:
+  {from_state: {to_state: count}}, for tuning the transition table.
+  """
+  return reason_engine.sm.transition_matrix()
+
+@app.get("/admin/reason/registry")
+def admin_reason_registry(role: str = Depends(role_checker(["Admin"]))):
+  """
+  Version (content hash) and intents of the active intent registry.
+  """
+  compiled = current_registry()
+  return {"version": compiled["version"], "intents": compiled["intents"]}
+
+# Registry files the admin endpoint may load by name (unset: inline registries only)
+REASON_REGISTRY_DIR = os.getenv("REASON_REGISTRY_DIR")
+
+
+def _registry_file(name: str) -> str:
+  if not REASON_REGISTRY_DIR:
+    raise ValueError("REASON_REGISTRY_DIR is not set")
+  base = os.path.realpath(REASON_REGISTRY_DIR)
+  path = os.path.realpath(os.path.join(base, str(name)))
+  if os.path.commonpath([base, path]) != base or not os.path.isfile(path):
+    raise ValueError(f"{name!r} is not a registry file in REASON_REGISTRY_DIR")
+  return path
+
+
+@app.post("/admin/reason/registry")
+def admin_swap_reason_registry(payload: dict, role: str = Depends(role_checker(["Admin"]))):
+  """
+  Swap the intent registry without a restart.
+  Needs an admin JWT (Authorization: Bearer ...), not just the X-Role header.
+  Payload: {"registry": {...}}, or {"file": "name.yaml"} for a file inside
+  REASON_REGISTRY_DIR. In-flight turns finish on the registry they started with.
+  This worker switches at once; the swap is published to REASON_SESSIONS and
+  the other workers follow within REASON_REGISTRY_POLL_SECS. With an
+  in-process session store there is nothing to publish to, so the swap is
+  refused when more than one worker runs (WEB_CONCURRENCY).
+  """
+  if not REASON_SESSIONS.shared and WEB_CONCURRENCY > 1:
+    raise HTTPException(
+      status_code=409,
+      detail="Registry swaps need a shared REASON_SESSION_STORE when running more than one worker",
+    )
+  if payload.get("file"):
+    try:
+      registry = load_registry_file(_registry_file(payload["file"]))
+    except (OSError, ValueError) as exc:
+      logger.warning("registry file %r rejected: %s", payload["file"], exc)
+      raise HTTPException(status_code=400, detail="Invalid registry file")
+  else:
+    try:
+      registry = validate_registry(payload.get("registry"))
+    except ValueError as exc:
+      # describes the submitted body only
+      raise HTTPException(status_code=400, detail=f"Invalid registry: {exc}")
+  previous = current_registry()["version"]
+  try:
+    version = publish_registry(REASON_SESSIONS, registry)
+  except RuntimeError as exc:
+    raise HTTPException(status_code=409, detail=str(exc))
+  return {"version": version, "previous_version": previous}
+
+@app.get("/admin/sessions/stats")
+def admin_session_stats(role: str = Depends(role_checker(["Admin"]))):
+  """
+  Occupancy and eviction counters for the in-process session maps.
+  """
+  return lifecycle_stats()
+
 @app.post("/labs/ai-readiness/run")
 def run_ai_readiness_route(payload: dict):
     """
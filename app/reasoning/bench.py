@@ -0,0 +1,626 @@
+"""
+ARE-3.x micro-benchmarks.
+
+Run from the backend root:
+    python -m app.reasoning.bench fuzzy
+    python -m app.reasoning.bench memory
+    python -m app.reasoning.bench batch
+    python -m app.reasoning.bench http        (needs the full backend importable)
+    python -m app.reasoning.bench offload --workers 4
+    python -m app.reasoning.bench corpus --save baseline.json
+    python -m app.reasoning.bench budget --budget-ms 0.5 --clients 16
+    python -m app.reasoning.bench corpus --baseline baseline.json --threshold 0.25
+    python -m app.reasoning.bench model [--model intent_model.npy]   (needs numpy)
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from .classifier import _score_intents, current_registry
+from .corpus import synthetic_conversations
+from .engine import ReasoningEngine
+from .memory import SessionMemory
+from .metrics import EVENTS, StageTimer
+from .model import IntentModel, registry_samples, train_naive_bayes
+from .offload import ProcessOffload
+from .prepare import prepare_message
+from .session_store import InMemorySessionStore
+from .templates import Turn
+from .utils import fuzzy_ratio, normalize
+
+
+SHORT_INPUTS = [
+    "opning",
+    "any job opnings?",
+    "maintainance",
+    "I want to builld sofware",
+]
+
+# (message, keywords a reader would say it fuzzily contains)
+FUZZY_CASES = [
+    ("contcat", {"contact"}),
+    ("maintainance", {"maintenance"}),
+    ("intrenship", {"internship"}),
+    ("elastcity", {"elasticity"}),
+    ("refactr", {"refactor"}),
+    ("pricng", {"pricing"}),
+    ("any job opnings", {"opening"}),
+    ("our legasy app keeps crashing", {"legacy"}),
+    ("upgarde the stack", {"upgrade"}),
+    ("forcast for next quarter", {"forecast"}),
+    ("need a new pltform", {"new platform"}),
+    ("i want to builld sofware", {"i want to build", "build software"}),
+    ("the mainetnance contract is up", {"maintenance"}),
+    # near misses: real words one edit away from a short keyword
+    ("contract", set()),
+    ("we need a contract drafted", set()),
+    ("i am a carer for my mother", set()),
+]
+
+LONG_INPUTS = [
+    (
+        "We are a mid-size retailer with thousands of SKUs. Our current pricing is manual "
+        "and done in spreadsheets, promotions are planned by hand and we have no forecast "
+        "to speak of. We would like to understand whether a pricing engine could help us. "
+    ) * 6,
+    (
+        "Hello, this is a long pasted paragraph from our internal wiki describing the legacy "
+        "system, its bugs, the slow dashboard and the data pipeline that breaks every night. "
+    ) * 10,
+]
+
+
+def _time_per_call(fn: Callable[[Any], object], inputs: List[Any], repeat: int) -> float:
+    """Mean wall time per call, in microseconds."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in inputs:
+            fn(text)
+    elapsed = time.perf_counter() - start
+    return elapsed / (repeat * len(inputs)) * 1e6
+
+
+def bench_fuzzy(repeat: int = 50) -> Dict[str, Dict[str, float]]:
+    """
+    Compare the trigram FuzzyIndex against the previous path
+    (SequenceMatcher between the whole message and every keyword):
+    µs per message, and how many FUZZY_CASES each gets exactly right.
+    """
+    index = current_registry()["fuzzy_index"]
+    keywords = list(index.keywords)
+
+    def legacy(text: str):
+        clean = normalize(text)
+        return {kw for kw in keywords if fuzzy_ratio(clean, kw) > 0.8}
+
+    def indexed(text: str):
+        return index.search(normalize(text))
+
+    results = {}
+    for label, inputs in (("short", SHORT_INPUTS), ("long", LONG_INPUTS)):
+        results[label] = {
+            "legacy_us": _time_per_call(legacy, inputs, repeat),
+            "index_us": _time_per_call(indexed, inputs, repeat),
+        }
+
+    legacy_found = [legacy(text) for text, _ in FUZZY_CASES]
+    index_found = [indexed(text) for text, _ in FUZZY_CASES]
+    results["accuracy"] = {
+        "cases": len(FUZZY_CASES),
+        "legacy_correct": sum(found == expected for found, (_, expected) in zip(legacy_found, FUZZY_CASES)),
+        "index_correct": sum(found == expected for found, (_, expected) in zip(index_found, FUZZY_CASES)),
+        "agree": sum(a == b for a, b in zip(legacy_found, index_found)),
+    }
+    return results
+
+
+class _DictSessionMemory:
+    """SessionMemory as it was before __slots__ / enum coding (reference only)."""
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.state = "unknown"
+        self.last_intent = None
+        self.last_confidence = 0.0
+        self.goal = None
+        self.frustration_level = 0
+        self.rejection_count = 0
+        self.clarifier_loops = 0
+        self.tone = "neutral"
+        self.last_action = None
+        self.mode = None
+        self.new_project_stage = "intro"
+        self.created_at = time.time()
+        self.last_updated = time.time()
+
+
+def _live_session(cls, session_id: str):
+    # A typical mid-conversation session
+    session = cls(session_id)
+    session.state = "new_project"
+    session.last_intent = "new_project"
+    session.last_confidence = 0.85
+    session.goal = "new_project"
+    session.mode = "new_project"
+    session.last_action = "show_message"
+    session.new_project_stage = "idea"
+    session.frustration_level = 1
+    return session
+
+
+def _bytes_per_session(cls, n: int) -> float:
+    ids = [str(uuid.uuid4()) for _ in range(n)]
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    sessions = [_live_session(cls, sid) for sid in ids]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # the list holding them is not part of a session
+    per_session = (after - before - sessions.__sizeof__()) / n
+    del sessions
+    return per_session
+
+
+def bench_memory(n: int = 100000) -> Dict[str, Dict[str, float]]:
+    """
+    Resident bytes per live session (tracemalloc; the session_id string is
+    allocated up front and not counted) and wire size, for the dict-based
+    layout vs the current SessionMemory.
+    """
+    results = {}
+    for label, cls in (("dict", _DictSessionMemory), ("slots", SessionMemory)):
+        per_session = _bytes_per_session(cls, n)
+        results[label] = {
+            "bytes_per_session": per_session,
+            "sessions_per_gb": (1 << 30) / per_session,
+        }
+
+    sample = _live_session(SessionMemory, str(uuid.uuid4()))
+    legacy_wire = json.dumps(
+        [sample.session_id, sample.state, sample.last_intent, sample.last_confidence, sample.goal,
+         sample.frustration_level, sample.rejection_count, sample.clarifier_loops, sample.tone,
+         sample.last_action, sample.mode, sample.new_project_stage, sample.created_at,
+         sample.last_updated],
+        separators=(",", ":"),
+    )
+    results["dict"]["wire_bytes"] = len(legacy_wire.encode("utf-8"))
+    results["slots"]["wire_bytes"] = len(sample.to_bytes())
+    return results
+
+
+CONVERSATION = [
+    "hi",
+    "I want to build a new app for my clinic",
+    "it should handle bookings and reminders",
+    "how much would it cost?",
+    "what tech stack do you use?",
+    "can I talk to a human?",
+]
+
+
+def _batch_turns(sessions: int) -> List[Turn]:
+    # conversations interleaved turn by turn, as they would arrive
+    ids = [str(uuid.uuid4()) for _ in range(sessions)]
+    return [Turn(session_id=sid, message=text) for text in CONVERSATION for sid in ids]
+
+
+def _throughput(run: Callable[[List[Turn]], object], turns: List[Turn]) -> Dict[str, float]:
+    wall, cpu = time.perf_counter(), time.process_time()
+    run(turns)
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    return {"turns_per_s": len(turns) / wall, "turns_per_cpu_s": len(turns) / cpu}
+
+
+def bench_batch(sessions: int = 200, workers: int = 4) -> Dict[str, Dict[str, float]]:
+    """
+    Turn throughput for one process() call per turn (the single-turn
+    endpoint path: load, process, save) vs process_many over the same
+    turns, sequential and on a thread pool. turns_per_cpu_s is the
+    per-core figure.
+    """
+    engine = ReasoningEngine()
+
+    def single(turns: List[Turn]):
+        store = InMemorySessionStore()
+        for turn in turns:
+            session = store.get_or_create(turn.session_id)
+            engine.process(session, turn.message, turn.page)
+            store.put(session)
+
+    def batched(max_workers: int):
+        def run(turns: List[Turn]):
+            store = InMemorySessionStore()
+            engine.process_many(turns, store.get_or_create, store.put, max_workers=max_workers)
+        return run
+
+    results = {}
+    for label, run in (("single", single), ("batch", batched(1)), (f"batch_x{workers}", batched(workers))):
+        run(_batch_turns(10))  # warm-up
+        results[label] = _throughput(run, _batch_turns(sessions))
+    return results
+
+
+def bench_offload(
+    sessions: int = 200, workers: int = 4, clients: Sequence[int] = (1, 4, 16),
+) -> Dict[str, Dict[str, float]]:
+    """
+    Turn throughput with N concurrent clients (threads, one request at a
+    time each, as behind a threaded server) running turns in-process vs
+    on a ProcessOffload pool of `workers` processes. Only meaningful on a
+    machine with at least `workers` cores.
+    """
+    engine = ReasoningEngine()
+    offload = ProcessOffload(engine, workers)
+
+    def inline(session, turn):
+        engine.process(session, turn.message, turn.page)
+        return session
+
+    def pooled(session, turn):
+        session, _ = offload.process(session, turn.message, turn.page)
+        return session
+
+    def concurrent(turn_fn, n_clients: int):
+        def run(turns: List[Turn]):
+            store = InMemorySessionStore()
+            by_session: Dict[str, List[Turn]] = {}
+            for turn in turns:
+                by_session.setdefault(turn.session_id, []).append(turn)
+
+            def client(session_turns: List[Turn]):
+                for turn in session_turns:
+                    store.put(turn_fn(store.get_or_create(turn.session_id), turn))
+
+            with ThreadPoolExecutor(max_workers=n_clients) as pool:
+                list(pool.map(client, by_session.values()))
+        return run
+
+    results = {}
+    try:
+        for n in clients:
+            for label, turn_fn in (("inline", inline), (f"procs_x{workers}", pooled)):
+                run = concurrent(turn_fn, n)
+                run(_batch_turns(10))  # warm-up
+                results[f"{label}/c{n}"] = _throughput(run, _batch_turns(sessions))
+    finally:
+        offload.shutdown()
+    return results
+
+
+def bench_http(sessions: int = 200, batch_turns: int = 100) -> Dict[str, Dict[str, float]]:
+    """
+    The same turns through the HTTP endpoints (FastAPI TestClient, in
+    process): one POST /reason/chat-route per turn vs POST
+    /reason/chat-route/batch with `batch_turns` turns per request. Chat
+    rows go through a ChatMessageWriter on in-memory SQLite and are
+    flushed inside the timed run, so persistence is part of the cost.
+    turns_per_cpu_s is the per-core figure.
+    """
+    from fastapi.testclient import TestClient
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+
+    from .. import main
+    from ..chat_persistence import ChatMessageWriter
+    from ..models import ChatMessage
+
+    db = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    ChatMessage.__table__.create(db)
+    writer = ChatMessageWriter(sessionmaker(bind=db, autoflush=False, autocommit=False))
+    production_writer, main.chat_writer = main.chat_writer, writer
+    client = TestClient(main.app)
+
+    def single(turns: List[Turn]):
+        for turn in turns:
+            client.post(
+                "/reason/chat-route",
+                json={"session_id": turn.session_id, "message": turn.message, "page": turn.page},
+            ).raise_for_status()
+        writer.flush()
+
+    def batched(turns: List[Turn]):
+        for start in range(0, len(turns), batch_turns):
+            body = {"turns": [
+                {"session_id": turn.session_id, "message": turn.message, "page": turn.page}
+                for turn in turns[start:start + batch_turns]
+            ]}
+            client.post("/reason/chat-route/batch", json=body).raise_for_status()
+        writer.flush()
+
+    results = {}
+    try:
+        for label, run in (("http_single", single), (f"http_batch_{batch_turns}", batched)):
+            run(_batch_turns(10))  # warm-up
+            results[label] = _throughput(run, _batch_turns(sessions))
+    finally:
+        writer.stop()
+        main.chat_writer = production_writer
+        db.dispose()
+    return results
+
+
+class _AllocStageTimer(StageTimer):
+    """StageTimer that also records peak bytes allocated within each stage (tracemalloc)."""
+
+    __slots__ = ("allocs", "_mark")
+
+    def __init__(self):
+        super().__init__()
+        self.allocs: Dict[str, int] = {}
+        tracemalloc.reset_peak()
+        self._mark = tracemalloc.get_traced_memory()[0]
+
+    def lap(self, stage: str):
+        super().lap(stage)
+        current, peak = tracemalloc.get_traced_memory()
+        self.allocs[stage] = self.allocs.get(stage, 0) + max(peak - self._mark, 0)
+        tracemalloc.reset_peak()
+        self._mark = current
+
+
+def _percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[int(q * (len(ordered) - 1))] if ordered else 0.0
+
+
+def _replay(engine: ReasoningEngine, corpus, debug: bool = False):
+    """Run every conversation on a fresh session; yields each SystemResponse."""
+    for conversation in corpus:
+        session = SessionMemory(session_id=conversation[0].session_id)
+        for turn in conversation:
+            yield engine.process(session, turn.message, turn.page, debug=debug, option_id=turn.option_id)
+
+
+def bench_corpus(conversations: int = 500, seed: int = 7) -> Dict[str, Any]:
+    """
+    Drive ReasoningEngine.process over the synthetic corpus.
+    Three passes: throughput (no timers), per-stage latency (debug timings),
+    per-stage allocations (tracemalloc; peak bytes within the stage).
+    """
+    corpus = synthetic_conversations(conversations, seed)
+    turns = sum(len(conversation) for conversation in corpus)
+    engine = ReasoningEngine()
+    for _ in _replay(engine, corpus[:20]):  # warm-up
+        pass
+
+    skipped_before = EVENTS.get("scoring_skipped")
+    start = time.perf_counter()
+    for _ in _replay(engine, corpus):
+        pass
+    turns_per_s = turns / (time.perf_counter() - start)
+    scoring_skipped = EVENTS.get("scoring_skipped") - skipped_before
+
+    samples: Dict[str, List[float]] = {}
+    for result in _replay(engine, corpus, debug=True):
+        for stage, ms in result.meta["timings_ms"].items():
+            samples.setdefault(stage, []).append(ms * 1e3)
+
+    timers: List[_AllocStageTimer] = []
+
+    def alloc_timer():
+        timer = _AllocStageTimer()
+        timers.append(timer)
+        return timer
+
+    alloc_engine = ReasoningEngine(timer_factory=alloc_timer)
+    tracemalloc.start()
+    try:
+        for _ in _replay(alloc_engine, corpus, debug=True):
+            pass
+    finally:
+        tracemalloc.stop()
+    alloc_bytes: Dict[str, int] = {}
+    alloc_turns: Dict[str, int] = {}
+    for timer in timers:
+        for stage, size in timer.allocs.items():
+            alloc_bytes[stage] = alloc_bytes.get(stage, 0) + size
+            alloc_turns[stage] = alloc_turns.get(stage, 0) + 1
+        alloc_bytes["total"] = alloc_bytes.get("total", 0) + sum(timer.allocs.values())
+        alloc_turns["total"] = alloc_turns.get("total", 0) + 1
+
+    stages = {}
+    for stage, values in samples.items():
+        stages[stage] = {
+            "p50_us": _percentile(values, 0.50),
+            "p99_us": _percentile(values, 0.99),
+            "alloc_kb": alloc_bytes.get(stage, 0) / max(alloc_turns.get(stage, 0), 1) / 1024,
+        }
+
+    return {
+        "corpus": {"conversations": conversations, "seed": seed, "turns": turns},
+        "python": platform.python_version(),
+        "turns_per_s": turns_per_s,
+        "scoring_skipped_pct": scoring_skipped / turns * 100,
+        "stages": stages,
+    }
+
+
+def bench_budget(
+    budget_ms: float = 0.5, clients: int = 16, conversations: int = 200, seed: int = 7,
+) -> Dict[str, Dict[str, float]]:
+    """
+    Per-turn wall latency without and with a per-turn budget, for one
+    client (one turn at a time, as in each REASON_PROCESS_WORKERS process)
+    and for `clients` threads replaying the corpus at once (saturated: every
+    client always has a turn in flight). degraded_pct is the share of turns
+    that skipped some optional work.
+
+    The budget is checked between stages, so it trims turns that are slow
+    because of their own work (long messages, many fuzzy windows). With
+    saturating threads the tail is time spent waiting for the GIL, which
+    no stage skip shortens: expect p99 to improve in the 1-client rows only.
+    """
+    corpus = synthetic_conversations(conversations, seed)
+    engine = ReasoningEngine()
+    for _ in _replay(engine, corpus[:20]):  # warm-up
+        pass
+
+    def run(budget: Optional[float], n_clients: int) -> Dict[str, float]:
+        latencies: List[float] = []
+
+        def client(conversation: List[Turn]):
+            session = SessionMemory(session_id=conversation[0].session_id)
+            for turn in conversation:
+                start = time.perf_counter()
+                engine.process(session, turn.message, turn.page, option_id=turn.option_id, budget_ms=budget)
+                latencies.append(time.perf_counter() - start)
+
+        degraded_before = EVENTS.get("degraded_turns")
+        with ThreadPoolExecutor(max_workers=n_clients) as pool:
+            list(pool.map(client, corpus))
+        degraded = EVENTS.get("degraded_turns") - degraded_before
+        return {
+            "p50_ms": _percentile(latencies, 0.50) * 1e3,
+            "p99_ms": _percentile(latencies, 0.99) * 1e3,
+            "max_ms": max(latencies) * 1e3,
+            "degraded_pct": degraded / len(latencies) * 100,
+        }
+
+    rows = {}
+    for n_clients in (1, clients):
+        rows[f"{n_clients}x unbounded"] = run(None, n_clients)
+        rows[f"{n_clients}x {budget_ms:g}ms"] = run(budget_ms, n_clients)
+    return rows
+
+
+def bench_model(model_path: Optional[str] = None, conversations: int = 500, seed: int = 7) -> Dict[str, Dict[str, float]]:
+    """
+    Keyword scorer (_score_intents) vs the naive Bayes model on the corpus:
+    µs per scoring call, and how often the top intents agree on turns the
+    keyword scorer is confident about (top score >= 0.5).
+    Without --model, a model is trained on registry phrases plus corpus
+    turns labelled by the current engine.
+    """
+    corpus = synthetic_conversations(conversations, seed)
+    engine = ReasoningEngine()
+    labelled = [
+        (turn.message, result.intent)
+        for conversation, results in ((c, list(_replay(engine, [c]))) for c in corpus)
+        for turn, result in zip(conversation, results)
+        if not turn.option_id
+    ]
+    if model_path:
+        model = IntentModel.load(model_path)
+    else:
+        model = train_naive_bayes(list(registry_samples()) + labelled)
+
+    prepared = [prepare_message(text) for text, _ in labelled]
+    session = SessionMemory(session_id="bench")
+    keyword_scores = [_score_intents(p, "/", session) for p in prepared]
+    confident = agree = 0
+    for scores, p in zip(keyword_scores, prepared):
+        top = max(scores, key=scores.get)
+        if scores[top] < 0.5:
+            continue
+        confident += 1
+        model_scores = model.score(p)
+        agree += max(model_scores, key=model_scores.get) == top
+
+    return {
+        "keyword": {"score_us": _time_per_call(lambda p: _score_intents(p, "/", session), prepared, 3)},
+        "model": {
+            "score_us": _time_per_call(model.score, prepared, 3),
+            "agree_pct": agree / max(confident, 1) * 100,
+        },
+    }
+
+
+# Absolute slack below which a relative change is treated as noise
+_NOISE_FLOOR = {"p50_us": 2.0, "p99_us": 5.0, "alloc_kb": 0.5}
+
+
+def check_regression(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float = 0.25) -> List[str]:
+    """Human-readable regressions of `current` vs `baseline` beyond `threshold` (relative)."""
+    problems = []
+    if current["turns_per_s"] < baseline["turns_per_s"] * (1 - threshold):
+        problems.append(
+            f"turns_per_s {current['turns_per_s']:,.0f} < baseline {baseline['turns_per_s']:,.0f}"
+        )
+    for stage, base in baseline["stages"].items():
+        cur = current["stages"].get(stage)
+        if cur is None:
+            continue
+        for metric, floor in _NOISE_FLOOR.items():
+            before, after = base.get(metric, 0.0), cur.get(metric, 0.0)
+            if after > before * (1 + threshold) and after - before > floor:
+                problems.append(f"{stage}.{metric} {after:,.1f} > baseline {before:,.1f}")
+    return problems
+
+
+def _print_table(title: str, rows: Dict[str, Dict[str, float]]):
+    print(title)
+    for label, cols in rows.items():
+        cells = "  ".join(f"{k}={v:,.1f}" for k, v in cols.items())
+        print(f"  {label:<14} {cells}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ARE-3.x micro-benchmarks")
+    parser.add_argument("suite", choices=["fuzzy", "memory", "batch", "http", "offload", "corpus", "budget", "model"])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--sessions", type=int, default=100000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--conversations", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--save", help="write corpus results to this JSON baseline")
+    parser.add_argument("--baseline", help="compare corpus results against this JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--budget-ms", type=float, default=0.5, help="per-turn budget for the budget suite")
+    parser.add_argument("--clients", type=int, default=16, help="concurrent clients for the budget suite")
+    parser.add_argument("--model", help="intent model weight file (.npy) for the model suite")
+    args = parser.parse_args()
+
+    if args.suite == "fuzzy":
+        _print_table("fuzzy keyword matching (µs per message; labelled cases)", bench_fuzzy(args.repeat))
+    elif args.suite == "memory":
+        _print_table("SessionMemory footprint", bench_memory(args.sessions))
+    elif args.suite == "batch":
+        sessions = min(args.sessions, 2000)
+        _print_table(f"turn throughput ({sessions} sessions)", bench_batch(sessions, args.workers))
+    elif args.suite == "http":
+        sessions = min(args.sessions, 2000)
+        _print_table(f"endpoint throughput, SQLite persistence ({sessions} sessions)", bench_http(sessions))
+    elif args.suite == "offload":
+        sessions = min(args.sessions, 2000)
+        _print_table(
+            f"concurrent clients, in-process vs {args.workers} worker processes ({sessions} sessions)",
+            bench_offload(sessions, args.workers),
+        )
+    elif args.suite == "budget":
+        _print_table(
+            f"per-turn latency, 1 client vs {args.clients} saturating clients, budget {args.budget_ms:g}ms",
+            bench_budget(args.budget_ms, args.clients, min(args.conversations, 200), args.seed),
+        )
+    elif args.suite == "model":
+        _print_table("intent scoring on the corpus", bench_model(args.model, args.conversations, args.seed))
+    elif args.suite == "corpus":
+        results = bench_corpus(args.conversations, args.seed)
+        print(
+            f"{results['corpus']['turns']} turns, {results['turns_per_s']:,.0f} turns/s, "
+            f"{results['scoring_skipped_pct']:.1f}% settled without intent scoring"
+        )
+        _print_table("per-stage latency (µs) and allocations (KB per turn)", results["stages"])
+        if args.save:
+            with open(args.save, "w") as fh:
+                json.dump(results, fh, indent=2)
+            print(f"baseline written to {args.save}")
+        if args.baseline:
+            with open(args.baseline) as fh:
+                problems = check_regression(results, json.load(fh), args.threshold)
+            for problem in problems:
+                print(f"REGRESSION {problem}")
+            if problems:
+                sys.exit(1)
+            print(f"no regressions beyond {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
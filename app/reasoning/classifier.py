@@ -4,46 +4,317 @@
 ARE-3.x Intent Classifier
 
 Deterministic scoring:
-- phrase / keyword scoring via INTENT_REGISTRY
-- domain override rules (project vs existing vs careers)
+- phrase / keyword scoring via the active registry (INTENT_REGISTRY, or
+  REASON_REGISTRY_PATH), hot-swappable with activate_registry()
+- domain override rules (project vs existing vs careers), checked first;
+  full scoring only runs when no override fires (or scores are requested)
+- a swap can be published to a shared store (publish_registry) so every
+  worker picks it up (sync_registry / start_registry_watcher)
+- optional learned scorer (REASON_INTENT_MODEL, see model.py) in place of
+  the keyword scoring; override rules stay the same, the low-score cutoff
+  is the model's own (probabilities, not keyword points). The model only
+  sees the message text: page boosts, session reinforcement and the
+  registry do not apply, so registry swaps are refused while it is loaded
 - topic_hint extraction for router:
     - project_like
     - existing_like
     - careers_like
 """
 
-from typing import Dict, Tuple
+import json
+import logging
+import os
+import pickle
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+from .registry import INTENT_REGISTRY, load_registry_file, registry_version, validate_registry
+from .matcher import PhraseMatcher
+from .fuzzy import FuzzyIndex
+from .prepare import PreparedMessage, prepare_message
+from .metrics import EVENTS, TurnBudget
+from .model import load_model_from_env
+
+logger = logging.getLogger(__name__)
+
+
+# -----------------------------
+# Compiled registry
+# -----------------------------
+# Built once at import: every keyword / synonym / page prefix becomes a
+# single automaton entry pointing at the (intent, points) it contributes.
+def _compile_registry(registry: Dict) -> Dict:
+    phrase_points: Dict[str, List[Tuple[str, float]]] = {}
+    page_points: Dict[str, List[Tuple[str, float]]] = {}
+    fuzzy_points: Dict[str, List[Tuple[str, float]]] = {}
+
+    for intent, cfg in registry.items():
+        for kw in cfg["keywords"]:
+            phrase_points.setdefault(kw, []).append((intent, 1.0))
+            # fuzzy partial only applies to longer keywords that missed
+            if len(kw) > 4:
+                fuzzy_points.setdefault(kw, []).append((intent, 0.6))
+        for syn in cfg["synonyms"]:
+            phrase_points.setdefault(syn, []).append((intent, 0.5))
+        for p in cfg["pages"]:
+            page_points.setdefault(p, []).append((intent, 0.4))
+
+    return {
+        "intents": list(registry.keys()),
+        "weights": {intent: cfg.get("weight", 1.0) for intent, cfg in registry.items()},
+        "phrase_points": phrase_points,
+        "page_points": page_points,
+        "fuzzy_points": fuzzy_points,
+        "phrase_matcher": PhraseMatcher(phrase_points.keys()),
+        "page_matcher": PhraseMatcher(page_points.keys()),
+        "fuzzy_index": FuzzyIndex(fuzzy_points.keys(), threshold=0.8),
+    }
+
+
+# -----------------------------
+# Active registry
+# -----------------------------
+# Compiled artifacts are cached on disk per registry content hash, so
+# every worker (and every restart) activating the same version loads
+# them instead of recompiling. Bump _ARTIFACT_FORMAT whenever the output
+# of _compile_registry changes shape.
+# Artifacts are pickles, so they are only loaded from a directory and file
+# owned by this user and writable by nobody else; the newest
+# REASON_REGISTRY_CACHE_KEEP artifacts are kept.
+REGISTRY_CACHE_DIR = os.getenv("REASON_REGISTRY_CACHE", os.path.expanduser("~/.cache/are-registry"))
+REGISTRY_CACHE_KEEP = int(os.getenv("REASON_REGISTRY_CACHE_KEEP", "16"))
+_ARTIFACT_FORMAT = 1
+
+
+def _cache_path(version: str, cache_dir: Optional[str]) -> Optional[str]:
+    return os.path.join(cache_dir, f"registry-{version}-f{_ARTIFACT_FORMAT}.pickle") if cache_dir else None
+
+
+def _private(path: str) -> bool:
+    """Owned by this user, not writable by group / others."""
+    st = os.stat(path)
+    return st.st_uid == os.getuid() and not st.st_mode & 0o022
+
+
+def _load_cached(version: str, path: Optional[str]) -> Optional[Dict]:
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        if not (_private(os.path.dirname(path)) and _private(path)):
+            logger.warning("ignoring registry cache %s: not private to this user", path)
+            return None
+        with open(path, "rb") as fh:
+            compiled = pickle.load(fh)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError):
+        return None  # unreadable / stale cache entry
+    return compiled if compiled.get("version") == version else None
+
+
+def compile_registry_cached(registry: Dict, cache_dir: Optional[str] = REGISTRY_CACHE_DIR) -> Dict:
+    version = registry_version(registry)
+    path = _cache_path(version, cache_dir)
+
+    compiled = _load_cached(version, path)
+    if compiled is not None:
+        return compiled
+
+    compiled = _compile_registry(registry)
+    compiled["version"] = version
+    if path:
+        try:
+            os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+            if _private(cache_dir):
+                tmp = f"{path}.{os.getpid()}.tmp"
+                with os.fdopen(os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "wb") as fh:
+                    pickle.dump(compiled, fh, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp, path)
+                _prune_cache(cache_dir)
+        except OSError:
+            pass  # caching is best-effort
+    return compiled
+
+
+def _prune_cache(cache_dir: str, keep: int = REGISTRY_CACHE_KEEP):
+    """Delete all but the `keep` most recently written artifacts."""
+    paths = [
+        os.path.join(cache_dir, name) for name in os.listdir(cache_dir)
+        if name.startswith("registry-") and name.endswith(".pickle")
+    ]
+    paths.sort(key=os.path.getmtime, reverse=True)
+    for stale in paths[keep:]:
+        os.remove(stale)
 
-from .registry import INTENT_REGISTRY
-from .utils import normalize, fuzzy_ratio
 
+_COMPILED = compile_registry_cached(
+    load_registry_file(os.environ["REASON_REGISTRY_PATH"])
+    if os.getenv("REASON_REGISTRY_PATH") else INTENT_REGISTRY
+)
+_SWAP_LOCK = threading.Lock()
 
-def _score_intents(message: str, page: str, session) -> Dict[str, float]:
-    clean = normalize(message)
-    page = page or "/"
-    scores: Dict[str, float] = {}
 
-    for intent, cfg in INTENT_REGISTRY.items():
-        score = 0.0
+def current_registry() -> Dict:
+    """The active compiled registry; hold on to it for the whole turn."""
+    return _COMPILED
 
-        # Keyword hits
-        for kw in cfg["keywords"]:
-            if kw in clean:
-                score += 1.0
-            else:
-                # fuzzy partial for longer words
-                if len(kw) > 4 and fuzzy_ratio(clean, kw) > 0.8:
-                    score += 0.6
-
-        # Synonym hits
-        for syn in cfg["synonyms"]:
-            if syn in clean:
-                score += 0.5
 
-        # Page boosts
-        for p in cfg["pages"]:
-            if page.startswith(p):
-                score += 0.4
+def activate_registry(registry: Dict) -> str:
+    """
+    Compile (or load from cache) and swap in a new registry; returns its version.
+    Compilation happens before the swap, and in-flight turns keep the
+    registry they started with, so nothing waits on the rebuild.
+    Raises RuntimeError while an intent model is loaded (it ignores the registry).
+    """
+    global _COMPILED
+    if _MODEL is not None:
+        raise RuntimeError("An intent model is active (REASON_INTENT_MODEL); the registry is not used for scoring")
+    compiled = compile_registry_cached(registry)
+    with _SWAP_LOCK:
+        _COMPILED = compiled
+    return compiled["version"]
+
+
+# (keyword / synonym hits, fuzzy keyword hits) of one message
+Hits = Tuple[Set[str], Set[str]]
+
+
+def _message_hits(prepared: PreparedMessage, compiled: Dict, fuzzy: bool = True) -> Hits:
+    hits = compiled["phrase_matcher"].find(prepared.clean)
+    if not fuzzy:
+        return hits, set()
+    return hits, compiled["fuzzy_index"].search(prepared.clean, prepared.tokens)
+
+
+def activate_version(version: str, cache_dir: Optional[str] = REGISTRY_CACHE_DIR) -> bool:
+    """
+    Activate a registry version some process already compiled into the
+    disk cache (e.g. after an admin swap in the serving process).
+    Returns False when that version is not cached.
+    """
+    global _COMPILED
+    compiled = _load_cached(version, _cache_path(version, cache_dir))
+    if compiled is None:
+        return False
+    with _SWAP_LOCK:
+        _COMPILED = compiled
+    return True
+
+
+# -----------------------------
+# Sharing a swap across workers
+# -----------------------------
+# An admin swap reaches one worker. publish_registry() also writes the
+# registry to a shared store (SessionStore.publish); every worker polls the
+# published version and activates it when it differs from its own. A
+# published registry stays active, across restarts too, until the next swap.
+_PUBLISHED_VERSION = "registry_version"
+
+
+def publish_registry(store, registry: Dict) -> str:
+    """activate_registry() in this worker, then publish it for the others."""
+    version = activate_registry(registry)
+    # the registry first, so a worker that sees the version can load it
+    store.publish(f"registry:{version}", json.dumps(registry).encode("utf-8"))
+    store.publish(_PUBLISHED_VERSION, version.encode("ascii"))
+    return version
+
+
+def sync_registry(store) -> Optional[str]:
+    """
+    Activate the registry published in `store` if it is not the active one.
+    Returns the version activated, or None when there was nothing to do.
+    """
+    published = store.published(_PUBLISHED_VERSION)
+    if published is None or _MODEL is not None:
+        return None
+    version = bytes(published).decode("ascii")
+    if version == _COMPILED["version"]:
+        return None
+    # compiled on this host already (disk cache), or compile it here
+    if not activate_version(version):
+        data = store.published(f"registry:{version}")
+        if data is None:
+            logger.warning("published registry %s is missing from the store", version)
+            return None
+        activate_registry(validate_registry(json.loads(data)))
+    logger.info("activated published registry %s", version)
+    return version
+
+
+_watcher: Optional[threading.Thread] = None
+_watcher_stop = threading.Event()
+
+
+def start_registry_watcher(store, interval: float = 5.0) -> None:
+    """sync_registry(store) now and then every `interval` seconds."""
+    global _watcher
+    if _watcher is not None and _watcher.is_alive():
+        return
+    _watcher_stop.clear()
+
+    def loop():
+        while True:
+            try:
+                sync_registry(store)
+            except Exception:
+                # an unreachable store must not stop the watcher
+                logger.exception("registry sync failed")
+            if _watcher_stop.wait(interval):
+                return
+
+    _watcher = threading.Thread(target=loop, name="registry-watcher", daemon=True)
+    _watcher.start()
+
+
+def stop_registry_watcher() -> None:
+    global _watcher
+    _watcher_stop.set()
+    if _watcher is not None:
+        _watcher.join(timeout=5.0)
+    _watcher = None
+
+
+def _score_intents(
+    prepared: PreparedMessage,
+    page: str,
+    session,
+    compiled: Optional[Dict] = None,
+    hits: Optional[Hits] = None,
+    budget: Optional[TurnBudget] = None,
+) -> Dict[str, float]:
+    """
+    hits: precomputed _message_hits() for this message and registry (typing state).
+    budget: fuzzy matching is skipped when the turn budget runs low.
+    """
+    page = page or "/"
+    compiled = compiled or _COMPILED
+    scores: Dict[str, float] = {intent: 0.0 for intent in compiled["intents"]}
+
+    # Keyword + synonym hits (one pass over the message)
+    # Fuzzy partial for longer keywords that missed (typos, per token window)
+    if hits is None:
+        hits = _message_hits(prepared, compiled, fuzzy=budget is None or budget.allow("fuzzy"))
+    hits, fuzzy_hits = hits
+    phrase_points = compiled["phrase_points"]
+    for phrase in hits:
+        for intent, points in phrase_points[phrase]:
+            scores[intent] += points
+
+    fuzzy_points = compiled["fuzzy_points"]
+    for kw in fuzzy_hits:
+        if kw in hits:
+            continue
+        for intent, points in fuzzy_points[kw]:
+            scores[intent] += points
+
+    # Page boosts
+    page_points = compiled["page_points"]
+    for prefix in compiled["page_matcher"].prefixes(page):
+        for intent, points in page_points[prefix]:
+            scores[intent] += points
+
+    weights = compiled["weights"]
+    for intent in scores:
+        score = scores[intent]
 
         # Context reinforcement (light)
         if session.last_intent == intent:
@@ -51,29 +322,63 @@ def _score_intents(message: str, page: str, session) -> Dict[str, float]:
         if session.goal == intent:
             score += 0.5
 
-        score *= cfg.get("weight", 1.0)
-        scores[intent] = score
+        scores[intent] = score * weights[intent]
 
     return scores
 
 
+# Optional learned scorer; None keeps the keyword scoring above
+_MODEL = load_model_from_env()
+
+
+def _scores(
+    prepared: PreparedMessage,
+    page: str,
+    session,
+    compiled: Optional[Dict] = None,
+    hits: Optional[Hits] = None,
+    budget: Optional[TurnBudget] = None,
+) -> Dict[str, float]:
+    if _MODEL is not None:
+        return _MODEL.score(prepared)
+    return _score_intents(prepared, page, session, compiled, hits, budget)
+
+
 def detect_intent(
     message: str,
     analysis: Dict,
     session,
     page: str,
+    with_scores: bool = False,
+    registry: Optional[Dict] = None,
+    hits: Optional[Hits] = None,
+    budget: Optional[TurnBudget] = None,
 ) -> Tuple[str, float, Dict[str, float]]:
     """
     Returns:
         final_intent: str
         final_confidence: float
-        meta: dict (currently all_scores; analysis is also mutated to include topic_hint)
+        meta: dict (all_scores; analysis is also mutated to include topic_hint)
+
+    Override rules run before scoring. When one fires, scores are only
+    computed if with_scores=True (debug); otherwise meta is {} and the
+    skip is counted in EVENTS["scoring_skipped"].
+    registry: compiled registry to score with (default: the active one).
+    hits: keyword / fuzzy hits precomputed from typing events for this registry.
+    budget: turn budget; once it is spent, step 6 scoring is skipped and the
+    turn falls back to the last intent (as for a low top score) or
+    "unknown", with analysis["unscored"] set: the state machine holds an
+    unscored "unknown" instead of counting it as a clarifier loop.
     """
 
-    clean = normalize(message)
-    scores = _score_intents(message, page, session)
-    top_intent = max(scores, key=lambda k: scores[k])
-    top_score = scores[top_intent]
+    prepared = analysis.get("prepared") or prepare_message(message)
+    clean = prepared.clean
+
+    def overridden(intent: str, confidence: float):
+        if with_scores and (budget is None or budget.allow("debug_meta")):
+            return intent, confidence, _scores(prepared, page, session, registry, hits, budget)
+        EVENTS.incr("scoring_skipped")
+        return intent, confidence, {}
 
     msg_type = analysis.get("message_type")
     is_rejection = analysis.get("is_rejection")
@@ -83,28 +388,16 @@ def detect_intent(
     # Topic hint detection
     # -----------------------------
     # These hints are softer than full intent but guide the router.
-    careers_hint_terms = [
-        "job", "jobs", "opening", "openning", "career", "careers",
-        "hiring", "vacancy", "internship", "intern", "position", "role",
-    ]
-    existing_hint_terms = [
-        "existing system", "existing app", "legacy",
-        "website", "web site", "site",
-        "bug", "bugs", "issue", "issues", "error", "errors",
-        "crash", "crashing", "down", "slow", "performance",
-        "maintenance", "maintain", "support",
-    ]
-    project_hint_terms = [
-        "project", "product", "app", "application", "platform",
-        "saas", "tool", "solution", "idea", "mvp", "prototype",
-    ]
+    # Marker groups are scanned once in prepare_message().
+    has_careers = prepared.has("careers_hint")
+    has_existing = prepared.has("existing_hint")
 
     topic_hint = None
-    if any(t in clean for t in careers_hint_terms):
+    if has_careers:
         topic_hint = "careers_like"
-    elif any(t in clean for t in existing_hint_terms):
+    elif has_existing:
         topic_hint = "existing_like"
-    elif any(t in clean for t in project_hint_terms):
+    elif prepared.has("project_hint"):
         topic_hint = "project_like"
 
     # Push topic_hint into analysis so router can see it
@@ -116,7 +409,7 @@ def detect_intent(
     # -----------------------------
     if is_meta and msg_type not in ("trust",):
         # user is asking about the bot itself, not domain
-        return "unknown", 0.3, scores
+        return overridden("unknown", 0.3)
 
     # -----------------------------
     # 2. Insult handling
@@ -125,7 +418,7 @@ def detect_intent(
     # Only if frustration is high, we escalate directly.
     if msg_type == "insult":
         if session.frustration_level >= 3:
-            return "contact_human", 0.9, scores
+            return overridden("contact_human", 0.9)
         # otherwise: continue with normal classification
 
     # -----------------------------
@@ -135,68 +428,55 @@ def detect_intent(
         # If user rejects a tool but we know the mode (project/existing),
         # keep them in that lane instead of resetting.
         if session.mode in ["new_project", "existing_system"]:
-            return session.mode, 0.6, scores
-        return "unknown", 0.3, scores
+            return overridden(session.mode, 0.6)
+        return overridden("unknown", 0.3)
 
     # -----------------------------
     # 4. Direct "talk to human"
     # -----------------------------
-    human_triggers = [
-        "talk to human",
-        "talk to someone",
-        "speak to someone",
-        "someone real",
-        "real person",
-        "call me",
-        "can you call",
-    ]
-    if any(k in clean for k in human_triggers):
-        return "contact_human", 0.9, scores
+    if prepared.has("human_trigger"):
+        return overridden("contact_human", 0.9)
 
     # -----------------------------
     # 5. Domain override rules
     # -----------------------------
     # Use stronger markers for hard routing; topic_hint is softer.
-    careers_markers = careers_hint_terms
-
-    project_markers = [
-        "new project", "start a project", "start project",
-        "build a project", "build product", "new product",
-        "new saas", "new app", "mvp", "prototype", "launch an app",
-    ]
-
-    existing_markers = [
-        "existing system", "existing app", "legacy",
-        "website", "web site", "site",
-        "bug", "bugs", "issue", "issues", "error", "errors",
-        "crash", "crashing", "down", "slow", "performance",
-        "maintenance", "maintain", "support",
-    ]
-
-    has_careers = any(m in clean for m in careers_markers)
-    has_project_strong = any(m in clean for m in project_markers)
-    has_existing = any(m in clean for m in existing_markers)
+    has_project_strong = prepared.has("project_strong")
 
     # Generic "project" as a strong hint if not clearly careers
-    generic_project = "project" in clean
+    generic_project = prepared.has("project_word")
     has_project = has_project_strong or (generic_project and not has_careers)
 
     # If message clearly looks like a system/website/app issue,
     # and does NOT look like careers → force existing_system.
     if has_existing and not has_careers:
-        return "existing_system", 0.9, scores
+        return overridden("existing_system", 0.9)
 
     # If message clearly looks like a new build request,
     # and does NOT look like careers → force new_project.
     if has_project and not has_careers:
-        return "new_project", 0.85, scores
+        return overridden("new_project", 0.85)
 
     # -----------------------------
     # 6. Normal scoring with thresholds
     # -----------------------------
+    if budget is not None and not budget.allow("scoring"):
+        analysis["unscored"] = True
+        if session.last_intent:
+            return session.last_intent, 0.4, {}
+        return "unknown", 0.0, {}
+
+    scores = _scores(prepared, page, session, registry, hits, budget)
+    top_intent = max(scores, key=lambda k: scores[k])
+    top_score = scores[top_intent]
 
     # If top score is very low, try to soft-fallback to last intent if any.
-    if top_score < 0.5:
+    # Model scores are probabilities: the model carries its own cutoff.
+    if _MODEL is not None:
+        too_low = not _MODEL.confident(scores)
+    else:
+        too_low = top_score < 0.5
+    if too_low:
         if session.last_intent:
             return session.last_intent, 0.4, scores
         return "unknown", top_score, scores
@@ -0,0 +1,137 @@
+"""
+ARE-3.x Synthetic Conversation Corpus
+Deterministic (seeded) multi-turn conversations for benchmarks.
+
+Each conversation follows one lane (project, existing system, careers,
+pricing / data, human hand-off, hostile) and mixes in the input shapes
+seen in production: quick-reply clicks, short messages, typos, long
+pasted paragraphs and insults.
+"""
+
+import random
+import uuid
+from typing import Dict, List
+
+from .templates import Turn
+
+
+LANES: Dict[str, List[str]] = {
+    "project": [
+        "hi",
+        "I want to build a new app for my clinic",
+        "it should handle bookings, reminders and payments",
+        "we have an mvp idea but no tech team",
+        "how much would it cost?",
+        "what tech stack do you use? react or nextjs?",
+        "ok what do you suggest?",
+    ],
+    "existing": [
+        "hello",
+        "our existing system keeps breaking",
+        "it's a legacy php app with a slow dashboard",
+        "can you fix bugs and refactor it?",
+        "how long would maintenance take?",
+    ],
+    "careers": [
+        "hey",
+        "any job openings?",
+        "I am looking for an internship as a react developer",
+        "where do I send my cv?",
+    ],
+    "pricing_data": [
+        "hi there",
+        "we need a pricing engine for our skus",
+        "our forecast and promotions are done in spreadsheets",
+        "could you build a data pipeline into snowflake?",
+        "which company have you done this for?",
+    ],
+    "human": [
+        "hi",
+        "can I talk to a human?",
+        "please just book a call",
+        "someone real please",
+    ],
+    "hostile": [
+        "hello??",
+        "this bot is useless",
+        "I don't understand what you mean",
+        "no, that's not what I asked",
+        "are you even a real person?",
+        "you are stupid",
+    ],
+}
+
+# Lane → quick-reply option id a user might click instead of typing
+CLICKS: Dict[str, str] = {
+    "project": "new_project",
+    "existing": "existing_system",
+    "careers": "careers",
+    "human": "contact",
+}
+
+PASTES: List[str] = [
+    (
+        "We are a mid-size retailer with thousands of SKUs. Our current pricing is manual "
+        "and done in spreadsheets, promotions are planned by hand and we have no forecast "
+        "to speak of. We would like to understand whether a pricing engine could help us. "
+    ) * 4,
+    (
+        "Hello, this is a long pasted paragraph from our internal wiki describing the legacy "
+        "system, its bugs, the slow dashboard and the data pipeline that breaks every night. "
+    ) * 6,
+    (
+        "Background: we are a two person startup. The idea is a marketplace for local tutors "
+        "with scheduling, video calls, payments and reviews. We have designs in Figma and a "
+        "rough budget but no developers yet, and we would like to launch in three months. "
+    ) * 3,
+]
+
+PAGES = ["/", "/services", "/careers", "/pricing", "/data", "/ai"]
+
+
+def _typo(text: str, rng: random.Random) -> str:
+    """Drop, double or swap one letter in one longer word."""
+    words = text.split()
+    candidates = [i for i, w in enumerate(words) if len(w) > 4 and w.isalpha()]
+    if not candidates:
+        return text
+    i = rng.choice(candidates)
+    word = words[i]
+    j = rng.randrange(1, len(word) - 1)
+    kind = rng.randrange(3)
+    if kind == 0:
+        word = word[:j] + word[j + 1:]
+    elif kind == 1:
+        word = word[:j] + word[j] + word[j:]
+    else:
+        word = word[:j - 1] + word[j] + word[j - 1] + word[j + 1:]
+    words[i] = word
+    return " ".join(words)
+
+
+def synthetic_conversations(count: int = 500, seed: int = 7) -> List[List[Turn]]:
+    """
+    `count` conversations, each a list of Turns for one session.
+    The same (count, seed) always yields the same corpus.
+    """
+    rng = random.Random(seed)
+    lanes = sorted(LANES)
+    conversations = []
+    for _ in range(count):
+        lane = rng.choice(lanes)
+        session_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        page = rng.choice(PAGES)
+        turns = []
+        for step, text in enumerate(LANES[lane]):
+            roll = rng.random()
+            if step == 1 and lane in CLICKS and roll < 0.3:
+                option_id = CLICKS[lane]
+                turns.append(Turn(session_id=session_id, message=option_id, page=page, option_id=option_id))
+                continue
+            if roll < 0.25:
+                text = _typo(text, rng)
+            elif roll < 0.32:
+                text = rng.choice(PASTES)
+            turns.append(Turn(session_id=session_id, message=text, page=page))
+        conversations.append(turns)
+    return conversations
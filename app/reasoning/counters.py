@@ -0,0 +1,245 @@
+"""
+ARE-3.x Turn Counters
+Live counts of what the engine produces, without scanning chat_messages.
+
+Every turn increments one cell per kind:
+- intent:<intent>, state:<next state>, action:<action>
+- frustration:<band> (calm / tense / high after the turn)
+- event:escalation (escalate_human), event:frustration_rise (level went up)
+
+Cells live in flat int64 arrays: running totals plus a ring of per-minute
+rows (REASON_COUNTER_MINUTES, default 60). Increments are unlocked, like
+the state machine's transition counts: a concurrent update can very rarely
+be lost. The lock is only taken to register a new counter name and once a
+minute to recycle the oldest row.
+
+Across processes: each worker can dump its snapshot to REASON_COUNTERS_DIR
+(counters-<host>-<pid>.json, so hosts sharing the directory do not collide);
+merge_snapshots() adds them up by counter and minute. Dumps older than the
+merge window are deleted when the directory is read. Turns run on a
+ProcessOffload pool are counted by the serving process from the returned
+result.
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .state_machine import frustration_band
+
+
+DEFAULT_MINUTES = int(os.getenv("REASON_COUNTER_MINUTES", "60"))
+MAX_COUNTERS = 512
+OVERFLOW = "other:overflow"
+
+
+def worker_id() -> str:
+    """<host>-<pid>; computed per call so forked workers get their own."""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class TurnCounters:
+
+    def __init__(self, minutes: int = DEFAULT_MINUTES, capacity: int = MAX_COUNTERS):
+        self.minutes = minutes
+        self.capacity = capacity
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._names: List[str] = [OVERFLOW]
+        self._index: Dict[Tuple[str, str], int] = {}
+        self._totals = array("q", bytes(8 * capacity))
+        # row r covers epoch minute _stamps[r]; cell (r, i) at r * capacity + i
+        self._rows = array("q", bytes(8 * capacity * minutes))
+        self._stamps = array("q", [-1] * minutes)
+
+    def _cell(self, kind: str, value: Optional[str]) -> int:
+        key = (kind, value or "none")
+        idx = self._index.get(key)
+        if idx is None:
+            with self._lock:
+                idx = self._index.get(key)
+                if idx is None:
+                    if len(self._names) >= self.capacity:
+                        return 0
+                    idx = len(self._names)
+                    self._names.append(f"{kind}:{key[1]}")
+                    self._index[key] = idx
+        return idx
+
+    def _row(self, minute: int) -> int:
+        row = minute % self.minutes
+        if self._stamps[row] != minute:
+            with self._lock:
+                if self._stamps[row] != minute:
+                    base = row * self.capacity
+                    self._rows[base:base + self.capacity] = array("q", bytes(8 * self.capacity))
+                    self._stamps[row] = minute
+        return row * self.capacity
+
+    def record_turn(
+        self,
+        intent: str,
+        state: str,
+        action: str,
+        frustration_level: int,
+        frustration_before: int,
+        now: Optional[float] = None,
+    ):
+        cells = [
+            self._cell("intent", intent),
+            self._cell("state", state),
+            self._cell("action", action),
+            self._cell("frustration", frustration_band(frustration_level)),
+        ]
+        if action == "escalate_human":
+            cells.append(self._cell("event", "escalation"))
+        if frustration_level > frustration_before:
+            cells.append(self._cell("event", "frustration_rise"))
+
+        base = self._row(int((time.time() if now is None else now) // 60))
+        totals, rows = self._totals, self._rows
+        for idx in cells:
+            totals[idx] += 1
+            rows[base + idx] += 1
+
+    def snapshot(self, minutes: Optional[int] = None, now: Optional[float] = None) -> Dict:
+        """
+        {"worker", "pid", "started_at", "totals": {name: n},
+         "minutes": [{"minute": epoch seconds, "counts": {name: n}}, ...]}
+        covering the last `minutes` minutes (oldest first, empty minutes omitted).
+        """
+        current = int((time.time() if now is None else now) // 60)
+        span = min(minutes or self.minutes, self.minutes)
+        names = list(self._names)
+        totals = self._totals.tolist()
+        rows = []
+        for minute in range(current - span + 1, current + 1):
+            row = minute % self.minutes
+            if self._stamps[row] != minute:
+                continue
+            base = row * self.capacity
+            cells = self._rows[base:base + len(names)].tolist()
+            counts = {name: n for name, n in zip(names, cells) if n}
+            if counts:
+                rows.append({"minute": minute * 60, "counts": counts})
+        return {
+            "worker": worker_id(),
+            "pid": os.getpid(),
+            "started_at": self.started_at,
+            "totals": {name: n for name, n in zip(names, totals) if n},
+            "minutes": rows,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._totals = array("q", bytes(8 * self.capacity))
+            self._rows = array("q", bytes(8 * self.capacity * self.minutes))
+            self._stamps = array("q", [-1] * self.minutes)
+
+    # -----------------------------
+    # Cross-process
+    # -----------------------------
+    def dump(self, directory: str):
+        """Write this process's snapshot to `directory` (atomic replace)."""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"counters-{worker_id()}.json")
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(self.snapshot(), fh)
+        os.replace(tmp, path)
+
+
+def load_dumps(
+    directory: str,
+    exclude_worker: Optional[str] = None,
+    max_age: float = DEFAULT_MINUTES * 60.0,
+) -> List[Dict]:
+    """
+    Snapshots dumped by other workers. Files older than `max_age` seconds
+    (default: the per-minute window) come from workers that stopped dumping;
+    they are deleted.
+    """
+    snapshots = []
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return snapshots
+    cutoff = time.time() - max_age
+    for name in names:
+        if not (name.startswith("counters-") and name.endswith((".json", ".json.tmp"))):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                continue
+            if not name.endswith(".json"):
+                continue
+            with open(path, encoding="utf-8") as fh:
+                snapshot = json.load(fh)
+        except (OSError, ValueError):
+            continue
+        if snapshot.get("worker") != exclude_worker:
+            snapshots.append(snapshot)
+    return snapshots
+
+
+def merge_snapshots(snapshots: Iterable[Dict], since: Optional[float] = None) -> Dict:
+    """Sum snapshots by counter name and by minute (minutes before `since` dropped)."""
+    totals: Dict[str, int] = {}
+    by_minute: Dict[int, Dict[str, int]] = {}
+    workers = []
+    for snapshot in snapshots:
+        workers.append(snapshot.get("worker", snapshot["pid"]))
+        for name, n in snapshot["totals"].items():
+            totals[name] = totals.get(name, 0) + n
+        for row in snapshot["minutes"]:
+            if since is not None and row["minute"] < since:
+                continue
+            counts = by_minute.setdefault(row["minute"], {})
+            for name, n in row["counts"].items():
+                counts[name] = counts.get(name, 0) + n
+    return {
+        "workers": workers,
+        "totals": totals,
+        "minutes": [{"minute": m, "counts": by_minute[m]} for m in sorted(by_minute)],
+    }
+
+
+# -----------------------------
+# Periodic dump
+# -----------------------------
+_dumper: Optional[threading.Thread] = None
+_dumper_stop = threading.Event()
+
+
+def start_dumper(counters: TurnCounters, directory: str, interval: float = 10.0) -> None:
+    global _dumper
+    if _dumper is not None and _dumper.is_alive():
+        return
+    _dumper_stop.clear()
+
+    def loop():
+        while not _dumper_stop.wait(interval):
+            try:
+                counters.dump(directory)
+            except OSError:
+                pass
+
+    _dumper = threading.Thread(target=loop, name="counter-dumper", daemon=True)
+    _dumper.start()
+
+
+def stop_dumper() -> None:
+    global _dumper
+    _dumper_stop.set()
+    if _dumper is not None:
+        _dumper.join(timeout=5.0)
+    _dumper = None
+
+
+TURN_COUNTERS = TurnCounters()
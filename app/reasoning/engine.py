@@ -6,42 +6,235 @@ Deterministic multi-stage conversational pipeline.
 No ML, no embeddings, no GPT at runtime.
 """
 
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
 from .memory import SessionMemory
 from .analyzer import analyze_message
-from .classifier import detect_intent
+from .classifier import current_registry, detect_intent
 from .state_machine import StateMachine
-from .router import route_message
+from .router import route_message, QUICK_REPLY_INTENTS
 from .humanize import humanize
-from .templates import SystemResponse
-from .safety import sanitize_input
+from .templates import ActionObject, SystemResponse, Turn
+from .prepare import prepare_message
+from .incremental import TypingState
+from .metrics import EVENTS, LATENCY, StageTimer, TurnBudget
+from .counters import TURN_COUNTERS, TurnCounters
+
+
+# A clicked option carries no text signal: neutral, no markers, no topic hint.
+_QUICK_REPLY_PREPARED = prepare_message("")
+_QUICK_REPLY_ANALYSIS = {
+    "original": "",
+    "clean": "",
+    "message_type": "normal",
+    "tone": "neutral",
+    "is_rejection": False,
+    "is_meta": False,
+    "prepared": _QUICK_REPLY_PREPARED,
+    "topic_hint": None,
+}
+
+
+@dataclass
+class RoutedTurn:
+    """A turn up to the routing decision; ReasoningEngine.complete() adds the reply."""
+    session: SessionMemory
+    analysis: Dict
+    intent: str
+    confidence: float
+    state: str
+    action: ActionObject
+    frustration_before: int
+    registry_version: Optional[str] = None
+    timer: Optional[StageTimer] = None
+    debug: bool = False
+    intent_scores: Optional[Dict[str, Any]] = None
+    degraded: Optional[List[str]] = None
 
 
 class ReasoningEngine:
 
-    def __init__(self):
+    def __init__(
+        self,
+        timer_factory: Callable[[], StageTimer] = StageTimer,
+        counters: Optional[TurnCounters] = TURN_COUNTERS,
+        budget_ms: Optional[float] = None,
+    ):
         self.sm = StateMachine()
+        # benchmarks swap in a StageTimer subclass (e.g. allocation tracking)
+        self.timer_factory = timer_factory
+        # None in offload workers: the serving process counts their turns
+        self.counters = counters
+        # default per-turn budget for process(); None = unbounded
+        self.budget_ms = budget_ms
 
-    def process(self, session: SessionMemory, user_raw_message: str, page: str):
+    def process(
+        self,
+        session: SessionMemory,
+        user_raw_message: str,
+        page: str,
+        debug: bool = False,
+        option_id: Optional[str] = None,
+        typing: Optional[TypingState] = None,
+        budget_ms: Optional[float] = None,
+    ) -> SystemResponse:
         """
         Main entrypoint for every message.
         Returns SystemResponse.
+        debug=True adds per-stage timings (ms) and the full intent scores
+        to SystemResponse.meta.
+        option_id: quick-reply id from a show_options payload; a known id
+        maps straight to its intent and skips text analysis.
+        typing: the session's TypingState; when its last draft is this
+        message, its precomputed analysis is reused.
+        budget_ms: time budget for this turn (default: the engine's). Once
+        it runs low, fuzzy matching, then intent scoring and debug meta are
+        skipped; meta["degraded"] lists what was skipped.
+        """
+        return self.complete(self.route(
+            session, user_raw_message, page, debug=debug, option_id=option_id, typing=typing, budget_ms=budget_ms,
+        ))
+
+    def route(
+        self,
+        session: SessionMemory,
+        user_raw_message: str,
+        page: str,
+        debug: bool = False,
+        option_id: Optional[str] = None,
+        typing: Optional[TypingState] = None,
+        budget_ms: Optional[float] = None,
+    ) -> RoutedTurn:
+        """
+        process() up to the routing decision (session already updated);
+        complete() humanizes the reply. Streaming sends the route first.
         """
+        budget_ms = budget_ms if budget_ms is not None else self.budget_ms
+        budget = TurnBudget(budget_ms / 1e3) if budget_ms else None
 
-        # 1. Clean + sanity check message
-        user_message = sanitize_input(user_raw_message)
+        # Stage timing only when someone will read it
+        timer = self.timer_factory() if (debug or LATENCY.enabled) else None
+
+        # One registry for the whole turn, even if it is swapped meanwhile
+        registry = current_registry()
+
+        quick_intent = QUICK_REPLY_INTENTS.get(option_id) if isinstance(option_id, str) else None
+        if quick_intent:
+            # Fast path: same memory / state / routing stages, no text stages
+            analysis = dict(_QUICK_REPLY_ANALYSIS)
+            if timer:
+                timer.lap("quick_reply")
+            return self._route(session, analysis, quick_intent, 1.0, timer, debug, registry["version"])
+
+        # 1. Clean + sanity check message, scan all markers once
+        #    (or reuse what typing events already computed)
+        reused = typing.reuse(user_raw_message, registry) if typing is not None else None
+        if reused is not None:
+            prepared, hits = reused
+            EVENTS.incr("typing_reused")
+        else:
+            prepared, hits = prepare_message(user_raw_message), None
+        if timer:
+            timer.lap("prepare")
 
         # 2. Analyzer → extract structure & tone
-        analysis = analyze_message(user_message)
+        analysis = analyze_message(prepared)
+        if timer:
+            timer.lap("analyze")
 
         # 3. Determine intent with multi-scorer
         intent, confidence, meta_intents = detect_intent(
-            message=user_message,
+            message=prepared.text,
             analysis=analysis,
             session=session,
             page=page,
+            with_scores=debug,
+            registry=registry,
+            hits=hits,
+            budget=budget,
+        )
+        if timer:
+            timer.lap("classify")
+
+        if debug and budget is not None and not budget.allow("debug_meta"):
+            debug = False
+        turn = self._route(
+            session, analysis, intent, confidence, timer, debug, registry["version"], prepared.clean,
         )
+        if debug:
+            turn.intent_scores = meta_intents
+        if budget is not None and budget.degraded:
+            turn.degraded = list(budget.degraded)
+        return turn
+
+    def process_many(
+        self,
+        turns: Sequence[Turn],
+        load_session: Callable[[str], SessionMemory],
+        save_session: Optional[Callable[[SessionMemory], None]] = None,
+        max_workers: int = 1,
+        debug: bool = False,
+        on_result: Optional[Callable[[int, SystemResponse], None]] = None,
+    ) -> List[SystemResponse]:
+        """
+        Process many turns from many sessions.
+        Turns of one session run in input order on one worker; different
+        sessions run in parallel (up to max_workers). Results come back in
+        input order. save_session is called once per session at the end.
+        on_result(index, result) is called as each turn completes (on the
+        worker thread), e.g. to timestamp it.
+        Workers are threads: engine turns hold the GIL, so max_workers > 1
+        only overlaps load_session / save_session I/O, not turn CPU.
+        """
+        groups: Dict[str, List[int]] = {}
+        for i, turn in enumerate(turns):
+            groups.setdefault(turn.session_id, []).append(i)
 
+        results: List[Optional[SystemResponse]] = [None] * len(turns)
+
+        def run_session(session_id: str, indexes: List[int]):
+            session = load_session(session_id)
+            for i in indexes:
+                turn = turns[i]
+                results[i] = self.process(
+                    session=session,
+                    user_raw_message=turn.message,
+                    page=turn.page,
+                    debug=debug,
+                    option_id=turn.option_id,
+                )
+                if on_result:
+                    on_result(i, results[i])
+            if save_session:
+                save_session(session)
+
+        if max_workers > 1 and len(groups) > 1:
+            # one pool per call: concurrent calls never share (or shut down) a pool
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(groups)), thread_name_prefix="reason") as pool:
+                futures = [pool.submit(run_session, sid, idx) for sid, idx in groups.items()]
+                for future in futures:
+                    future.result()
+        else:
+            for sid, idx in groups.items():
+                run_session(sid, idx)
+
+        return results
+
+    def _route(
+        self,
+        session: SessionMemory,
+        analysis: Dict,
+        intent: str,
+        confidence: float,
+        timer: Optional[StageTimer],
+        debug: bool,
+        registry_version: Optional[str] = None,
+        clean_text: str = "",
+    ) -> RoutedTurn:
         # 4. Update memory with analysis + intent
+        frustration_before = session.frustration_level
         session.update_from_analysis(analysis)
         session.last_intent = intent
         session.last_confidence = confidence
@@ -54,6 +247,8 @@ class ReasoningEngine:
             session=session,
         )
         session.state = next_state
+        if timer:
+            timer.lap("state_machine")
 
         # 6. Router decides: action + bot message template
         action_obj = route_message(
@@ -66,20 +261,62 @@ class ReasoningEngine:
 
         # Track last action to avoid repetition
         session.last_action = action_obj.action
+        session.record_turn(intent, action_obj.action, clean_text)
+        if timer:
+            timer.lap("route")
+
+        return RoutedTurn(
+            session=session,
+            analysis=analysis,
+            intent=intent,
+            confidence=confidence,
+            state=next_state,
+            action=action_obj,
+            frustration_before=frustration_before,
+            registry_version=registry_version,
+            timer=timer,
+            debug=debug,
+        )
+
+    def complete(self, turn: RoutedTurn) -> SystemResponse:
+        """Humanize the routed reply, count the turn and build the response."""
+        session, timer, action_obj = turn.session, turn.timer, turn.action
 
         # 7. Humanize final output
         final_reply = humanize(
             text=action_obj.bot_reply,
             session=session,
-            analysis=analysis,
+            analysis=turn.analysis,
         )
+        if timer:
+            timer.lap("humanize")
+
+        if self.counters is not None:
+            self.counters.record_turn(
+                turn.intent, turn.state, action_obj.action, session.frustration_level, turn.frustration_before,
+            )
+
+        meta = {}
+        if timer:
+            if LATENCY.enabled:
+                LATENCY.observe_turn(timer.laps, turn.intent, turn.state)
+            if turn.debug:
+                meta["timings_ms"] = timer.as_ms()
+                meta["state"] = turn.state
+                meta["history"] = session.recent_turns()
+        if turn.intent_scores is not None:
+            meta["intent_scores"] = turn.intent_scores
+        if turn.degraded:
+            meta["degraded"] = turn.degraded
 
         # 8. Build output payload
         return SystemResponse(
             session_id=session.session_id,
-            intent=intent,
-            intent_confidence=confidence,
+            intent=turn.intent,
+            intent_confidence=turn.confidence,
             action=action_obj.action,
             action_payload=action_obj.action_payload,
             bot_reply=final_reply,
+            meta=meta,
+            registry_version=turn.registry_version,
         )
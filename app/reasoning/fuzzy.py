@@ -0,0 +1,165 @@
+"""
+ARE-3.x Fuzzy Index
+Typo-tolerant keyword lookup with bounded per-message cost.
+
+Instead of comparing the whole message against every keyword, the message
+is cut into token windows the size of each keyword, candidates are pulled
+from a character-trigram inverted index, and only those few candidates are
+verified with a SequenceMatcher ratio on strings of roughly keyword length.
+
+One edit is a large share of a short keyword ("contract" vs "contact" is
+0.93), so keywords of SHORT_KEYWORD_CHARS or fewer only match windows of
+the same first character that are one typo away: the same length
+(substitution / transposition), one letter dropped with a ratio above
+SHORT_EDIT_RATIO ("pricng", but not "carer" for "career"), or one letter
+doubled ("priccing", but not "contract").
+"""
+
+from difflib import SequenceMatcher
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Set
+
+
+SHORT_KEYWORD_CHARS = 7
+SHORT_EDIT_RATIO = 0.92
+
+
+def _ratio_above(a: str, b: str, threshold: float) -> bool:
+    # quick_ratio() is a cheap upper bound of ratio(); most candidates stop there.
+    matcher = SequenceMatcher(None, a, b)
+    return matcher.quick_ratio() > threshold and matcher.ratio() > threshold
+
+
+def _short_typo(window: str, kw: str) -> bool:
+    # window vs a short keyword: same length, one letter dropped, or one doubled
+    size, kw_len = len(window), len(kw)
+    if window[0] != kw[0]:
+        return False
+    if size == kw_len:
+        return True
+    if size == kw_len - 1:
+        # ratio of a one-letter deletion is 2*size / (size + kw_len)
+        if 2 * size / (size + kw_len) <= SHORT_EDIT_RATIO:
+            return False
+        return any(window == kw[:i] + kw[i + 1:] for i in range(1, kw_len))
+    if size == kw_len + 1:
+        return any(
+            window[i] == window[i - 1] and window[:i] + window[i + 1:] == kw
+            for i in range(1, size)
+        )
+    return False
+
+
+def _trigrams(text: str) -> Set[str]:
+    padded = "  " + text + " "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class FuzzyIndex:
+    """
+    search(text) → keywords kw for which some window w of text
+    (a run of len(kw.split()) tokens, or the whole text) has
+    fuzzy_ratio(w, kw) > threshold; for short keywords w must also be
+    one typo away from kw (see _short_typo).
+    """
+
+    def __init__(self, keywords: Iterable[str], threshold: float = 0.8):
+        self.threshold = threshold
+        self.keywords: List[str] = []
+        self._word_counts: List[int] = []
+        self._grams: Dict[str, List[int]] = {}
+
+        seen = set()
+        for kw in keywords:
+            if kw in seen:
+                continue
+            seen.add(kw)
+            kid = len(self.keywords)
+            self.keywords.append(kw)
+            self._word_counts.append(len(kw.split()))
+            for gram in _trigrams(kw):
+                self._grams.setdefault(gram, []).append(kid)
+
+        self._window_sizes = sorted(set(self._word_counts))
+        self._max_len = max((len(kw) for kw in self.keywords), default=0)
+        # ratio = 2*M / (la + lb) can only exceed threshold when the longer
+        # string is shorter than `_len_factor` × the shorter one.
+        self._len_factor = (2.0 - threshold) / threshold if threshold else float("inf")
+
+    def _candidates(self, window: str, word_count) -> Set[int]:
+        grams = self._grams
+        word_counts = self._word_counts
+        keywords = self.keywords
+        size = len(window)
+        factor = self._len_factor
+
+        found: Set[int] = set()
+        for gram in _trigrams(window):
+            for kid in grams.get(gram, ()):
+                if word_count is not None and word_counts[kid] != word_count:
+                    continue
+                kw = keywords[kid]
+                kw_len = len(kw)
+                if kw_len <= SHORT_KEYWORD_CHARS:
+                    if abs(size - kw_len) <= 1 and _short_typo(window, kw):
+                        found.add(kid)
+                elif size < kw_len * factor and kw_len < size * factor:
+                    found.add(kid)
+        return found
+
+    def _window_hits(self, window: str, word_count: int) -> FrozenSet[int]:
+        keywords = self.keywords
+        threshold = self.threshold
+        return frozenset(
+            kid for kid in self._candidates(window, word_count)
+            if _ratio_above(window, keywords[kid], threshold)
+        )
+
+    def search(
+        self,
+        text: str,
+        tokens: Optional[Sequence[str]] = None,
+        memo: Optional[Dict[str, FrozenSet[int]]] = None,
+        memo_limit: Optional[int] = None,
+    ) -> Set[str]:
+        """
+        memo: per-token-window results kept across calls, for text that is
+        re-searched as it grows (typing); only new windows are verified.
+        memo_limit: stop adding windows once the memo holds this many.
+        """
+        if not text or not self.keywords:
+            return set()
+
+        threshold = self.threshold
+        keywords = self.keywords
+        matched: Set[int] = set()
+
+        def verify(window: str, kids: Set[int]):
+            for kid in kids:
+                if kid not in matched and _ratio_above(window, keywords[kid], threshold):
+                    matched.add(kid)
+
+        # Whole-text window (short messages that are "just the keyword")
+        if len(text) < self._max_len * self._len_factor:
+            verify(text, self._candidates(text, None))
+
+        # Token windows sized to each keyword's word count
+        if tokens is None:
+            tokens = text.split()
+        seen: Set[str] = set()
+        for size in self._window_sizes:
+            for i in range(len(tokens) - size + 1):
+                window = " ".join(tokens[i:i + size])
+                if window in seen:
+                    continue
+                seen.add(window)
+                if memo is None:
+                    verify(window, self._candidates(window, size))
+                    continue
+                hits = memo.get(window)
+                if hits is None:
+                    hits = self._window_hits(window, size)
+                    if memo_limit is None or len(memo) < memo_limit:
+                        memo[window] = hits
+                matched.update(hits)
+
+        return {keywords[kid] for kid in matched}
@@ -0,0 +1,173 @@
+"""
+ARE-3.x Incremental Analysis
+Precompute the expensive text stages while the user is still typing.
+
+A TypingState follows one session's draft through typing events:
+- Completed words are scanned once: the marker and keyword automata are
+  resumed from their saved state instead of rescanning the whole draft
+- Fuzzy keyword windows are memoised (the first FUZZY_MEMO_MAX per draft),
+  so each token window is verified once
+- Only the word being typed is rescanned on every event
+
+When the submitted message equals the last draft (same registry), the
+engine reuses the PreparedMessage and keyword / fuzzy hits and only runs
+the override rules, score assembly, state machine and routing.
+Any edit that is not an append (backspace, paste in the middle) restarts
+the state from scratch, so the result always equals a full analysis.
+
+Typing events and the submit of one session can arrive on different
+threads: updates hold the state's lock, and the analysed draft is
+published as one immutable tuple, so a reader sees either the previous
+draft's result or the new one, never a mix.
+"""
+
+import sys
+import threading
+from typing import Dict, FrozenSet, Optional, Set, Tuple
+
+from .classifier import Hits, current_registry
+from .metrics import EVENTS
+from .prepare import (
+    PreparedMessage, _MARKER_MATCHER, assemble_prepared, clip_input, prepare_message, sanitize_window,
+)
+from ..utils.session_lifecycle import SessionLifecycle, approx_sizeof
+
+
+# Every event re-searches every window in the same order, so an LRU smaller
+# than the draft would miss on every lookup; keep the first windows instead.
+FUZZY_MEMO_MAX = 64
+
+
+# (clipped draft, registry, prepared, hits) of the last analysed draft
+_Result = Tuple[str, Dict, PreparedMessage, Optional[Hits]]
+
+
+class TypingState:
+
+    __slots__ = (
+        "_lock", "_result", "registry",
+        "_committed", "_marker_node", "_phrase_node",
+        "_marker_hits", "_phrase_hits", "_fuzzy_memo",
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._result: Optional[_Result] = None
+        self._reset(None)
+
+    def _reset(self, registry: Optional[Dict]):
+        self.registry = registry
+        self._committed = ""
+        self._marker_node = 0
+        self._phrase_node = 0
+        self._marker_hits: Set[str] = set()
+        self._phrase_hits: Set[str] = set()
+        self._fuzzy_memo: Dict[str, FrozenSet[int]] = {}
+
+    def update(self, raw: str) -> PreparedMessage:
+        """Analyse the current draft, reusing work from previous drafts."""
+        with self._lock:
+            return self._update(raw)
+
+    def _update(self, raw: str) -> PreparedMessage:
+        # the submitted message is clipped the same way, so reuse still matches
+        raw = clip_input(raw, count=False)
+        registry = current_registry()
+        original, text, clean, windowed = sanitize_window(raw)
+
+        if windowed:
+            # windows move as the text grows; nothing to carry over
+            self._reset(registry)
+            prepared = prepare_message(raw)
+            self._result = (raw, registry, prepared, None)
+            return prepared
+
+        if registry is not self.registry or not clean.startswith(self._committed):
+            EVENTS.incr("typing_rescan")
+            self._reset(registry)
+
+        marker_matcher = _MARKER_MATCHER
+        phrase_matcher = registry["phrase_matcher"]
+
+        # Commit every completed word; the last (partial) word stays open
+        boundary = clean.rfind(" ") + 1
+        if boundary > len(self._committed):
+            fresh = clean[len(self._committed):boundary]
+            hits, self._marker_node = marker_matcher.resume(fresh, self._marker_node)
+            self._marker_hits |= hits
+            hits, self._phrase_node = phrase_matcher.resume(fresh, self._phrase_node)
+            self._phrase_hits |= hits
+            self._committed = clean[:boundary]
+
+        tail = clean[len(self._committed):]
+        marker_tail, _ = marker_matcher.resume(tail, self._marker_node)
+        phrase_tail, _ = phrase_matcher.resume(tail, self._phrase_node)
+
+        prepared = assemble_prepared(original, text, clean, self._marker_hits | marker_tail, windowed)
+        fuzzy_hits = registry["fuzzy_index"].search(
+            clean, prepared.tokens, memo=self._fuzzy_memo, memo_limit=FUZZY_MEMO_MAX,
+        )
+
+        self._result = (raw, registry, prepared, (self._phrase_hits | phrase_tail, fuzzy_hits))
+        return prepared
+
+    def reuse(self, raw: str, registry: Dict) -> Optional[Tuple[PreparedMessage, Optional[Hits]]]:
+        """(prepared, hits) when `raw` is exactly the last analysed draft, under `registry`."""
+        result = self._result
+        if result is None or result[0] != raw or result[1] is not registry:
+            return None
+        return result[2], result[3]
+
+    def matches(self, raw: str, registry: Dict) -> bool:
+        """True when `raw` is exactly the last analysed draft, under `registry`."""
+        return self.reuse(raw, registry) is not None
+
+
+def typing_sizeof(state: TypingState) -> int:
+    """
+    The state's own fields, the last draft and its PreparedMessage, plus the
+    hit sets and fuzzy memo contents; the compiled registry it points at is
+    shared, so not counted.
+    """
+    with state._lock:
+        size = approx_sizeof(state, max_depth=1)
+        if state._result is not None:
+            size += sys.getsizeof(state._result[0]) + sys.getsizeof(state._result[2])
+        for hits in (state._marker_hits, state._phrase_hits):
+            size += sum(sys.getsizeof(item) for item in hits)
+        for window, kids in state._fuzzy_memo.items():
+            size += sys.getsizeof(window) + sys.getsizeof(kids)
+    return size
+
+
+class TypingTracker:
+    """
+    Per-session TypingState, dropped after `idle_ttl` seconds without events
+    and evicted least-recently-used past `max_entries` / `max_bytes`.
+    """
+
+    def __init__(self, idle_ttl: float = 120.0, max_entries: int = 20000, max_bytes: Optional[int] = 64 * 1024 * 1024):
+        self._states = SessionLifecycle(
+            "typing", idle_ttl=idle_ttl, max_entries=max_entries, max_bytes=max_bytes, sizeof=typing_sizeof,
+        )
+        # get-or-create and re-store are atomic; the analysis itself runs
+        # under the state's own lock, so sessions do not wait on each other
+        self._lock = threading.Lock()
+
+    def update(self, session_id: str, raw: str) -> PreparedMessage:
+        with self._lock:
+            state = self._states.get(session_id)
+            if state is None:
+                state = TypingState()
+                self._states.put(session_id, state)
+        prepared = state.update(raw)
+        with self._lock:
+            # re-store so the byte estimate includes the new memo, unless the
+            # message was submitted (take()) meanwhile
+            if self._states.get(session_id) is state:
+                self._states.put(session_id, state)
+        return prepared
+
+    def take(self, session_id: str) -> Optional[TypingState]:
+        """Remove and return the session's state (on message submit)."""
+        return self._states.pop(session_id)
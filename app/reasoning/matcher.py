@@ -0,0 +1,136 @@
+"""
+ARE-3.x Phrase Matcher
+Aho-Corasick automaton over a fixed set of phrases.
+
+Built once (e.g. from INTENT_REGISTRY at import), then every phrase that
+occurs in a message is found in a single left-to-right pass, independent
+of how many phrases are registered.
+"""
+
+from typing import Dict, Iterable, List, Set, Tuple
+
+
+class PhraseMatcher:
+    """
+    Multi-pattern substring matcher.
+
+    find(text)         → phrases p with `p in text`
+    resume(text, node) → find() continued from a saved automaton state
+    prefixes(text)     → phrases p with `text.startswith(p)`
+    """
+
+    def __init__(self, phrases: Iterable[str]):
+        self.phrases: List[str] = []
+        self._index: Dict[str, int] = {}
+
+        # Node 0 is the root.
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Phrase ids ending exactly at this node
+        self._own: List[List[int]] = [[]]
+        # Phrase ids ending at this node or any node on its fail chain
+        self._out: List[List[int]] = [[]]
+
+        for phrase in phrases:
+            self._add(phrase)
+        self._build()
+
+    # -----------------------------
+    # Construction
+    # -----------------------------
+    def _add(self, phrase: str):
+        if phrase in self._index:
+            return
+        pid = len(self.phrases)
+        self.phrases.append(phrase)
+        self._index[phrase] = pid
+
+        node = 0
+        for ch in phrase:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._own.append([])
+                self._out.append([])
+                self._goto[node][ch] = nxt
+            node = nxt
+        self._own[node].append(pid)
+
+    def _build(self):
+        # Breadth-first: a node's fail target is always shallower,
+        # so its output list is complete by the time we reach the node.
+        queue = []
+        for child in self._goto[0].values():
+            self._fail[child] = 0
+            queue.append(child)
+        self._out[0] = list(self._own[0])
+
+        head = 0
+        while head < len(queue):
+            node = queue[head]
+            head += 1
+            self._out[node] = self._own[node] + self._out[self._fail[node]]
+
+            for ch, child in self._goto[node].items():
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                target = self._goto[f].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                queue.append(child)
+
+    # -----------------------------
+    # Matching
+    # -----------------------------
+    def find(self, text: str) -> Set[str]:
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+
+        hits: Set[int] = set(out[0])
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                hits.update(out[node])
+
+        return {self.phrases[pid] for pid in hits}
+
+    def resume(self, text: str, node: int = 0) -> Tuple[Set[str], int]:
+        """
+        Scan `text` starting from automaton state `node`; returns the hits
+        and the end state. For a = b + c:
+            find(a) == resume(b)[0] | resume(c, resume(b)[1])[0]
+        so text that grows at the end can be scanned incrementally.
+        """
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+
+        hits: Set[int] = set(out[node])
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                hits.update(out[node])
+
+        return {self.phrases[pid] for pid in hits}, node
+
+    def prefixes(self, text: str) -> Set[str]:
+        goto = self._goto
+        own = self._own
+
+        hits: List[int] = list(own[0])
+        node = 0
+        for ch in text:
+            node = goto[node].get(ch)
+            if node is None:
+                break
+            hits.extend(own[node])
+
+        return {self.phrases[pid] for pid in hits}
@@ -1,14 +1,110 @@
+import struct
 import uuid
 import time
-from typing import Optional, Dict
+import zlib
+from typing import Optional, Dict, List, Tuple
+
+
+# -----------------------------
+# Enum coding
+# -----------------------------
+# Every state / intent / tone / mode / action / stage value the engine
+# produces maps to a small int. Sessions store the code; reads return the
+# shared vocabulary string. Append-only: codes are part of the wire format.
+_VOCAB = (
+    None,
+    # states / intents / modes
+    "unknown", "new_project", "existing_system", "careers",
+    "pricing_engine", "data_platform", "contact_human", "handoff_ready",
+    # tones
+    "neutral", "uncertain", "frustrated", "cautious", "confused", "angry",
+    # actions
+    "escalate_human", "show_options", "show_message", "open_lab_tool",
+    # new project stages
+    "intro", "idea", "shaping",
+)
+_CODES = {value: code for code, value in enumerate(_VOCAB)}
+_RAW = 0xFF     # wire marker: value outside _VOCAB, stored as a string
+
+
+def _coded(slot: str):
+    """Property storing a vocabulary code in `slot` (raw str if not in _VOCAB)."""
+
+    def fget(self):
+        value = getattr(self, slot)
+        return _VOCAB[value] if value.__class__ is int else value
+
+    def fset(self, value):
+        setattr(self, slot, _CODES.get(value, value))
+
+    return property(fget, fset)
+
+
+# Recent turns: a ring of HISTORY_TURNS entries of
+#   intent code, action code (uint8, _RAW if outside _VOCAB), crc32(clean text)
+# The slot for turn n is n % HISTORY_TURNS.
+HISTORY_TURNS = 8
+_HISTORY_ENTRY = struct.Struct("<BBI")
+
+
+def text_hash(clean_text: str) -> int:
+    """History hash of a turn's clean text; 0 for no text (quick-reply clicks)."""
+    return zlib.crc32(clean_text.encode("utf-8")) if clean_text else 0
+
+# Fixed binary layout (little endian):
+#   version, state, last_intent, goal, tone, last_action, mode, new_project_stage,
+#   frustration_level, rejection_count, clarifier_loops        → 11 × uint8
+#   last_confidence, created_at, last_updated                  → 3 × float64
+#   len(session_id)                                            → uint16
+# followed by session_id (utf-8), then one uint16-prefixed utf-8 string
+# per coded field marked _RAW, in field order, then
+#   turn_count (uint32), len(history ring) in bytes (uint8), history ring.
+# from_bytes() rejects any other version with ValueError; session stores
+# read such a payload as a miss (a fresh session), so a rolling deploy that
+# changes the version resets live conversations instead of failing them.
+_WIRE_VERSION = 2
+_WIRE_HEADER = struct.Struct("<11B3dH")
+_WIRE_CODED = ("_state", "_last_intent", "_goal", "_tone", "_last_action", "_mode", "_new_project_stage")
+_WIRE_STR = struct.Struct("<H")
+_WIRE_HISTORY = struct.Struct("<IB")
 
 
 class SessionMemory:
     """
     Central memory for each chat session.
     Tracks conversational state, user tone, frustration, topic, and last actions.
+
+    Kept small on purpose (__slots__, enum-coded strings, small-int
+    counters) so a node can hold millions of live sessions.
     """
 
+    __slots__ = (
+        "session_id",
+        "_state",
+        "_last_intent",
+        "last_confidence",
+        "_goal",
+        "frustration_level",
+        "rejection_count",
+        "clarifier_loops",
+        "_tone",
+        "_last_action",
+        "_mode",
+        "_new_project_stage",
+        "created_at",
+        "last_updated",
+        "turn_count",
+        "_history",
+    )
+
+    state = _coded("_state")
+    last_intent = _coded("_last_intent")
+    goal = _coded("_goal")
+    tone = _coded("_tone")
+    last_action = _coded("_last_action")
+    mode = _coded("_mode")
+    new_project_stage = _coded("_new_project_stage")
+
     def __init__(self, session_id: Optional[str] = None):
         self.session_id = session_id or str(uuid.uuid4())
 
@@ -45,7 +141,11 @@ class SessionMemory:
 
         # Timestamp for analytics
         self.created_at = time.time()
-        self.last_updated = time.time()
+        self.last_updated = self.created_at
+
+        # Recent turns, compact (see HISTORY_TURNS); replaces the client-sent history
+        self.turn_count: int = 0
+        self._history = b""
 
     def record_user_message(self):
         """Update basic timestamps."""
@@ -94,6 +194,35 @@ class SessionMemory:
         if new_goal and not self.goal:
             self.goal = new_goal
 
+    def record_turn(self, intent: Optional[str], action: Optional[str], clean_text: str = ""):
+        """Append a turn to the history ring (overwrites the oldest once full)."""
+        entry = _HISTORY_ENTRY.pack(
+            _CODES.get(intent, _RAW),
+            _CODES.get(action, _RAW),
+            text_hash(clean_text),
+        )
+        # immutable bytes: sessions without turns share b"" (no per-session buffer)
+        offset = (self.turn_count % HISTORY_TURNS) * _HISTORY_ENTRY.size
+        history = self._history
+        self._history = history[:offset] + entry + history[offset + _HISTORY_ENTRY.size:]
+        self.turn_count += 1
+
+    def recent_turns(self) -> List[Tuple[Optional[str], Optional[str], int]]:
+        """
+        Up to HISTORY_TURNS (intent, action, text_hash), oldest first.
+        Values outside the shared vocabulary read back as None; text_hash
+        is 0 for quick-reply clicks.
+        """
+        entries = [
+            _HISTORY_ENTRY.unpack_from(self._history, offset)
+            for offset in range(0, len(self._history), _HISTORY_ENTRY.size)
+        ]
+        start = self.turn_count % HISTORY_TURNS if len(entries) == HISTORY_TURNS else 0
+        return [
+            (_VOCAB[intent] if intent != _RAW else None, _VOCAB[action] if action != _RAW else None, text_hash)
+            for intent, action, text_hash in entries[start:] + entries[:start]
+        ]
+
     def memory_snapshot(self) -> dict:
         """Useful for debugging—never for client display."""
         return {
@@ -107,3 +236,73 @@ class SessionMemory:
             "mode": self.mode,
             "new_project_stage": self.new_project_stage,
         }
+
+    def to_bytes(self) -> bytes:
+        """Fixed-layout binary encoding for shared session stores."""
+        codes = []
+        raw = []
+        for slot in _WIRE_CODED:
+            value = getattr(self, slot)
+            if value.__class__ is int:
+                codes.append(value)
+            else:
+                codes.append(_RAW)
+                raw.append(value)
+
+        sid = self.session_id.encode("utf-8")
+        parts = [
+            _WIRE_HEADER.pack(
+                _WIRE_VERSION,
+                *codes,
+                min(self.frustration_level, 255),
+                min(self.rejection_count, 255),
+                min(self.clarifier_loops, 255),
+                self.last_confidence,
+                self.created_at,
+                self.last_updated,
+                len(sid),
+            ),
+            sid,
+        ]
+        for value in raw:
+            data = value.encode("utf-8")
+            parts.append(_WIRE_STR.pack(len(data)))
+            parts.append(data)
+        parts.append(_WIRE_HISTORY.pack(min(self.turn_count, 0xFFFFFFFF), len(self._history)))
+        parts.append(self._history)
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "SessionMemory":
+        header = _WIRE_HEADER.unpack_from(data, 0)
+        if header[0] != _WIRE_VERSION:
+            raise ValueError(f"Unsupported SessionMemory wire version {header[0]}")
+        codes = header[1:8]
+        (frustration, rejections, clarifier,
+         confidence, created_at, last_updated, sid_len) = header[8:]
+
+        offset = _WIRE_HEADER.size
+        session = cls.__new__(cls)
+        session.session_id = data[offset:offset + sid_len].decode("utf-8")
+        offset += sid_len
+
+        for slot, code in zip(_WIRE_CODED, codes):
+            if code == _RAW:
+                (size,) = _WIRE_STR.unpack_from(data, offset)
+                offset += _WIRE_STR.size
+                setattr(session, slot, data[offset:offset + size].decode("utf-8"))
+                offset += size
+            else:
+                setattr(session, slot, code)
+
+        session.frustration_level = frustration
+        session.rejection_count = rejections
+        session.clarifier_loops = clarifier
+        session.last_confidence = confidence
+        session.created_at = created_at
+        session.last_updated = last_updated
+
+        session.turn_count, size = _WIRE_HISTORY.unpack_from(data, offset)
+        offset += _WIRE_HISTORY.size
+        session._history = bytes(data[offset:offset + size])
+        return session
@@ -0,0 +1,207 @@
+"""
+ARE-3.x Metrics
+In-process latency histograms for the reasoning pipeline.
+
+- StageTimer: per-turn lap timer (perf_counter), one lap per stage
+- LatencyHistogram: fixed log-scale buckets, p50/p95/p99 without keeping samples
+- LATENCY: process-wide recorder, enabled with REASON_TIMINGS=1
+- EVENTS: process-wide event counters (always on, e.g. truncated inputs)
+- TurnBudget: per-turn deadline; optional stages are skipped once it runs low
+
+When the recorder is disabled and no debug meta is requested the engine
+never creates a StageTimer, so the cost is a single truth test per stage.
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional
+
+
+# Bucket upper bounds in seconds: 1µs × 1.25^i up to ~60s
+_BOUNDS: List[float] = []
+_b = 1e-6
+while _b < 60.0:
+    _BOUNDS.append(_b)
+    _b *= 1.25
+del _b
+
+
+class LatencyHistogram:
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th quantile (seconds)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank and c:
+                return min(_BOUNDS[i], self.max) if i < len(_BOUNDS) else self.max
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean_ms": (self.total / self.count * 1e3) if self.count else 0.0,
+            "p50_ms": self.percentile(0.50) * 1e3,
+            "p95_ms": self.percentile(0.95) * 1e3,
+            "p99_ms": self.percentile(0.99) * 1e3,
+            "max_ms": self.max * 1e3,
+        }
+
+
+class StageTimer:
+    """Lap timer for one turn: lap(stage) records time since the previous lap."""
+
+    __slots__ = ("laps", "_last")
+
+    def __init__(self):
+        self.laps: Dict[str, float] = {}
+        self._last = time.perf_counter()
+
+    def lap(self, stage: str):
+        now = time.perf_counter()
+        self.laps[stage] = self.laps.get(stage, 0.0) + (now - self._last)
+        self._last = now
+
+    def total(self) -> float:
+        return sum(self.laps.values())
+
+    def as_ms(self) -> Dict[str, float]:
+        out = {stage: round(secs * 1e3, 4) for stage, secs in self.laps.items()}
+        out["total"] = round(self.total() * 1e3, 4)
+        return out
+
+
+class TurnBudget:
+    """
+    Time budget for one turn. Optional stages call allow(stage) before
+    running; a stage is skipped once the turn has used its share of the
+    budget, so work degrades in order: fuzzy matching first, then intent
+    scoring and debug meta. Skips are kept in `degraded` and counted in
+    EVENTS as degraded_<stage>.
+    """
+
+    __slots__ = ("seconds", "degraded", "_start")
+
+    # stage → fraction of the budget after which it is skipped
+    THRESHOLDS = {"fuzzy": 0.5, "scoring": 1.0, "debug_meta": 1.0}
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.degraded: List[str] = []
+        self._start = time.perf_counter()
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._start
+
+    def allow(self, stage: str) -> bool:
+        if self.elapsed() < self.seconds * self.THRESHOLDS[stage]:
+            return True
+        if stage not in self.degraded:
+            if not self.degraded:
+                EVENTS.incr("degraded_turns")
+            self.degraded.append(stage)
+            EVENTS.incr(f"degraded_{stage}")
+        return False
+
+
+class LatencyRecorder:
+    """
+    Histograms keyed by stage, and by stage within each intent / state.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._stages: Dict[str, LatencyHistogram] = {}
+        self._by_intent: Dict[str, Dict[str, LatencyHistogram]] = {}
+        self._by_state: Dict[str, Dict[str, LatencyHistogram]] = {}
+
+    @staticmethod
+    def _hist(table: Dict[str, LatencyHistogram], key: str) -> LatencyHistogram:
+        hist = table.get(key)
+        if hist is None:
+            hist = table[key] = LatencyHistogram()
+        return hist
+
+    def observe(self, stage: str, seconds: float):
+        """Single stage outside the engine (e.g. DB commits in the endpoint)."""
+        with self._lock:
+            self._hist(self._stages, stage).observe(seconds)
+
+    def observe_turn(self, laps: Dict[str, float], intent: Optional[str], state: Optional[str]):
+        total = sum(laps.values())
+        with self._lock:
+            per_intent = self._by_intent.setdefault(intent or "none", {})
+            per_state = self._by_state.setdefault(state or "none", {})
+            for stage, seconds in laps.items():
+                self._hist(self._stages, stage).observe(seconds)
+                self._hist(per_intent, stage).observe(seconds)
+                self._hist(per_state, stage).observe(seconds)
+            self._hist(self._stages, "total").observe(total)
+            self._hist(per_intent, "total").observe(total)
+            self._hist(per_state, "total").observe(total)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "stages": {k: h.summary() for k, h in self._stages.items()},
+                "intents": {
+                    i: {k: h.summary() for k, h in hists.items()} for i, hists in self._by_intent.items()
+                },
+                "states": {
+                    s: {k: h.summary() for k, h in hists.items()} for s, hists in self._by_state.items()
+                },
+            }
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._by_intent.clear()
+            self._by_state.clear()
+
+
+class EventCounters:
+    """Named monotonically increasing counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Dict[str, int] = {}
+
+    def incr(self, name: str, amount: int = 1):
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + amount
+
+    def get(self, name: str) -> int:
+        return self._counts.get(name, 0)
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+LATENCY = LatencyRecorder(enabled=os.getenv("REASON_TIMINGS", "0") == "1")
+EVENTS = EventCounters()
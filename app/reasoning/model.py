@@ -0,0 +1,242 @@
+"""
+ARE-3.x Intent Model (optional)
+Multinomial naive Bayes over hashed word uni/bi-grams.
+
+- Trained offline from registry phrases + labelled chat_messages
+- Stored as one float32 .npy matrix (dim + 1 rows × intents; last row = log prior)
+  plus a small .json sidecar with the intent labels and feature settings
+- Scoring is one sparse dot product: bias + counts @ weights[feature_ids]
+- Scores are posterior probabilities (summing to 1), so the classifier's
+  keyword-point cutoff does not apply: a turn counts as confident when the
+  top probability is >= min_probability and beats the runner-up by
+  min_margin (both stored in the sidecar)
+- The model sees the message text only; page, session context and the
+  intent registry play no part in its scores
+
+Needs numpy, which is not a hard dependency of the backend: the model is only
+loaded when REASON_INTENT_MODEL points at a weight file.
+
+Train from the backend root:
+    python -m app.reasoning.model --out intent_model.npy
+    python -m app.reasoning.model --out intent_model.npy --db postgresql://... --labels replay.tsv
+"""
+
+import argparse
+import json
+import os
+import zlib
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .prepare import PreparedMessage, prepare_message
+from .registry import INTENT_REGISTRY
+
+
+DEFAULT_DIM = 1 << 15
+DEFAULT_MIN_MARGIN = 0.1
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError as exc:
+        raise RuntimeError("The intent model needs the 'numpy' package") from exc
+    return numpy
+
+
+# -----------------------------
+# Features
+# -----------------------------
+def hashed_features(tokens: Sequence[str], dim: int = DEFAULT_DIM) -> Dict[int, int]:
+    """Word unigram + bigram counts, hashed (crc32, stable across processes) into `dim` buckets."""
+    counts: Dict[int, int] = {}
+    prev = None
+    for token in tokens:
+        fid = zlib.crc32(token.encode("utf-8")) % dim
+        counts[fid] = counts.get(fid, 0) + 1
+        if prev is not None:
+            fid = zlib.crc32(f"{prev} {token}".encode("utf-8")) % dim
+            counts[fid] = counts.get(fid, 0) + 1
+        prev = token
+    return counts
+
+
+# -----------------------------
+# Model
+# -----------------------------
+class IntentModel:
+
+    def __init__(
+        self,
+        intents: List[str],
+        weights,
+        dim: int = DEFAULT_DIM,
+        min_probability: Optional[float] = None,
+        min_margin: float = DEFAULT_MIN_MARGIN,
+    ):
+        self.intents = list(intents)
+        self.dim = dim
+        self.weights = weights          # (dim, K) log P(feature | intent)
+        self.bias = weights[dim]        # (K,) log prior, stored as the last row
+        # default: twice the uniform probability
+        self.min_probability = min_probability if min_probability is not None else 2.0 / len(self.intents)
+        self.min_margin = min_margin
+
+    def log_scores(self, tokens: Sequence[str]):
+        np = _numpy()
+        counts = hashed_features(tokens, self.dim)
+        if not counts:
+            return self.bias
+        ids = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        vals = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+        return self.bias + vals @ self.weights[ids]
+
+    def score(self, prepared: PreparedMessage) -> Dict[str, float]:
+        """Posterior probability per intent."""
+        np = _numpy()
+        logits = self.log_scores(prepared.tokens)
+        probs = np.exp(logits - logits.max())
+        probs /= probs.sum()
+        return dict(zip(self.intents, probs.tolist()))
+
+    def confident(self, scores: Dict[str, float]) -> bool:
+        """True when the top intent clears min_probability and min_margin."""
+        top, second = (sorted(scores.values(), reverse=True) + [0.0, 0.0])[:2]
+        return top >= self.min_probability and top - second >= self.min_margin
+
+    # -----------------------------
+    # Persistence
+    # -----------------------------
+    def save(self, path: str):
+        np = _numpy()
+        np.save(path, self.weights.astype(np.float32))
+        with open(_sidecar(path), "w", encoding="utf-8") as fh:
+            json.dump({
+                "intents": self.intents,
+                "dim": self.dim,
+                "features": "word-1-2gram-crc32",
+                "min_probability": self.min_probability,
+                "min_margin": self.min_margin,
+            }, fh)
+
+    @classmethod
+    def load(cls, path: str) -> "IntentModel":
+        np = _numpy()
+        with open(_sidecar(path), encoding="utf-8") as fh:
+            meta = json.load(fh)
+        weights = np.load(path, mmap_mode="r")
+        if weights.shape != (meta["dim"] + 1, len(meta["intents"])):
+            raise ValueError(f"{path}: weight shape {weights.shape} does not match {_sidecar(path)}")
+        return cls(
+            meta["intents"],
+            np.asarray(weights),
+            dim=meta["dim"],
+            min_probability=meta.get("min_probability"),
+            min_margin=meta.get("min_margin", DEFAULT_MIN_MARGIN),
+        )
+
+
+def _sidecar(path: str) -> str:
+    return os.path.splitext(path)[0] + ".json"
+
+
+def load_model_from_env() -> Optional[IntentModel]:
+    """The model named by REASON_INTENT_MODEL, or None when unset."""
+    path = os.getenv("REASON_INTENT_MODEL")
+    return IntentModel.load(path) if path else None
+
+
+# -----------------------------
+# Training
+# -----------------------------
+def train_naive_bayes(
+    samples: Iterable[Tuple[str, str]],
+    intents: Optional[List[str]] = None,
+    dim: int = DEFAULT_DIM,
+    alpha: float = 0.1,
+) -> IntentModel:
+    """Multinomial NB with additive smoothing over (text, intent) samples."""
+    np = _numpy()
+    intents = list(intents or INTENT_REGISTRY.keys())
+    column = {intent: k for k, intent in enumerate(intents)}
+    counts = np.zeros((dim, len(intents)), dtype=np.float64)
+    docs = np.zeros(len(intents), dtype=np.float64)
+
+    for text, intent in samples:
+        k = column.get(intent)
+        if k is None:
+            continue
+        docs[k] += 1
+        for fid, n in hashed_features(prepare_message(text).tokens, dim).items():
+            counts[fid, k] += n
+
+    totals = counts.sum(axis=0)
+    weights = np.empty((dim + 1, len(intents)), dtype=np.float32)
+    weights[:dim] = np.log((counts + alpha) / (totals + alpha * dim))
+    weights[dim] = np.log((docs + 1.0) / (docs.sum() + len(intents)))
+    return IntentModel(intents, weights, dim=dim)
+
+
+def registry_samples(registry: Dict = INTENT_REGISTRY) -> Iterator[Tuple[str, str]]:
+    for intent, cfg in registry.items():
+        for phrase in list(cfg["keywords"]) + list(cfg["synonyms"]):
+            yield phrase, intent
+
+
+def labelled_samples(db_url: str, labels_path: str) -> Iterator[Tuple[str, str]]:
+    """
+    Join a labels TSV against chat_messages.
+    Accepts "message_id<TAB>intent" lines, or the per-turn TSV written by
+    `python -m app.reasoning.replay --turns-out` (intent taken from column 3).
+    """
+    from sqlalchemy import create_engine, select
+    from sqlalchemy.orm import Session
+
+    from ..models import ChatMessage
+
+    labels: Dict[int, str] = {}
+    with open(labels_path, encoding="utf-8") as fh:
+        for line in fh:
+            cols = line.rstrip("\n").split("\t")
+            if len(cols) == 2:
+                labels[int(cols[0])] = cols[1]
+            elif len(cols) >= 5:
+                labels[int(cols[1])] = cols[2]
+
+    engine = create_engine(db_url)
+    try:
+        with Session(engine) as db:
+            query = select(ChatMessage.id, ChatMessage.message).where(ChatMessage.sender == "user")
+            for row in db.execute(query.execution_options(stream_results=True, yield_per=5000)):
+                intent = labels.get(row.id)
+                if intent:
+                    yield row.message or "", intent
+    finally:
+        engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the optional ARE intent model")
+    parser.add_argument("--out", required=True, help="weight file (.npy); a .json sidecar is written next to it")
+    parser.add_argument("--db", help="SQLAlchemy URL for labelled chat_messages")
+    parser.add_argument("--labels", help="labels TSV (message_id, intent) or a replay --turns-out file")
+    parser.add_argument("--dim", type=int, default=DEFAULT_DIM)
+    parser.add_argument("--alpha", type=float, default=0.1)
+    parser.add_argument("--min-probability", type=float, help="confidence cutoff (default: 2 / number of intents)")
+    parser.add_argument("--min-margin", type=float, default=DEFAULT_MIN_MARGIN, help="top minus runner-up probability")
+    args = parser.parse_args()
+
+    def samples():
+        yield from registry_samples()
+        if args.db and args.labels:
+            yield from labelled_samples(args.db, args.labels)
+
+    model = train_naive_bayes(samples(), dim=args.dim, alpha=args.alpha)
+    if args.min_probability is not None:
+        model.min_probability = args.min_probability
+    model.min_margin = args.min_margin
+    model.save(args.out)
+    print(f"saved {len(model.intents)} intents × {model.dim} features to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+ARE-3.x Process Offload
+Run text turns on a warm process pool so reasoning scales past the GIL.
+
+Sessions cross the process boundary as SessionMemory.to_bytes() (~70 B);
+the worker returns the updated session bytes and the SystemResponse.
+Quick-reply clicks and turns with reusable typing analysis stay
+in-process: they cost less than the round trip.
+
+Workers follow registry swaps in the serving process by loading the new
+version from the registry disk cache; if it is not there, the turn runs
+in-process instead.
+
+Turn counters (intent / state / action) for offloaded turns are recorded
+by the serving process from the returned result. Other counters collected
+inside workers (LATENCY, EVENTS, transition matrix) stay in the workers.
+"""
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+from .classifier import activate_version, current_registry
+from .engine import ReasoningEngine
+from .incremental import TypingState
+from .memory import SessionMemory
+from .router import QUICK_REPLY_INTENTS
+from .templates import SystemResponse
+
+
+_ENGINE: Optional[ReasoningEngine] = None
+
+
+def _init_worker():
+    global _ENGINE
+    _ENGINE = ReasoningEngine(counters=None)
+
+
+def _warm() -> bool:
+    return _ENGINE is not None
+
+
+def _run_turn(
+    session_data: bytes,
+    message: str,
+    page: str,
+    debug: bool,
+    option_id: Optional[str],
+    registry_version: str,
+    budget_ms: Optional[float] = None,
+) -> Optional[Tuple[bytes, SystemResponse]]:
+    if current_registry()["version"] != registry_version and not activate_version(registry_version):
+        return None
+    session = SessionMemory.from_bytes(session_data)
+    result = _ENGINE.process(session, message, page, debug=debug, option_id=option_id, budget_ms=budget_ms)
+    return session.to_bytes(), result
+
+
+class ProcessOffload:
+    """
+    process() mirrors ReasoningEngine.process, but returns the updated
+    session instead of mutating the one passed in.
+    """
+
+    def __init__(self, engine: ReasoningEngine, workers: int):
+        self.engine = engine
+        self.workers = workers
+        # spawn: the serving process has threads (writer, sweeper) that fork would copy mid-lock
+        self._pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+        # start every worker now, not on the first user turn
+        for future in [self._pool.submit(_warm) for _ in range(workers)]:
+            future.result()
+
+    def process(
+        self,
+        session: SessionMemory,
+        user_raw_message: str,
+        page: str,
+        debug: bool = False,
+        option_id: Optional[str] = None,
+        typing: Optional[TypingState] = None,
+        budget_ms: Optional[float] = None,
+    ) -> Tuple[SessionMemory, SystemResponse]:
+        registry = current_registry()
+        budget_ms = budget_ms if budget_ms is not None else self.engine.budget_ms
+        local = (isinstance(option_id, str) and option_id in QUICK_REPLY_INTENTS) or (
+            typing is not None and typing.matches(user_raw_message, registry)
+        )
+        if not local:
+            remote = self._pool.submit(
+                _run_turn, session.to_bytes(), user_raw_message, page, debug, option_id, registry["version"], budget_ms,
+            ).result()
+            if remote is not None:
+                data, result = remote
+                updated = SessionMemory.from_bytes(data)
+                if self.engine.counters is not None:
+                    self.engine.counters.record_turn(
+                        result.intent, updated.state, result.action,
+                        updated.frustration_level, session.frustration_level,
+                    )
+                return updated, result
+
+        result = self.engine.process(
+            session, user_raw_message, page, debug=debug, option_id=option_id, typing=typing, budget_ms=budget_ms,
+        )
+        return session, result
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,286 @@
+"""
+ARE-3.x Preprocessing
+Single pass over the incoming message, shared by every later stage.
+
+sanitize → lowercase → tokenize → one automaton scan for every marker
+group the analyzer / classifier / router look at. Later stages read the
+resulting PreparedMessage instead of re-scanning the text themselves.
+
+Size guard: input beyond MAX_INPUT_CHARS is cut off (clip_input), and
+anything still longer than WINDOW_TRIGGER_CHARS is analysed on a window
+(head + tail + the most marker-dense middle segments), so per-turn cost
+is bounded whatever gets pasted in.
+"""
+
+import os
+import re
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, List, Tuple
+
+from .matcher import PhraseMatcher
+from .metrics import EVENTS
+from .safety import sanitize_and_lower
+
+
+# -----------------------------
+# Size guard
+# -----------------------------
+MAX_INPUT_CHARS = int(os.getenv("REASON_MAX_INPUT_CHARS", "16000"))
+WINDOW_TRIGGER_CHARS = int(os.getenv("REASON_WINDOW_CHARS", "2000"))
+WINDOW_HEAD_CHARS = 800
+WINDOW_TAIL_CHARS = 400
+WINDOW_SEGMENT_WORDS = 40
+WINDOW_SEGMENTS = 2
+
+
+# -----------------------------
+# Marker groups
+# -----------------------------
+MARKER_GROUPS: Dict[str, List[str]] = {
+    # Analyzer: confusion / clarification
+    "confusion": [
+        "what do you mean",
+        "not clear",
+        "don't understand",
+        "do not understand",
+        "explain again",
+        "say again",
+        "come again",
+        "you mean what",
+    ],
+    # Analyzer: insults / strong negative
+    "insult": [
+        "dumb", "stupid", "idiot", "useless", "scam", "fraud",
+        "you suck", "terrible bot", "worst bot", "you are still dummy",
+    ],
+    # Analyzer: trust / legitimacy questions
+    "trust": [
+        "can i trust",
+        "can we trust",
+        "are you legit",
+        "are you real",
+        "is this real",
+        "is this a scam",
+        "are you a scam",
+        "are you fraud",
+        "is ameotech legit",
+        "is ameotech real",
+        "are you guys real",
+        "you guys real",
+    ],
+    # Analyzer: bot / AI meta talk
+    "bot": [
+        "chatgpt", "gpt", "ai bot", "are you ai", "are you a bot",
+        "you a bot", "you are bot", "llm", "large language model",
+    ],
+    # Classifier: topic hints (softer than full intent, guide the router)
+    # careers_hint doubles as the hard careers marker
+    "careers_hint": [
+        "job", "jobs", "opening", "openning", "career", "careers",
+        "hiring", "vacancy", "internship", "intern", "position", "role",
+    ],
+    # existing_hint doubles as the hard existing-system marker
+    "existing_hint": [
+        "existing system", "existing app", "legacy",
+        "website", "web site", "site",
+        "bug", "bugs", "issue", "issues", "error", "errors",
+        "crash", "crashing", "down", "slow", "performance",
+        "maintenance", "maintain", "support",
+    ],
+    "project_hint": [
+        "project", "product", "app", "application", "platform",
+        "saas", "tool", "solution", "idea", "mvp", "prototype",
+    ],
+    # Classifier: direct "talk to human"
+    "human_trigger": [
+        "talk to human",
+        "talk to someone",
+        "speak to someone",
+        "someone real",
+        "real person",
+        "call me",
+        "can you call",
+    ],
+    # Classifier: strong new-build markers
+    "project_strong": [
+        "new project", "start a project", "start project",
+        "build a project", "build product", "new product",
+        "new saas", "new app", "mvp", "prototype", "launch an app",
+    ],
+    # Classifier: generic "project" (strong hint if not clearly careers)
+    "project_word": ["project"],
+    # Router (new project lane): company info
+    "company": [
+        "about ameotech",
+        "more about ameotech",
+        "tell me more about ameotech",
+        "tell me more about you",
+        "what is ameotech",
+        "who are you",
+        "what do you do",
+        "what does ameotech do",
+        "what does your company do",
+        "about your company",
+        "your services",
+        "what services you offer",
+        "what kind of work you do",
+        "what kind of work do you do",
+    ],
+    # Router: cost / budget / price / estimate
+    "cost": [
+        "budget", "how much", "cost", "price", "pricing",
+        "estimate", "rough idea", "ballpark", "money",
+    ],
+    # Router: generic 'what do you suggest / recommend'
+    "suggest": [
+        "what you suggest",
+        "what do you suggest",
+        "what would you suggest",
+        "what do you recommend",
+        "what would you recommend",
+        "what stack do you suggest",
+        "what stack do you recommend",
+    ],
+    # Router: tech stack talk
+    "tech": [
+        # generic tech words
+        "stack", "framework", "language", "frontend", "front-end",
+        "backend", "back-end", "architecture", "tech stack", "technology",
+        # common stacks / tools we often see
+        ".net", "dotnet", "react", "vite", "typescript", "javascript",
+        "node", "next.js", "nextjs", "django", "python", "java",
+        "spring", "angular", "vue", "svelte", "rust", "go ", "golang",
+        "flutter", "react native", "react-native", "kotlin", "swift",
+        "laravel", "rails", "ruby on rails", "wordpress", "drupal",
+        "nuxt", "remix", "sveltekit", "capacitor", "ionic", "strapi",
+    ],
+    # Router: user comparing / challenging stacks
+    "comparison": [
+        "why not", "my tech stack", "instead of", "vs ", "versus", "better than",
+    ],
+    "react": ["react"],
+    "nextjs": ["next.js", "nextjs"],
+    # Router: trust / legitimacy words (looser than analyzer "trust")
+    "trust_word": ["trust", "scam", "fraud", "legit", "real company", "you guys real"],
+}
+
+# Rejection of suggestion / tool (word-bounded, so kept as one regex)
+REJECTION_PATTERNS = [
+    r"\bno\b",
+    r"\bno thanks\b",
+    r"\bnot now\b",
+    r"\bdon't want\b",
+    r"\bdo not want\b",
+    r"\bstop\b",
+    r"\bskip\b",
+    r"\bleave it\b",
+]
+
+
+def _compile_markers(groups: Dict[str, List[str]]):
+    phrase_groups: Dict[str, List[str]] = {}
+    for group, phrases in groups.items():
+        for phrase in phrases:
+            phrase_groups.setdefault(phrase, []).append(group)
+    return phrase_groups, PhraseMatcher(phrase_groups.keys())
+
+
+_PHRASE_GROUPS, _MARKER_MATCHER = _compile_markers(MARKER_GROUPS)
+_REJECTION_RE = re.compile("|".join(f"(?:{pat})" for pat in REJECTION_PATTERNS))
+
+
+@dataclass(frozen=True)
+class PreparedMessage:
+    original: str               # raw text as received, after the MAX_INPUT_CHARS cap
+    text: str                   # sanitized (whitespace + profanity)
+    clean: str                  # sanitized, lowercased
+    tokens: Tuple[str, ...]
+    markers: FrozenSet[str]     # marker groups hit in clean
+    is_rejection: bool
+    windowed: bool = False      # text / clean hold a window, not the whole message
+
+    def has(self, group: str) -> bool:
+        return group in self.markers
+
+
+def clip_input(raw: str, count: bool = True) -> str:
+    """
+    Hard cap on input size; counts every cut in EVENTS["input_truncated"]
+    (count=False for drafts, so a message is counted once, on submit).
+    """
+    if raw and len(raw) > MAX_INPUT_CHARS:
+        if count:
+            EVENTS.incr("input_truncated")
+        return raw[:MAX_INPUT_CHARS]
+    return raw or ""
+
+
+def _window(text: str) -> str:
+    """
+    Head + tail of a long (sanitized) message, plus the middle segments
+    with the most distinct marker phrases, kept in message order.
+    """
+    words = text.split(" ")
+
+    head, size = 0, 0
+    while head < len(words) and size < WINDOW_HEAD_CHARS:
+        size += len(words[head]) + 1
+        head += 1
+    tail, size = len(words), 0
+    while tail > head and size < WINDOW_TAIL_CHARS:
+        tail -= 1
+        size += len(words[tail]) + 1
+
+    scored = []
+    for start in range(head, tail, WINDOW_SEGMENT_WORDS):
+        segment = " ".join(words[start:min(start + WINDOW_SEGMENT_WORDS, tail)])
+        hits = len(_MARKER_MATCHER.find(segment.lower()))
+        if hits:
+            scored.append((hits, start, segment))
+    dense = sorted(scored, key=lambda item: (-item[0], item[1]))[:WINDOW_SEGMENTS]
+
+    parts = [" ".join(words[:head])]
+    parts.extend(segment for _, _, segment in sorted(dense, key=lambda item: item[1]))
+    parts.append(" ".join(words[tail:]))
+    return " ... ".join(part for part in parts if part)
+
+
+def sanitize_window(raw: str) -> Tuple[str, str, str, bool]:
+    """clip → sanitize → window; returns (original, text, clean, windowed)."""
+    original = clip_input(raw)
+    text, clean = sanitize_and_lower(original)
+
+    windowed = len(text) > WINDOW_TRIGGER_CHARS
+    if windowed:
+        EVENTS.incr("input_windowed")
+        text = _window(text)
+        clean = text.lower()
+    return original, text, clean, windowed
+
+
+def assemble_prepared(
+    original: str,
+    text: str,
+    clean: str,
+    marker_phrases: Iterable[str],
+    windowed: bool,
+) -> PreparedMessage:
+    """PreparedMessage from already-found marker phrases (see incremental.py)."""
+    markers = set()
+    for phrase in marker_phrases:
+        markers.update(_PHRASE_GROUPS[phrase])
+
+    return PreparedMessage(
+        original=original,
+        text=text,
+        clean=clean,
+        tokens=tuple(clean.split()),
+        markers=frozenset(markers),
+        is_rejection=_REJECTION_RE.search(clean) is not None,
+        windowed=windowed,
+    )
+
+
+def prepare_message(raw: str) -> PreparedMessage:
+    original, text, clean, windowed = sanitize_window(raw)
+    return assemble_prepared(original, text, clean, _MARKER_MATCHER.find(clean), windowed)
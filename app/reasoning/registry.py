@@ -1,8 +1,17 @@
 """
 Intent registry for ARE-3.5
 Central place to manage intents and their keyword patterns.
+
+INTENT_REGISTRY is the built-in default. A registry can also be loaded
+from a YAML / JSON file of the same shape (load_registry_file) and is
+identified by a content hash (registry_version).
 """
 
+import hashlib
+import json
+import os
+from typing import Dict
+
 INTENT_REGISTRY = {
     "new_project": {
         "keywords": [
@@ -74,3 +83,39 @@ INTENT_REGISTRY = {
         "weight": 0.1,
     },
 }
+
+
+def validate_registry(registry: Dict) -> Dict:
+    """Check the registry shape; returns it unchanged or raises ValueError."""
+    if not isinstance(registry, dict) or "unknown" not in registry:
+        raise ValueError("Registry must be a mapping of intents that includes 'unknown'")
+    for intent, cfg in registry.items():
+        if not isinstance(cfg, dict):
+            raise ValueError(f"Intent '{intent}' must be a mapping")
+        for key in ("keywords", "synonyms", "pages"):
+            values = cfg.get(key)
+            if not isinstance(values, list) or not all(isinstance(v, str) and v for v in values):
+                raise ValueError(f"Intent '{intent}': '{key}' must be a list of non-empty strings")
+        if not isinstance(cfg.get("weight", 1.0), (int, float)):
+            raise ValueError(f"Intent '{intent}': 'weight' must be a number")
+    return registry
+
+
+def load_registry_file(path: str) -> Dict:
+    """Load and validate a registry from .yaml / .yml / .json."""
+    with open(path, encoding="utf-8") as fh:
+        if os.path.splitext(path)[1].lower() in (".yaml", ".yml"):
+            import yaml
+            try:
+                registry = yaml.safe_load(fh)
+            except yaml.YAMLError as exc:
+                raise ValueError(f"{path}: {exc}") from exc
+        else:
+            registry = json.load(fh)
+    return validate_registry(registry)
+
+
+def registry_version(registry: Dict) -> str:
+    """Short content hash; identical registries share a version whatever their source."""
+    canonical = json.dumps(registry, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:12]
@@ -0,0 +1,296 @@
+"""
+ARE-3.x Offline Replay
+Re-run historical chat_messages user turns through a ReasoningEngine build.
+
+- Streams user turns ordered by (session_id, id) with a server-side cursor
+  (stream_results + yield_per), so memory stays flat on millions of rows
+- Whole sessions go to a process pool in chunks; turns of one session
+  stay in order on one worker and replay on a fresh SessionMemory
+- Aggregates intent / state / action distributions with Counter merges
+- Optionally writes one TSV line per turn, so two builds can be diffed
+  turn by turn: both files are in (session_id, id) order (session ids in
+  byte order), and diff_turns merge-joins them on that key
+
+Run from the backend root:
+    python -m app.reasoning.replay --db postgresql://... --out new.json --turns-out new.tsv
+    python -m app.reasoning.replay --db postgresql://... --out new.json --baseline old.json \\
+        --turns-out new.tsv --baseline-turns old.tsv
+"""
+
+import argparse
+import importlib
+import json
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Tuple
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from ..models import ChatMessage
+from .memory import SessionMemory
+from .metrics import EVENTS
+from .router import QUICK_REPLY_INTENTS
+
+
+DEFAULT_ENGINE = "app.reasoning.engine:ReasoningEngine"
+
+# (session_id, [(message_id, text), ...])
+SessionTurns = Tuple[str, List[Tuple[int, str]]]
+
+
+# -----------------------------
+# Streaming
+# -----------------------------
+def stream_sessions(db_url: str, yield_per: int = 5000, limit: Optional[int] = None) -> Iterator[SessionTurns]:
+    """User turns grouped by session, in (session_id, id) order."""
+    engine = create_engine(db_url)
+    session_order = ChatMessage.session_id
+    if engine.dialect.name == "postgresql":
+        # byte order, as Python compares the keys in diff_turns (SQLite's default)
+        session_order = session_order.collate("C")
+    query = (
+        select(ChatMessage.id, ChatMessage.session_id, ChatMessage.message)
+        .where(ChatMessage.sender == "user")
+        .order_by(session_order, ChatMessage.id)
+    )
+    if limit:
+        query = query.limit(limit)
+    try:
+        with Session(engine) as db:
+            rows = db.execute(query.execution_options(stream_results=True, yield_per=yield_per))
+            for session_id, group in groupby(rows, key=lambda row: row.session_id):
+                yield session_id, [(row.id, row.message or "") for row in group]
+    finally:
+        engine.dispose()
+
+
+def _chunks(sessions: Iterator[SessionTurns], chunk_turns: int) -> Iterator[List[SessionTurns]]:
+    chunk: List[SessionTurns] = []
+    size = 0
+    for item in sessions:
+        chunk.append(item)
+        size += len(item[1])
+        if size >= chunk_turns:
+            yield chunk
+            chunk, size = [], 0
+    if chunk:
+        yield chunk
+
+
+# -----------------------------
+# Worker side
+# -----------------------------
+_ENGINE = None
+
+
+def _load_engine(spec: str):
+    module_name, _, attr = spec.partition(":")
+    return getattr(importlib.import_module(module_name), attr or "ReasoningEngine")()
+
+
+def _init_worker(spec: str):
+    global _ENGINE
+    _ENGINE = _load_engine(spec)
+
+
+def _replay_chunk(chunk: List[SessionTurns], keep_turns: bool) -> Dict[str, Any]:
+    intents, states, actions = Counter(), Counter(), Counter()
+    outcomes = []
+    skipped_before = EVENTS.get("scoring_skipped")
+    for session_id, turns in chunk:
+        session = SessionMemory(session_id=session_id)
+        for message_id, text in turns:
+            # the endpoint stores a bare option id as the message of a click
+            option_id = text if text in QUICK_REPLY_INTENTS else None
+            result = _ENGINE.process(session, text, "/", option_id=option_id)
+            intents[result.intent] += 1
+            states[session.state] += 1
+            actions[result.action] += 1
+            if keep_turns:
+                outcomes.append((session_id, message_id, result.intent, session.state, result.action))
+    return {
+        "sessions": len(chunk),
+        "scoring_skipped": EVENTS.get("scoring_skipped") - skipped_before,
+        "intents": intents,
+        "states": states,
+        "actions": actions,
+        "outcomes": outcomes,
+    }
+
+
+# -----------------------------
+# Driver
+# -----------------------------
+def replay(
+    sessions: Iterator[SessionTurns],
+    engine_spec: str = DEFAULT_ENGINE,
+    workers: int = 4,
+    chunk_turns: int = 2000,
+    turns_out: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Replay every session and return the distributions.
+    Chunks are collected in submission order (at most 2×workers in flight),
+    so turns_out is written in the same order as the input stream.
+    """
+    totals = {"intents": Counter(), "states": Counter(), "actions": Counter()}
+    n_sessions = 0
+    scoring_skipped = 0
+    start = time.perf_counter()
+    out = open(turns_out, "w", encoding="utf-8") if turns_out else None
+    keep_turns = out is not None
+
+    def collect(part: Dict[str, Any]):
+        nonlocal n_sessions, scoring_skipped
+        n_sessions += part["sessions"]
+        scoring_skipped += part["scoring_skipped"]
+        for key in totals:
+            totals[key].update(part[key])
+        if out:
+            for session_id, message_id, intent, state, action in part["outcomes"]:
+                out.write(f"{session_id}\t{message_id}\t{intent}\t{state}\t{action}\n")
+
+    try:
+        if workers <= 1:
+            _init_worker(engine_spec)
+            for chunk in _chunks(sessions, chunk_turns):
+                collect(_replay_chunk(chunk, keep_turns))
+        else:
+            with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(engine_spec,)) as pool:
+                pending = []
+                for chunk in _chunks(sessions, chunk_turns):
+                    pending.append(pool.submit(_replay_chunk, chunk, keep_turns))
+                    if len(pending) >= 2 * workers:
+                        collect(pending.pop(0).result())
+                for future in pending:
+                    collect(future.result())
+    finally:
+        if out:
+            out.close()
+
+    elapsed = time.perf_counter() - start
+    turns = sum(totals["intents"].values())
+    return {
+        "engine": engine_spec,
+        "sessions": n_sessions,
+        "turns": turns,
+        "elapsed_s": round(elapsed, 3),
+        "turns_per_s": round(turns / elapsed, 1) if elapsed else 0.0,
+        # turns settled by an override rule without full intent scoring
+        "scoring_skipped_pct": round(scoring_skipped / turns * 100, 2) if turns else 0.0,
+        **{key: dict(counter.most_common()) for key, counter in totals.items()},
+    }
+
+
+# -----------------------------
+# Diffs
+# -----------------------------
+def diff_distributions(current: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """Per label: baseline / current share (%) and the change in points."""
+    diff = {}
+    for key in ("intents", "states", "actions"):
+        cur, base = current.get(key, {}), baseline.get(key, {})
+        cur_total, base_total = sum(cur.values()) or 1, sum(base.values()) or 1
+        rows = {}
+        for label in sorted(set(cur) | set(base)):
+            before = base.get(label, 0) / base_total * 100
+            after = cur.get(label, 0) / cur_total * 100
+            rows[label] = {"baseline_pct": round(before, 2), "current_pct": round(after, 2), "delta_pts": round(after - before, 2)}
+        diff[key] = dict(sorted(rows.items(), key=lambda item: -abs(item[1]["delta_pts"])))
+    return diff
+
+
+def _turn_rows(fh: TextIO) -> Iterator[Tuple[Tuple[str, int], List[str]]]:
+    """((session_id, message_id), [intent, state, action]) per TSV line, checking the order."""
+    previous = None
+    for line in fh:
+        fields = line.rstrip("\n").split("\t")
+        key = (fields[0], int(fields[1]))
+        if previous is not None and key <= previous:
+            raise ValueError(f"{fh.name} is not in (session_id, id) order at {key}")
+        previous = key
+        yield key, fields[2:5]
+
+
+def diff_turns(current_path: str, baseline_path: str, top: int = 20) -> Dict[str, Any]:
+    """
+    Merge-join two per-turn TSVs on (session_id, message_id) and count
+    changed outcomes. Turns only the baseline has (e.g. a deleted message,
+    a larger --limit) are counted as missing_turns, turns only the current
+    run has as extra_turns; either one counts as changed.
+    """
+    changed = {"intent": Counter(), "state": Counter(), "action": Counter()}
+    turns = changed_turns = missing_turns = extra_turns = 0
+    with open(current_path, encoding="utf-8") as cur, open(baseline_path, encoding="utf-8") as base:
+        cur_rows, base_rows = _turn_rows(cur), _turn_rows(base)
+        c, b = next(cur_rows, None), next(base_rows, None)
+        while c is not None or b is not None:
+            if b is None or (c is not None and c[0] < b[0]):
+                extra_turns += 1
+                c = next(cur_rows, None)
+                continue
+            if c is None or b[0] < c[0]:
+                missing_turns += 1
+                b = next(base_rows, None)
+                continue
+            turns += 1
+            turn_changed = False
+            for field, after, before in zip(("intent", "state", "action"), c[1], b[1]):
+                if after != before:
+                    changed[field][f"{before} -> {after}"] += 1
+                    turn_changed = True
+            changed_turns += turn_changed
+            c, b = next(cur_rows, None), next(base_rows, None)
+    changed_turns += missing_turns + extra_turns
+    total = turns + missing_turns + extra_turns
+    return {
+        "turns": turns,
+        "baseline_turns": turns + missing_turns,
+        "current_turns": turns + extra_turns,
+        "missing_turns": missing_turns,
+        "extra_turns": extra_turns,
+        "changed_turns": changed_turns,
+        "changed_pct": round(changed_turns / total * 100, 2) if total else 0.0,
+        **{field: dict(counter.most_common(top)) for field, counter in changed.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay chat_messages through the reasoning engine")
+    parser.add_argument("--db", required=True, help="SQLAlchemy database URL")
+    parser.add_argument("--engine", default=DEFAULT_ENGINE, help="module:factory building the engine")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--chunk-turns", type=int, default=2000)
+    parser.add_argument("--limit", type=int, help="replay at most this many user turns")
+    parser.add_argument("--out", help="write the distributions (JSON)")
+    parser.add_argument("--turns-out", help="write per-turn outcomes (TSV)")
+    parser.add_argument("--baseline", help="distributions JSON of a baseline build")
+    parser.add_argument("--baseline-turns", help="per-turn TSV of a baseline build")
+    args = parser.parse_args()
+
+    summary = replay(
+        stream_sessions(args.db, limit=args.limit),
+        engine_spec=args.engine,
+        workers=args.workers,
+        chunk_turns=args.chunk_turns,
+        turns_out=args.turns_out,
+    )
+    report: Dict[str, Any] = {"summary": summary}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        report["diff"] = diff_distributions(summary, baseline.get("summary", baseline))
+    if args.baseline_turns and args.turns_out:
+        report["turn_diff"] = diff_turns(args.turns_out, args.baseline_turns)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,23 +3,39 @@ Safety utilities: input normalisation & basic profanity filtering.
 """
 
 import re
+from typing import Tuple
 
 
 PROFANITY = [
     "fuck", "shit", "bastard", "asshole",
 ]
 
+_WHITESPACE_RE = re.compile(r"\s+")
+_PROFANITY_RES = [(bad, re.compile(bad, re.IGNORECASE)) for bad in PROFANITY]
 
-def sanitize_input(text: str) -> str:
+
+def sanitize_and_lower(text: str) -> Tuple[str, str]:
+    """
+    sanitize_input() that also returns the lowercased result,
+    so the pipeline only lowercases a message once.
+    """
     if not text:
-        return ""
+        return "", ""
     t = text.strip()
     # Normalise whitespace
-    t = re.sub(r"\s+", " ", t)
+    t = _WHITESPACE_RE.sub(" ", t)
 
     lower = t.lower()
-    for bad in PROFANITY:
+    replaced = False
+    for bad, pattern in _PROFANITY_RES:
         if bad in lower:
-            t = re.sub(bad, "***", t, flags=re.IGNORECASE)
+            t = pattern.sub("***", t)
+            replaced = True
+
+    if replaced:
+        lower = t.lower()
+    return t, lower
 
-    return t
+
+def sanitize_input(text: str) -> str:
+    return sanitize_and_lower(text)[0]
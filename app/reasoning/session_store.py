@@ -0,0 +1,307 @@
+"""
+ARE-3.x Session Store
+Where SessionMemory lives between turns.
+
+Backends:
+- InMemorySessionStore: per-process, bounded (single worker, dev)
+- SQLiteSessionStore: shared file, all workers on one host
+- RedisSessionStore: any redis-py compatible client, across hosts
+- CachedSessionStore: local read-through cache in front of a shared backend
+
+Shared backends keep SessionMemory.to_bytes() payloads with a per-key TTL.
+A payload that no longer decodes (corrupt, or an older wire version during
+a rolling deploy) is logged, deleted and read as a miss, so the session
+starts over instead of failing every turn until it expires.
+They also hold small published values every worker polls (publish() /
+published()), e.g. the active intent registry version.
+"""
+
+import logging
+import os
+import sqlite3
+import struct
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from .memory import SessionMemory
+from ..utils.session_lifecycle import SessionLifecycle, register_sweepable
+
+
+DEFAULT_TTL = 24 * 3600
+
+logger = logging.getLogger(__name__)
+
+
+class SessionStore(ABC):
+    """
+    Interface for session backends.
+    get() returns None for missing or expired sessions.
+    `shared` backends are seen by every worker; only they keep published values.
+    """
+
+    shared = True
+
+    def __init__(self, ttl: float = DEFAULT_TTL):
+        self.ttl = ttl
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[SessionMemory]:
+        ...
+
+    @abstractmethod
+    def put(self, session: SessionMemory) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        ...
+
+    def get_or_create(self, session_id: str) -> SessionMemory:
+        """
+        Load a session, or start a fresh one.
+        New sessions are only stored once put() is called after the turn.
+        """
+        session = self.get(session_id)
+        if session is None:
+            session = SessionMemory(session_id=session_id)
+        return session
+
+    def _decode(self, session_id: str, data: bytes) -> Optional[SessionMemory]:
+        """from_bytes(), or None (key deleted) for a payload that does not decode."""
+        try:
+            return SessionMemory.from_bytes(data)
+        except (ValueError, struct.error) as exc:
+            logger.warning("dropping undecodable session %.100r: %s", session_id, exc)
+            self.delete(session_id)
+            return None
+
+    def publish(self, key: str, value: bytes) -> None:
+        """Store a value for every worker to read (no expiry)."""
+
+    def published(self, key: str) -> Optional[bytes]:
+        return None
+
+
+class InMemorySessionStore(SessionStore):
+    """
+    Per-process store on a SessionLifecycle: `ttl` is the idle timeout,
+    plus an LRU entry cap and an approximate memory ceiling.
+    """
+
+    shared = False
+
+    def __init__(
+        self,
+        ttl: float = DEFAULT_TTL,
+        max_entries: int = 100000,
+        max_bytes: Optional[int] = None,
+    ):
+        super().__init__(ttl)
+        self._items = SessionLifecycle(
+            "reason", idle_ttl=ttl, max_entries=max_entries, max_bytes=max_bytes,
+        )
+
+    def get(self, session_id: str) -> Optional[SessionMemory]:
+        return self._items.get(session_id)
+
+    def put(self, session: SessionMemory) -> None:
+        self._items.put(session.session_id, session)
+
+    def delete(self, session_id: str) -> None:
+        self._items.pop(session_id)
+
+    def stats(self):
+        return self._items.stats()
+
+    def __len__(self):
+        return len(self._items)
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    One row per session in a shared SQLite file (WAL mode),
+    so every uvicorn worker on the host sees the same state.
+    Expired rows are purged by the session sweeper (start_sweeper()).
+    """
+
+    def __init__(self, path: str, ttl: float = DEFAULT_TTL):
+        super().__init__(ttl)
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS reason_sessions ("
+            " session_id TEXT PRIMARY KEY,"
+            " data BLOB NOT NULL,"
+            " expires_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS reason_sessions_expires ON reason_sessions (expires_at)")
+        conn.execute("CREATE TABLE IF NOT EXISTS reason_published (key TEXT PRIMARY KEY, value BLOB NOT NULL)")
+        conn.commit()
+        register_sweepable(self)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, session_id: str) -> Optional[SessionMemory]:
+        row = self._conn().execute(
+            "SELECT data, expires_at FROM reason_sessions WHERE session_id = ?",
+            (session_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        data, expires_at = row
+        if expires_at < time.time():
+            self.delete(session_id)
+            return None
+        return self._decode(session_id, data)
+
+    def put(self, session: SessionMemory) -> None:
+        self._conn().execute(
+            "INSERT OR REPLACE INTO reason_sessions (session_id, data, expires_at) VALUES (?, ?, ?)",
+            (session.session_id, session.to_bytes(), time.time() + self.ttl),
+        )
+
+    def delete(self, session_id: str) -> None:
+        self._conn().execute("DELETE FROM reason_sessions WHERE session_id = ?", (session_id,))
+
+    def publish(self, key: str, value: bytes) -> None:
+        self._conn().execute("INSERT OR REPLACE INTO reason_published (key, value) VALUES (?, ?)", (key, value))
+
+    def published(self, key: str) -> Optional[bytes]:
+        row = self._conn().execute("SELECT value FROM reason_published WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def purge_expired(self) -> int:
+        cur = self._conn().execute("DELETE FROM reason_sessions WHERE expires_at < ?", (time.time(),))
+        return cur.rowcount
+
+    def sweep(self) -> int:
+        return self.purge_expired()
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Works with any client exposing redis-py's get / set(ex=) / delete.
+    Expiry is left to Redis.
+    """
+
+    def __init__(
+        self, client, ttl: float = DEFAULT_TTL, prefix: str = "are:session:", published_prefix: str = "are:published:",
+    ):
+        super().__init__(ttl)
+        self.client = client
+        self.prefix = prefix
+        self.published_prefix = published_prefix
+
+    def get(self, session_id: str) -> Optional[SessionMemory]:
+        data = self.client.get(self.prefix + session_id)
+        if data is None:
+            return None
+        return self._decode(session_id, data)
+
+    def put(self, session: SessionMemory) -> None:
+        self.client.set(self.prefix + session.session_id, session.to_bytes(), ex=int(self.ttl))
+
+    def delete(self, session_id: str) -> None:
+        self.client.delete(self.prefix + session_id)
+
+    def publish(self, key: str, value: bytes) -> None:
+        self.client.set(self.published_prefix + key, value)
+
+    def published(self, key: str) -> Optional[bytes]:
+        return self.client.get(self.published_prefix + key)
+
+
+class CachedSessionStore(SessionStore):
+    """
+    Read-through / write-through local cache in front of a shared backend.
+
+    Cached entries are trusted for `cache_ttl` seconds; keep this shorter
+    than the gap between two turns of one conversation, otherwise a turn
+    served by another worker could be missed.
+    """
+
+    def __init__(self, backend: SessionStore, cache_ttl: float = 1.0, max_entries: int = 10000):
+        super().__init__(backend.ttl)
+        self.backend = backend
+        self.shared = backend.shared
+        self.cache_ttl = cache_ttl
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[str, Tuple[float, SessionMemory]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, session: SessionMemory):
+        with self._lock:
+            self._cache[session.session_id] = (time.monotonic() + min(self.cache_ttl, self.ttl), session)
+            self._cache.move_to_end(session.session_id)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def get(self, session_id: str) -> Optional[SessionMemory]:
+        with self._lock:
+            item = self._cache.get(session_id)
+            if item is not None and item[0] >= time.monotonic():
+                return item[1]
+
+        session = self.backend.get(session_id)
+        if session is not None:
+            self._remember(session)
+        return session
+
+    def put(self, session: SessionMemory) -> None:
+        self.backend.put(session)
+        self._remember(session)
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._cache.pop(session_id, None)
+        self.backend.delete(session_id)
+
+    def publish(self, key: str, value: bytes) -> None:
+        self.backend.publish(key, value)
+
+    def published(self, key: str) -> Optional[bytes]:
+        return self.backend.published(key)
+
+
+def make_session_store(url: Optional[str] = None, ttl: Optional[float] = None) -> SessionStore:
+    """
+    Build a store from a URL (default: REASON_SESSION_STORE env var):
+      memory                    → InMemorySessionStore
+      sqlite:///path/to/file.db → SQLiteSessionStore + local cache
+      redis://host:port/db      → RedisSessionStore + local cache (needs `redis`)
+    """
+    url = url or os.getenv("REASON_SESSION_STORE", "memory")
+    ttl = ttl if ttl is not None else float(os.getenv("REASON_SESSION_TTL", DEFAULT_TTL))
+    cache_ttl = float(os.getenv("REASON_SESSION_CACHE_TTL", "1.0"))
+
+    if url == "memory":
+        return InMemorySessionStore(
+            ttl=ttl,
+            max_entries=int(os.getenv("REASON_SESSION_MAX_ENTRIES", "100000")),
+            max_bytes=int(os.getenv("REASON_SESSION_MAX_MB", "512")) * 1024 * 1024,
+        )
+
+    if url.startswith("sqlite:///"):
+        backend = SQLiteSessionStore(url[len("sqlite:///"):], ttl=ttl)
+        return CachedSessionStore(backend, cache_ttl=cache_ttl)
+
+    if url.startswith(("redis://", "rediss://")):
+        try:
+            import redis
+        except ImportError as exc:
+            raise RuntimeError("REASON_SESSION_STORE=redis:// needs the 'redis' package") from exc
+        backend = RedisSessionStore(redis.Redis.from_url(url), ttl=ttl)
+        return CachedSessionStore(backend, cache_ttl=cache_ttl)
+
+    raise ValueError(f"Unsupported session store URL: {url}")
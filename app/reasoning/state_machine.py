@@ -2,26 +2,150 @@
 ARE-3.5 State Machine
 Deterministic conversation flow controller.
 Prevents loops, handles escalation, and guides user into correct domain.
+
+Transitions are declared in TRANSITION_RULES as ordered
+(state, intent, message_type, frustration band) patterns, "*" matching
+anything; the first matching rule wins. At import the rules are expanded
+into one dict over every key, validated (unknown names, shadowed rules,
+unreachable states), so transition() is a single lookup plus the rule's
+effect on the session.
 """
 
-from typing import Dict
+from itertools import product
+from typing import Dict, List, Optional, Tuple
+
+from .registry import INTENT_REGISTRY
+
+
+VALID_STATES = (
+    "unknown",
+    "new_project",
+    "existing_system",
+    "careers",
+    "pricing_engine",
+    "data_platform",
+    "contact_human",
+    "handoff_ready",
+)
+
+MESSAGE_TYPES = ("normal", "confused", "insult", "trust", "meta")
+
+# frustration_level → band; "high" escalates
+FRUSTRATION_BANDS = ("calm", "tense", "high")
+
+
+def frustration_band(level: int) -> str:
+    if level >= 4:
+        return "high"
+    if level >= 2:
+        return "tense"
+    return "calm"
+
+
+# Any value outside the declared sets (e.g. a raw state decoded from an
+# older session) is looked up as OTHER, which only wildcards match.
+OTHER = "<other>"
+
+# Effects:
+#   ("goto", state)  → state
+#   ("lane", state)  → enter a domain lane: mode + goal = state, clarifier reset
+#   ("clarify", None)→ clarifier loop += 1; back to the lane if any,
+#                      handoff_ready after 2 loops, otherwise unknown
+#   ("keep", None)   → stay in the current lane if any, otherwise unknown
+# A clarify on an unscored turn (analysis["unscored"]: the turn budget ran
+# out before scoring) is applied as keep: the user was not misunderstood.
+Key = Tuple[str, str, str, str]
+Effect = Tuple[str, Optional[str]]
+
+TRANSITION_RULES: List[Tuple[Key, Effect]] = [
+    # Hard escalation triggers
+    (("*", "contact_human", "*", "*"), ("goto", "contact_human")),
+    (("*", "*", "*", "high"), ("goto", "handoff_ready")),
+    # Direct intent → lane
+    (("*", "new_project", "*", "*"), ("lane", "new_project")),
+    (("*", "existing_system", "*", "*"), ("lane", "existing_system")),
+    (("*", "careers", "*", "*"), ("lane", "careers")),
+    (("*", "pricing_engine", "*", "*"), ("lane", "pricing_engine")),
+    (("*", "data_platform", "*", "*"), ("lane", "data_platform")),
+    # Unknown intent: clarify, escalate after repeated loops
+    (("*", "unknown", "*", "*"), ("clarify", None)),
+    # Meta / confusion / insults / anything else: hold the lane
+    (("*", "*", "*", "*"), ("keep", None)),
+]
+
+
+# -----------------------------
+# Compilation
+# -----------------------------
+def _compile_rules(rules: List[Tuple[Key, Effect]], intents: Tuple[str, ...]) -> Dict[Key, Effect]:
+    """
+    Expand the rules over every (state, intent, message_type, band) key.
+    Raises ValueError on unknown names, rules that never fire, or valid
+    states no rule can lead to.
+    """
+    axes = (
+        VALID_STATES + (OTHER,),
+        intents + (OTHER,),
+        MESSAGE_TYPES + (OTHER,),
+        FRUSTRATION_BANDS,
+    )
+    effects = {"goto", "lane", "clarify", "keep"}
+
+    for pattern, (effect, target) in rules:
+        for value, axis in zip(pattern, axes):
+            if value != "*" and value not in axis:
+                raise ValueError(f"Unknown value '{value}' in transition rule {pattern}")
+        if effect not in effects:
+            raise ValueError(f"Unknown effect '{effect}' in transition rule {pattern}")
+        if (target is None) != (effect in ("clarify", "keep")) or (target and target not in VALID_STATES):
+            raise ValueError(f"Bad target '{target}' for effect '{effect}' in transition rule {pattern}")
+
+    table: Dict[Key, Effect] = {}
+    fired = set()
+    for key in product(*axes):
+        for i, (pattern, effect) in enumerate(rules):
+            if all(p == "*" or p == k for p, k in zip(pattern, key)):
+                table[key] = effect
+                fired.add(i)
+                break
+        else:
+            raise ValueError(f"No transition rule covers {key}")
+
+    for i, (pattern, _) in enumerate(rules):
+        if i not in fired:
+            raise ValueError(f"Transition rule {pattern} is shadowed by earlier rules")
+
+    lanes = {target for effect, target in table.values() if effect == "lane"}
+    reachable = {target for effect, target in table.values() if effect in ("goto", "lane")}
+    for effect, _ in table.values():
+        if effect == "clarify":
+            reachable |= lanes | {"unknown", "handoff_ready"}
+        elif effect == "keep":
+            reachable |= lanes | {"unknown"}
+    unreachable = set(VALID_STATES) - reachable
+    if unreachable:
+        raise ValueError(f"Unreachable states: {sorted(unreachable)}")
+
+    return table
+
+
+_INTENTS = tuple(INTENT_REGISTRY.keys())
+_TABLE = _compile_rules(TRANSITION_RULES, _INTENTS)
+_STATE_AXIS = frozenset(VALID_STATES)
+_INTENT_AXIS = frozenset(_INTENTS)
+_TYPE_AXIS = frozenset(MESSAGE_TYPES)
+_STATE_INDEX = {state: i for i, state in enumerate(VALID_STATES + (OTHER,))}
 
 
 class StateMachine:
 
-    VALID_STATES = {
-        "unknown",
-        "new_project",
-        "existing_system",
-        "careers",
-        "pricing_engine",
-        "data_platform",
-        "contact_human",
-        "handoff_ready",
-    }
+    VALID_STATES = set(VALID_STATES)
 
     def __init__(self):
-        pass
+        # Observed (from, to) counts, flattened row-major over _STATE_INDEX.
+        # Increments are unlocked: a concurrent update can very rarely be
+        # lost, which is fine for tuning stats and keeps transition() lock-free.
+        self._counts = [0] * (len(_STATE_INDEX) ** 2)
 
     def transition(self, current: str, intent: str, analysis: Dict, session) -> str:
         """
@@ -31,57 +155,50 @@ class StateMachine:
         - user tone/frustration
         - message type
         """
-
         message_type = analysis.get("message_type")
-
-        # Hard escalation triggers
-        if intent == "contact_human":
-            return "contact_human"
-
-        if session.frustration_level >= 4:
-            return "handoff_ready"
-
-        # Direct intent → state mapping
-        direct_map = {
-            "new_project": "new_project",
-            "existing_system": "existing_system",
-            "careers": "careers",
-            "pricing_engine": "pricing_engine",
-            "data_platform": "data_platform",
-        }
-
-        if intent in direct_map:
-            session.mode = direct_map[intent]
+        key = (
+            current if current in _STATE_AXIS else OTHER,
+            intent if intent in _INTENT_AXIS else OTHER,
+            message_type if message_type in _TYPE_AXIS else OTHER,
+            frustration_band(session.frustration_level),
+        )
+        effect, target = _TABLE[key]
+        if effect == "clarify" and analysis.get("unscored"):
+            effect = "keep"
+
+        if effect == "goto":
+            next_state = target
+        elif effect == "lane":
+            session.mode = target
             session.set_goal(intent)
             session.reset_clarifier()
-            return direct_map[intent]
-
-        # Unknown intent handling
-        if intent == "unknown":
+            next_state = target
+        elif effect == "clarify":
             loops = session.increment_clarifier()
-
             if session.mode:
-                return session.mode
-
-            if loops >= 2:
-                return "handoff_ready"
-
-            return "unknown"
-
-        # Meta / confusion
-        if message_type in ["confused", "meta"]:
-            if session.mode:
-                return session.mode
-            return "unknown"
-
-        # Insults
-        if message_type == "insult":
-            if session.mode:
-                return session.mode
-            return "unknown"
-
-        # Default fallback
-        if session.mode:
-            return session.mode
-
-        return "unknown"
+                next_state = session.mode
+            elif loops >= 2:
+                next_state = "handoff_ready"
+            else:
+                next_state = "unknown"
+        else:
+            next_state = session.mode or "unknown"
+
+        size = len(_STATE_INDEX)
+        self._counts[_STATE_INDEX.get(key[0]) * size + _STATE_INDEX.get(next_state, size - 1)] += 1
+        return next_state
+
+    def transition_matrix(self) -> Dict[str, Dict[str, int]]:
+        """Observed transitions since start: {from_state: {to_state: count}} (non-zero only)."""
+        states = list(_STATE_INDEX)
+        size = len(states)
+        counts = list(self._counts)
+        matrix: Dict[str, Dict[str, int]] = {}
+        for i, src in enumerate(states):
+            row = {dst: counts[i * size + j] for j, dst in enumerate(states) if counts[i * size + j]}
+            if row:
+                matrix[src] = row
+        return matrix
+
+    def reset_counts(self):
+        self._counts = [0] * len(self._counts)
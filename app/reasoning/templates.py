@@ -4,7 +4,7 @@ Unified structures for engine responses.
 """
 
 from dataclasses import dataclass, field
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 
 @dataclass
@@ -23,3 +23,12 @@ class SystemResponse:
     action_payload: Dict[str, Any]
     bot_reply: str
     meta: Dict[str, Any] = field(default_factory=dict)
+    registry_version: Optional[str] = None
+
+
+@dataclass
+class Turn:
+    session_id: str
+    message: str
+    page: str = "/"
+    option_id: Optional[str] = None
@@ -0,0 +1,251 @@
+"""
+Bounded, self-expiring session maps.
+
+SessionLifecycle is a dict-like map with:
+- idle TTL (entries not touched for `idle_ttl` seconds expire)
+- max-entries LRU cap
+- approximate memory ceiling (LRU eviction until under `max_bytes`)
+- eviction / occupancy counters
+
+Every instance registers itself so one background sweeper thread can
+expire idle entries for all of them, and lifecycle_stats() can report
+them together. Other expiring stores (e.g. the shared SQLite session
+table) join the same sweep through register_sweepable().
+"""
+
+import itertools
+import logging
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict, defaultdict, deque
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+_LEAVES = (str, bytes, bytearray, int, float, complex, bool, type(None))
+_CONTAINERS = (list, tuple, set, frozenset, deque)
+
+
+def approx_sizeof(obj: Any, max_depth: int = 4) -> int:
+    """
+    Size of an object plus what it references (attributes, container
+    items, dict keys / values), down to `max_depth` levels; an object
+    reached twice is counted once.
+    """
+    seen = set()
+
+    def walk(value: Any, depth: int) -> int:
+        if id(value) in seen:
+            return 0
+        seen.add(id(value))
+        size = sys.getsizeof(value)
+        if depth >= max_depth or isinstance(value, _LEAVES):
+            return size
+        if isinstance(value, dict):
+            children = itertools.chain(value.keys(), value.values())
+        elif isinstance(value, _CONTAINERS):
+            children = value
+        else:
+            attrs = getattr(value, "__dict__", None)
+            if attrs is not None:
+                size += sys.getsizeof(attrs)
+                children = attrs.values()
+            else:
+                slots = getattr(type(value), "__slots__", ())
+                if isinstance(slots, str):
+                    slots = (slots,)
+                children = [getattr(value, name, None) for name in slots]
+        return size + sum(walk(child, depth + 1) for child in children)
+
+    return walk(obj, 0)
+
+
+_REGISTRY: "weakref.WeakSet[SessionLifecycle]" = weakref.WeakSet()
+# name → instances created so far, for unique stats keys ("reason", "reason#2", ...)
+_NAME_COUNTS: Dict[str, int] = defaultdict(int)
+_NAME_LOCK = threading.Lock()
+# objects with a sweep() method, swept on the same thread
+_SWEEPABLE: "weakref.WeakSet[Any]" = weakref.WeakSet()
+
+logger = logging.getLogger(__name__)
+
+
+def register_sweepable(obj: Any) -> None:
+    """Call obj.sweep() on every sweeper pass (held weakly)."""
+    _SWEEPABLE.add(obj)
+
+
+class SessionLifecycle:
+
+    def __init__(
+        self,
+        name: str,
+        idle_ttl: float = 1800.0,
+        max_entries: int = 50000,
+        max_bytes: Optional[int] = None,
+        sizeof: Callable[[Any], int] = approx_sizeof,
+    ):
+        self.name = name
+        with _NAME_LOCK:
+            _NAME_COUNTS[name] += 1
+            count = _NAME_COUNTS[name]
+        # lifecycle_stats() key; unique even when several maps share a name
+        self.key = name if count == 1 else f"{name}#{count}"
+        self.idle_ttl = idle_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+
+        # key → (last_seen, size, value); order = least → most recently used
+        self._items: "OrderedDict[Hashable, list]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = {"idle": 0, "lru": 0, "memory": 0}
+
+        _REGISTRY.add(self)
+
+    # -----------------------------
+    # Map API
+    # -----------------------------
+    def get(self, key: Hashable) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            if now - item[0] > self.idle_ttl:
+                self._remove(key)
+                self.evictions["idle"] += 1
+                self.misses += 1
+                return None
+            item[0] = now
+            self._items.move_to_end(key)
+            # refresh the size estimate; values are mutated in place between turns,
+            # so the byte ceiling is enforced here too, not only on put()
+            self._resize(item, self._sizeof(item[2]))
+            self._enforce_limits()
+            self.hits += 1
+            return item[2]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        size = self._sizeof(value)
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self._items[key] = [time.monotonic(), size, value]
+                self._bytes += size
+            else:
+                item[0] = time.monotonic()
+                item[2] = value
+                self._resize(item, size)
+                self._items.move_to_end(key)
+            self._enforce_limits()
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return default
+            self._remove(key)
+            return item[2]
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    # -----------------------------
+    # Eviction
+    # -----------------------------
+    def _resize(self, item: list, size: int):
+        self._bytes += size - item[1]
+        item[1] = size
+
+    def _remove(self, key: Hashable):
+        item = self._items.pop(key)
+        self._bytes -= item[1]
+
+    def _enforce_limits(self):
+        while len(self._items) > self.max_entries:
+            key = next(iter(self._items))
+            self._remove(key)
+            self.evictions["lru"] += 1
+        if self.max_bytes is not None:
+            while self._bytes > self.max_bytes and len(self._items) > 1:
+                key = next(iter(self._items))
+                self._remove(key)
+                self.evictions["memory"] += 1
+
+    def sweep(self) -> int:
+        """Expire idle entries. LRU order means we can stop at the first live one."""
+        now = time.monotonic()
+        removed = 0
+        with self._lock:
+            while self._items:
+                key, item = next(iter(self._items.items()))
+                if now - item[0] <= self.idle_ttl:
+                    break
+                self._remove(key)
+                removed += 1
+            self.evictions["idle"] += removed
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._items),
+                "max_entries": self.max_entries,
+                "approx_bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "idle_ttl": self.idle_ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": dict(self.evictions),
+            }
+
+
+# -----------------------------
+# Shared sweeper
+# -----------------------------
+_sweeper: Optional[threading.Thread] = None
+_sweeper_stop = threading.Event()
+
+
+def _sweep_loop(interval: float):
+    while not _sweeper_stop.wait(interval):
+        for lifecycle in list(_REGISTRY):
+            lifecycle.sweep()
+        for obj in list(_SWEEPABLE):
+            try:
+                obj.sweep()
+            except Exception:
+                # a shared backend being unavailable must not stop the sweeper
+                logger.exception("sweep failed for %r", obj)
+
+
+def start_sweeper(interval: float = 30.0) -> None:
+    global _sweeper
+    if _sweeper is not None and _sweeper.is_alive():
+        return
+    _sweeper_stop.clear()
+    _sweeper = threading.Thread(target=_sweep_loop, args=(interval,), name="session-sweeper", daemon=True)
+    _sweeper.start()
+
+
+def stop_sweeper() -> None:
+    global _sweeper
+    _sweeper_stop.set()
+    if _sweeper is not None:
+        _sweeper.join(timeout=5.0)
+    _sweeper = None
+
+
+def lifecycle_stats() -> Dict[str, Dict[str, Any]]:
+    return {lifecycle.key: lifecycle.stats() for lifecycle in list(_REGISTRY)}
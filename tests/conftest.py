@@ -0,0 +1,32 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.chat_persistence import ChatMessageWriter
+from app.models import ChatMessage
+
+
+@pytest.fixture
+def session_factory():
+  # one shared in-memory database, usable from the writer thread
+  engine = create_engine(
+    "sqlite://",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+  )
+  ChatMessage.__table__.create(engine)
+  yield sessionmaker(bind=engine, autoflush=False, autocommit=False)
+  engine.dispose()
+
+
+@pytest.fixture
+def client(session_factory, monkeypatch):
+  # a plain import: if the app cannot be imported, these tests fail rather than skip
+  import app.main as main
+  from fastapi.testclient import TestClient
+
+  writer = ChatMessageWriter(session_factory, batch_size=1000, flush_interval=60)
+  monkeypatch.setattr(main, "chat_writer", writer)
+  yield TestClient(main.app), writer
+  writer.stop()
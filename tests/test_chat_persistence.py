@@ -0,0 +1,143 @@
+import datetime as dt
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from app.chat_persistence import ChatMessageWriter
+from app.models import ChatMessage
+
+
+def _rows(session_factory):
+  with session_factory() as db:
+    return db.execute(
+      select(ChatMessage.session_id, ChatMessage.sender, ChatMessage.message).order_by(ChatMessage.id)
+    ).all()
+
+
+def test_rows_land(session_factory):
+  writer = ChatMessageWriter(session_factory, batch_size=2, flush_interval=0.05)
+  writer.enqueue("s1", "user", "hello")
+  writer.enqueue("s1", "assistant", "hi there")
+  writer.stop()
+
+  assert _rows(session_factory) == [("s1", "user", "hello"), ("s1", "assistant", "hi there")]
+  assert writer.rows_written == 2
+  assert writer.rows_failed == 0
+
+
+def test_stop_flushes_pending_rows(session_factory):
+  # batch and interval too large for the background thread to flush on its own
+  writer = ChatMessageWriter(session_factory, batch_size=1000, flush_interval=60)
+  writer.enqueue_many([(f"s{i}", "user", f"message {i}") for i in range(25)])
+  assert writer.pending() == 25
+
+  writer.stop()
+
+  assert writer.pending() == 0
+  assert len(_rows(session_factory)) == 25
+
+
+def test_bad_row_does_not_lose_its_batch(session_factory):
+  writer = ChatMessageWriter(session_factory, batch_size=1000, flush_interval=60)
+  writer.enqueue("s1", "user", "first")
+  writer.enqueue("s2", None, "sender is NOT NULL")
+  writer.enqueue("s3", "user", "third")
+  writer.stop()
+
+  assert _rows(session_factory) == [("s1", "user", "first"), ("s3", "user", "third")]
+  assert writer.rows_written == 2
+  assert writer.rows_failed == 1
+  assert [row["session_id"] for row in writer.dead_letters] == ["s2"]
+
+
+@pytest.fixture
+def unreachable_factory(tmp_path):
+  # sqlite cannot open a file in a missing directory: OperationalError on connect
+  engine = create_engine(f"sqlite:///{tmp_path / 'missing' / 'chat.db'}")
+  yield sessionmaker(bind=engine)
+  engine.dispose()
+
+
+def test_unreachable_database_keeps_rows_queued(session_factory, unreachable_factory):
+  writer = ChatMessageWriter(unreachable_factory, batch_size=1000, flush_interval=60, retry_base=60)
+  writer.enqueue_many([("s1", "user", "one"), ("s1", "assistant", "two")])
+
+  assert writer.flush() == 0
+  assert writer.pending() == 2
+  assert writer.rows_failed == 0
+  assert list(writer.dead_letters) == []
+  # backing off: no new attempt until the delay has passed
+  assert writer.flush() == 0
+
+  writer._session_factory = session_factory
+  writer.stop()
+
+  assert _rows(session_factory) == [("s1", "user", "one"), ("s1", "assistant", "two")]
+  assert writer.rows_dropped == 0
+
+
+def test_queue_cap_counts_dropped_rows(unreachable_factory):
+  writer = ChatMessageWriter(unreachable_factory, batch_size=1000, flush_interval=60, max_queued=2, retry_base=60)
+  writer.enqueue_many([("s1", "user", "one"), ("s1", "assistant", "two"), ("s1", "user", "three")])
+
+  assert writer.pending() == 2
+  assert writer.rows_dropped == 1
+
+  writer.stop()
+  assert writer.rows_dropped == 3
+
+
+def test_rows_keep_enqueue_order_timestamps(session_factory):
+  writer = ChatMessageWriter(session_factory, batch_size=1000, flush_interval=60)
+  writer.enqueue("s1", "user", "one")
+  writer.enqueue("s1", "assistant", "two")
+  writer.stop()
+
+  with session_factory() as db:
+    stamps = db.execute(select(ChatMessage.created_at).order_by(ChatMessage.id)).scalars().all()
+  assert stamps[0] <= stamps[1]
+
+
+def test_enqueue_many_orders_same_stamp_rows(session_factory):
+  writer = ChatMessageWriter(session_factory, batch_size=1000, flush_interval=60)
+  at = dt.datetime(2026, 1, 1, tzinfo=dt.timezone.utc)
+  writer.enqueue_many([
+    ("s1", "user", "one", at),
+    ("s2", "user", "other", at),
+    ("s1", "assistant", "two", at),
+    ("s1", "user", "three"),
+  ])
+  writer.stop()
+
+  with session_factory() as db:
+    stamps = db.execute(
+      select(ChatMessage.created_at).where(ChatMessage.session_id == "s1").order_by(ChatMessage.id)
+    ).scalars().all()
+  assert stamps[0] < stamps[1] < stamps[2]
+
+
+# -----------------------------
+# /reason/chat-route
+# -----------------------------
+def test_chat_route_persists_both_turns(client, session_factory):
+  http, writer = client
+  response = http.post("/reason/chat-route", json={"session_id": "route-1", "message": "I want to build an app"})
+  assert response.status_code == 200
+  reply = response.json()["bot_reply"]
+
+  writer.stop()
+
+  assert _rows(session_factory) == [
+    ("route-1", "user", "I want to build an app"),
+    ("route-1", "assistant", reply),
+  ]
+
+
+def test_chat_route_rejects_long_session_id(client, session_factory):
+  http, writer = client
+  response = http.post("/reason/chat-route", json={"session_id": "x" * 101, "message": "hello"})
+  assert response.status_code == 400
+
+  writer.stop()
+  assert _rows(session_factory) == []
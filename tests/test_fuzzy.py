@@ -0,0 +1,29 @@
+from app.reasoning.bench import FUZZY_CASES
+from app.reasoning.classifier import current_registry
+from app.reasoning.fuzzy import FuzzyIndex
+from app.reasoning.utils import normalize
+
+
+def test_typos_match():
+  index = current_registry()["fuzzy_index"]
+  assert index.search("contcat") == {"contact"}
+  assert index.search("maintainance") == {"maintenance"}
+  assert index.search("our legasy app keeps crashing") == {"legacy"}
+
+
+def test_short_keyword_takes_one_typo_only():
+  index = FuzzyIndex(["contact", "pricing", "career", "maintenance"])
+  # dropped or doubled letters
+  assert index.search("pricng") == {"pricing"}
+  assert index.search("what is your priccing") == {"pricing"}
+  # real words one edit away
+  assert index.search("we need a contract drafted") == set()
+  assert index.search("contract") == set()
+  assert index.search("i am a carer") == set()
+  # longer keywords still take any insertion / deletion
+  assert index.search("maintenence please") == {"maintenance"}
+
+
+def test_bench_cases():
+  index = current_registry()["fuzzy_index"]
+  assert [index.search(normalize(text)) for text, _ in FUZZY_CASES] == [expected for _, expected in FUZZY_CASES]
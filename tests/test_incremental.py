@@ -0,0 +1,121 @@
+import random
+import threading
+
+from app.reasoning.classifier import _message_hits, current_registry
+from app.reasoning.corpus import synthetic_conversations
+from app.reasoning import prepare as prepare_module
+from app.reasoning.incremental import TypingState, TypingTracker
+from app.reasoning.metrics import EVENTS
+from app.reasoning.prepare import WINDOW_TRIGGER_CHARS, clip_input, prepare_message
+
+
+def test_reuse_matches_only_the_last_draft():
+  registry = current_registry()
+  state = TypingState()
+  state.update("I want to build")
+  state.update("I want to build an app")
+
+  assert state.reuse("I want to build", registry) is None
+  prepared, hits = state.reuse("I want to build an app", registry)
+  assert prepared.text == "I want to build an app"
+  assert hits is not None
+
+
+def test_long_draft_is_clipped_like_the_submitted_message(monkeypatch):
+  monkeypatch.setattr(prepare_module, "MAX_INPUT_CHARS", 20)
+  registry = current_registry()
+  draft = "I want to build an app for my shop"
+  truncated = EVENTS.get("input_truncated")
+
+  state = TypingState()
+  for n in range(15, len(draft) + 1):
+    state.update(draft[:n])
+  assert EVENTS.get("input_truncated") == truncated
+
+  # chat-route clips (and counts) once on submit; the draft analysis still applies
+  message = clip_input(draft)
+  assert EVENTS.get("input_truncated") == truncated + 1
+  prepared, _ = state.reuse(message, registry)
+  assert prepared == prepare_message(message)
+
+
+def test_concurrent_updates_keep_one_state_per_session():
+  tracker = TypingTracker()
+  drafts = ["I need help with my existing system"[:n] for n in range(1, 35)]
+  barrier = threading.Barrier(4)
+
+  def type_draft():
+    barrier.wait()
+    for draft in drafts:
+      tracker.update("s1", draft)
+
+  threads = [threading.Thread(target=type_draft) for _ in range(4)]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+
+  state = tracker.take("s1")
+  assert state.matches(drafts[-1], current_registry())
+  assert tracker.take("s1") is None
+
+
+def test_tracker_caps_new_sessions():
+  tracker = TypingTracker(max_entries=3)
+  for i in range(10):
+    tracker.update(f"s{i}", "hello")
+
+  assert tracker.take("s0") is None
+  assert tracker.take("s9") is not None
+
+
+def _drafts(message, rng):
+  """Keystroke by keystroke, with the odd backspace and paste."""
+  draft = ""
+  for ch in message:
+    draft += ch
+    yield draft
+    roll = rng.random()
+    if roll < 0.05 and draft:
+      yield draft[:-1]
+    elif roll < 0.07:
+      yield draft + " pasted budget text"
+
+
+def _assert_full_analysis(state, draft, registry):
+  prepared, hits = state.reuse(draft, registry)
+  expected = prepare_message(draft)
+  assert prepared == expected, draft
+  if hits is not None:
+    assert hits == _message_hits(expected, registry), draft
+
+
+def test_typing_equals_full_analysis_of_every_draft():
+  registry = current_registry()
+  rng = random.Random(5)
+  messages = rng.sample(sorted({turn.message for conv in synthetic_conversations(30) for turn in conv}), 15)
+  messages += ["  I want   a new   app for my react/next.js stack!!  ", "why not vue instead of react? no thanks"]
+  for message in messages:
+    state = TypingState()
+    for draft in _drafts(message, rng):
+      state.update(draft)
+      _assert_full_analysis(state, draft, registry)
+
+
+def test_typing_equals_full_analysis_past_the_window():
+  registry = current_registry()
+  words = "we need a pricing engine for our legacy website and the budget is tight ".split()
+  message = " ".join(words[i % len(words)] for i in range(WINDOW_TRIGGER_CHARS // 4))
+  state = TypingState()
+  for cut in range(WINDOW_TRIGGER_CHARS - 50, len(message), 37):
+    state.update(message[:cut])
+    _assert_full_analysis(state, message[:cut], registry)
+
+
+def test_typing_endpoint_accepts_a_new_session(client):
+  import app.main as main
+
+  http, _ = client
+  response = http.post("/reason/typing", json={"session_id": "typing-new", "text": "I want to build an app"})
+  assert response.status_code == 200
+  assert main.reason_typing.take("typing-new") is not None
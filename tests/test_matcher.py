@@ -0,0 +1,46 @@
+import random
+
+from app.reasoning.corpus import synthetic_conversations
+from app.reasoning.matcher import PhraseMatcher
+from app.reasoning.prepare import MARKER_GROUPS, prepare_message
+from app.reasoning.registry import INTENT_REGISTRY
+
+
+PHRASES = sorted(
+  {phrase for cfg in INTENT_REGISTRY.values() for phrase in cfg["keywords"] + cfg["synonyms"]}
+  | {phrase for phrases in MARKER_GROUPS.values() for phrase in phrases}
+)
+
+
+def _texts():
+  texts = [prepare_message(turn.message).clean for conv in synthetic_conversations(100) for turn in conv]
+  # random runs of phrase fragments: overlaps, shared prefixes, partial phrases
+  rng = random.Random(3)
+  for _ in range(300):
+    parts = []
+    for phrase in rng.sample(PHRASES, 6):
+      start = rng.randrange(len(phrase))
+      parts.append(phrase[start:start + rng.randint(1, len(phrase))])
+    texts.append(rng.choice(["", " "]).join(parts))
+  return texts + ["", "a", "aaaa", "go go go "]
+
+
+def test_find_equals_substring_scan():
+  matcher = PhraseMatcher(PHRASES)
+  for text in _texts():
+    assert matcher.find(text) == {phrase for phrase in PHRASES if phrase in text}, text
+
+
+def test_resume_equals_find_at_every_split():
+  matcher = PhraseMatcher(PHRASES)
+  for text in _texts()[::10]:
+    for cut in range(len(text) + 1):
+      head, node = matcher.resume(text[:cut])
+      tail, _ = matcher.resume(text[cut:], node)
+      assert head | tail == matcher.find(text), (text, cut)
+
+
+def test_prefixes_equals_startswith():
+  matcher = PhraseMatcher(PHRASES)
+  for text in _texts():
+    assert matcher.prefixes(text) == {phrase for phrase in PHRASES if text.startswith(phrase)}, text
@@ -0,0 +1,100 @@
+import json
+import struct
+
+import pytest
+
+from app.reasoning.memory import _WIRE_HISTORY, HISTORY_TURNS, SessionMemory
+from app.reasoning.session_store import SQLiteSessionStore
+
+
+SLOTS = list(SessionMemory.__slots__)
+
+
+def _state(session):
+  return {slot: getattr(session, slot) for slot in SLOTS}
+
+
+def _sessions():
+  fresh = SessionMemory(session_id="fresh")
+  yield fresh
+
+  coded = SessionMemory(session_id="coded")
+  coded.state = "new_project"
+  coded.last_intent = "new_project"
+  coded.goal = "new_project"
+  coded.tone = "frustrated"
+  coded.last_action = "show_message"
+  coded.mode = "new_project"
+  coded.new_project_stage = "shaping"
+  coded.frustration_level, coded.rejection_count, coded.clarifier_loops = 3, 2, 1
+  coded.last_confidence = 0.8125
+  coded.record_turn("new_project", "show_message", "i want to build an app")
+  yield coded
+
+  # values outside the vocabulary travel as strings; ids may be any utf-8
+  raw = SessionMemory(session_id="séance-✓-" + "x" * 60)
+  raw.state = "raw_state"
+  raw.goal = "raw goal ünïcode"
+  raw.last_action = ""
+  raw.new_project_stage = "later"
+  yield raw
+
+  # history ring wrapped several times
+  long = SessionMemory(session_id="long")
+  for i in range(3 * HISTORY_TURNS + 3):
+    long.record_turn(("careers", "raw_intent", None)[i % 3], "show_options", f"message {i}")
+  yield long
+
+
+@pytest.mark.parametrize("session", list(_sessions()), ids=lambda s: s.session_id[:10])
+def test_wire_round_trip(session):
+  data = session.to_bytes()
+  decoded = SessionMemory.from_bytes(data)
+
+  assert _state(decoded) == _state(session)
+  assert decoded.recent_turns() == session.recent_turns()
+  assert decoded.to_bytes() == data
+
+
+def test_wire_keeps_the_newest_turns_in_order():
+  session = SessionMemory(session_id="ring")
+  for i in range(HISTORY_TURNS + 2):
+    session.record_turn("careers", "show_message", f"turn {i}")
+  turns = SessionMemory.from_bytes(session.to_bytes()).recent_turns()
+
+  assert len(turns) == HISTORY_TURNS
+  expected = SessionMemory(session_id="expected")
+  for i in range(2, HISTORY_TURNS + 2):
+    expected.record_turn("careers", "show_message", f"turn {i}")
+  assert [hash_ for _, _, hash_ in turns] == [hash_ for _, _, hash_ in expected.recent_turns()]
+
+
+def test_wire_rejects_other_versions():
+  data = bytearray(SessionMemory(session_id="v").to_bytes())
+  data[0] = 1
+  with pytest.raises(ValueError):
+    SessionMemory.from_bytes(bytes(data))
+  with pytest.raises(struct.error):
+    SessionMemory.from_bytes(b"\x02")
+
+
+def _v1_blob(session):
+  # version 1: the version 2 layout without turn_count / history
+  data = bytearray(session.to_bytes())
+  data[0] = 1
+  return bytes(data[:-(_WIRE_HISTORY.size + len(session._history))])
+
+
+@pytest.mark.parametrize("legacy", ["v1", "json"])
+def test_shared_store_restarts_sessions_in_an_old_format(legacy, tmp_path):
+  old = SessionMemory(session_id="old")
+  old.state = "careers"
+  old.record_turn("careers", "show_message", "jobs")
+  blob = _v1_blob(old) if legacy == "v1" else json.dumps(["old", "careers"]).encode()
+
+  store = SQLiteSessionStore(str(tmp_path / "sessions.db"))
+  store.put(old)
+  store._conn().execute("UPDATE reason_sessions SET data = ? WHERE session_id = 'old'", (blob,))
+
+  session = store.get_or_create("old")
+  assert (session.state, session.turn_count) == ("unknown", 0)
@@ -0,0 +1,35 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from app.reasoning.engine import ReasoningEngine
+from app.reasoning.session_store import InMemorySessionStore
+from app.reasoning.templates import Turn
+
+
+def _turns(prefix, sessions=6):
+  return [
+    Turn(session_id=f"{prefix}-{i}", message=message)
+    for i in range(sessions)
+    for message in ("I want to build an app", "what does it cost")
+  ]
+
+
+def test_turns_of_a_session_run_in_order():
+  store = InMemorySessionStore()
+  results = ReasoningEngine().process_many(_turns("order"), store.get_or_create, store.put, max_workers=3)
+
+  assert [result.session_id for result in results] == [turn.session_id for turn in _turns("order")]
+  assert all(store.get(f"order-{i}").turn_count == 2 for i in range(6))
+
+
+def test_concurrent_calls_with_different_worker_counts():
+  engine = ReasoningEngine()
+
+  def run(workers):
+    store = InMemorySessionStore()
+    turns = _turns(f"w{workers}")
+    return len(engine.process_many(turns, store.get_or_create, store.put, max_workers=workers))
+
+  with ThreadPoolExecutor(max_workers=8) as callers:
+    counts = list(callers.map(run, [2, 3, 4, 5] * 4))
+
+  assert counts == [12] * 16
@@ -0,0 +1,49 @@
+import pytest
+
+from app.reasoning.engine import ReasoningEngine
+from app.reasoning.memory import SessionMemory
+
+
+def test_click_skips_text_analysis():
+  session = SessionMemory(session_id="click-1")
+  result = ReasoningEngine().process(session, "careers", "/", option_id="careers")
+
+  assert result.intent == "careers"
+  assert result.intent_confidence == 1.0
+
+
+@pytest.mark.parametrize("option_id", [["careers"], {"id": "careers"}, 7])
+def test_engine_ignores_non_string_option_ids(option_id):
+  session = SessionMemory(session_id="click-2")
+  result = ReasoningEngine().process(session, "I am looking for a job", "/", option_id=option_id)
+  assert result.intent == "careers"
+
+
+@pytest.mark.parametrize("path", ["/reason/chat-route", "/reason/chat-route/stream"])
+def test_endpoints_reject_non_string_option_id(client, path):
+  http, writer = client
+  response = http.post(path, json={"session_id": "click-3", "message": "hi", "option_id": ["careers"]})
+
+  assert response.status_code == 400
+  assert writer.pending() == 0
+
+
+def test_batch_rejects_non_string_option_id(client):
+  http, writer = client
+  turns = [{"session_id": "click-4", "message": "hi"}, {"session_id": "click-5", "option_id": {"id": "careers"}}]
+  response = http.post("/reason/chat-route/batch", json={"turns": turns})
+
+  assert response.status_code == 400
+  assert writer.pending() == 0
+
+
+def test_ws_sends_an_error_frame_for_non_string_option_id(client):
+  http, _ = client
+  with http.websocket_connect("/reason/ws?session_id=click-6") as ws:
+    ws.receive_json()
+    ws.send_json({"type": "option", "option_id": ["careers"]})
+    assert ws.receive_json() == {"type": "error", "detail": "option_id must be a string"}
+    # the socket stays usable
+    ws.send_json({"type": "option", "option_id": "careers"})
+    assert ws.receive_json() == {"type": "typing"}
+    assert ws.receive_json()["type"] == "reply"
@@ -0,0 +1,20 @@
+from app.auth import create_access_token
+
+
+def test_chat_route_debug_needs_admin(client, monkeypatch):
+  import app.main as main
+
+  http, _ = client
+  monkeypatch.setattr(main, "REASON_DEBUG", False)
+  body = {"session_id": "debug-1", "message": "I want to build an app", "debug": True}
+
+  anonymous = http.post("/reason/chat-route", json=body).json()
+  assert anonymous["meta"] == {}
+
+  user = create_access_token({"sub": "u@example.com", "role": "User"})
+  as_user = http.post("/reason/chat-route", json=body, headers={"Authorization": f"Bearer {user}"}).json()
+  assert as_user["meta"] == {}
+
+  admin = create_access_token({"sub": "a@example.com", "role": "Admin"})
+  as_admin = http.post("/reason/chat-route", json=body, headers={"Authorization": f"Bearer {admin}"}).json()
+  assert "timings_ms" in as_admin["meta"]
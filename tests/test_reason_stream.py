@@ -0,0 +1,40 @@
+import json
+
+from sqlalchemy import select
+
+from app.models import ChatMessage
+from app.reasoning import engine as engine_module
+
+
+def _events(body):
+  events = []
+  for block in body.strip().split("\n\n"):
+    name, data = block.split("\n", 1)
+    events.append((name[len("event: "):], json.loads(data[len("data: "):])))
+  return events
+
+
+def test_route_event_comes_before_humanize_and_persistence(client, session_factory, monkeypatch):
+  import app.main as main
+
+  http, writer = client
+  calls = []
+  sse, humanize, put = main._sse, engine_module.humanize, main.REASON_SESSIONS.put
+  monkeypatch.setattr(main, "_sse", lambda event, data: calls.append(event) or sse(event, data))
+  monkeypatch.setattr(engine_module, "humanize", lambda **kw: calls.append("humanize") or humanize(**kw))
+  monkeypatch.setattr(main.REASON_SESSIONS, "put", lambda s: calls.append("put") or put(s))
+
+  response = http.post("/reason/chat-route/stream", json={"session_id": "stream-1", "message": "I want to build an app"})
+  assert response.status_code == 200
+  events = _events(response.text)
+
+  assert calls.index("route") < calls.index("humanize") < calls.index("put")
+  assert calls.index("done") < calls.index("put")
+  assert [name for name, _ in events][0] == "route" and events[-1][0] == "done"
+  reply = "".join(data["text"] for name, data in events if name == "delta")
+  assert main.REASON_SESSIONS.get("stream-1").turn_count == 1
+
+  writer.stop()
+  with session_factory() as db:
+    rows = db.execute(select(ChatMessage.sender, ChatMessage.message).where(ChatMessage.session_id == "stream-1")).all()
+  assert rows == [("user", "I want to build an app"), ("assistant", reply)]
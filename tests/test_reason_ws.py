@@ -0,0 +1,58 @@
+from app.reasoning.session_store import InMemorySessionStore, SQLiteSessionStore
+
+
+def _chat(ws, *messages):
+  assert ws.receive_json()["type"] == "session"
+  for message in messages:
+    ws.send_json({"type": "message", "message": message})
+    assert ws.receive_json() == {"type": "typing"}
+    assert ws.receive_json()["type"] == "reply"
+
+
+def _count_gets_and_puts(monkeypatch, store):
+  import app.main as main
+
+  calls = []
+  get, put = store.get, store.put
+  monkeypatch.setattr(store, "get", lambda session_id: calls.append("get") or get(session_id))
+  monkeypatch.setattr(store, "put", lambda session: calls.append(("put", session.turn_count)) or put(session))
+  monkeypatch.setattr(main, "REASON_SESSIONS", store)
+  return calls
+
+
+def test_reason_ws_turn_is_stored(client):
+  import app.main as main
+
+  http, _ = client
+  with http.websocket_connect("/reason/ws?session_id=ws-1") as ws:
+    assert ws.receive_json() == {"type": "session", "session_id": "ws-1"}
+    ws.send_json({"type": "typing", "text": "I want to build"})
+    ws.send_json({"type": "message", "message": "I want to build an app"})
+    assert ws.receive_json() == {"type": "typing"}
+    assert ws.receive_json()["type"] == "reply"
+
+  assert main.REASON_SESSIONS.get("ws-1").turn_count == 1
+
+
+def test_local_store_is_written_on_disconnect(client, monkeypatch):
+  http, _ = client
+  store = InMemorySessionStore()
+  calls = _count_gets_and_puts(monkeypatch, store)
+
+  with http.websocket_connect("/reason/ws?session_id=ws-2") as ws:
+    _chat(ws, "I want to build an app", "what does it cost")
+
+  assert calls == ["get", ("put", 2)]
+  assert store.get("ws-2").turn_count == 2
+
+
+def test_shared_store_is_written_after_every_turn(client, monkeypatch, tmp_path):
+  http, _ = client
+  store = SQLiteSessionStore(str(tmp_path / "sessions.db"))
+  calls = _count_gets_and_puts(monkeypatch, store)
+
+  with http.websocket_connect("/reason/ws?session_id=ws-3") as ws:
+    _chat(ws, "I want to build an app", "what does it cost")
+
+  assert calls == ["get", ("put", 1), ("put", 2)]
+  assert store.get("ws-3").turn_count == 2
@@ -0,0 +1,65 @@
+import copy
+
+from app.auth import create_access_token
+from app.reasoning import classifier
+from app.reasoning.registry import INTENT_REGISTRY
+from app.reasoning.session_store import InMemorySessionStore, SQLiteSessionStore
+
+
+def _registry(keyword):
+  registry = copy.deepcopy(INTENT_REGISTRY)
+  registry["careers"]["keywords"].append(keyword)
+  return registry
+
+
+def test_published_swap_reaches_other_workers(tmp_path, monkeypatch):
+  monkeypatch.setattr(classifier, "_COMPILED", classifier.current_registry())
+  path = str(tmp_path / "sessions.db")
+  serving, other = SQLiteSessionStore(path), SQLiteSessionStore(path)
+  original = classifier.current_registry()["version"]
+
+  version = classifier.publish_registry(serving, _registry("apprenticeship"))
+  assert version != original
+
+  # another worker, still on the original registry and without the disk cache
+  monkeypatch.setattr(classifier, "_COMPILED", classifier.compile_registry_cached(INTENT_REGISTRY, cache_dir=None))
+  monkeypatch.setattr(classifier, "activate_version", lambda version: False)
+  assert classifier.sync_registry(other) == version
+  assert classifier.current_registry()["version"] == version
+  assert "apprenticeship" in classifier.current_registry()["phrase_points"]
+
+  # nothing new published: no-op
+  assert classifier.sync_registry(other) is None
+
+
+def test_in_process_store_publishes_nothing(monkeypatch):
+  monkeypatch.setattr(classifier, "_COMPILED", classifier.current_registry())
+  store = InMemorySessionStore()
+  classifier.publish_registry(store, _registry("apprenticeship"))
+
+  assert not store.shared
+  assert classifier.sync_registry(store) is None
+
+
+def test_admin_reason_endpoints_need_admin_jwt(client):
+  http, _ = client
+  admin = create_access_token({"sub": "a@example.com", "role": "Admin"})
+  for path in (
+    "/admin/reason/latency", "/admin/reason/counters", "/admin/reason/transitions",
+    "/admin/reason/registry", "/admin/sessions/stats",
+  ):
+    # the X-Role header alone is not enough
+    assert http.get(path, headers={"X-Role": "admin"}).status_code != 200, path
+    assert http.get(path, headers={"Authorization": f"Bearer {admin}"}).status_code == 200, path
+
+
+def test_registry_swap_refused_across_workers_without_shared_store(client, monkeypatch):
+  import app.main as main
+
+  http, _ = client
+  monkeypatch.setattr(main, "WEB_CONCURRENCY", 4)
+  admin = create_access_token({"sub": "a@example.com", "role": "Admin"})
+  response = http.post(
+    "/admin/reason/registry", json={"registry": {}}, headers={"Authorization": f"Bearer {admin}"},
+  )
+  assert response.status_code == 409
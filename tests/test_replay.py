@@ -0,0 +1,36 @@
+from app.reasoning.replay import diff_turns
+
+
+def _tsv(path, rows):
+  path.write_text("".join("\t".join(map(str, row)) + "\n" for row in rows), encoding="utf-8")
+  return str(path)
+
+
+def test_diff_turns_counts_unmatched_turns(tmp_path):
+  baseline = _tsv(tmp_path / "old.tsv", [
+    ("a", 1, "careers", "careers", "show_message"),
+    ("a", 3, "careers", "careers", "show_message"),
+    ("b", 2, "new_project", "new_project", "show_message"),
+    ("c", 9, "unknown", "unknown", "show_options"),
+  ])
+  current = _tsv(tmp_path / "new.tsv", [
+    ("a", 1, "careers", "careers", "show_message"),
+    ("b", 2, "new_project", "new_project", "open_lab_tool"),
+    ("b", 5, "unknown", "unknown", "show_options"),
+    ("c", 9, "unknown", "unknown", "show_options"),
+  ])
+
+  diff = diff_turns(current, baseline)
+
+  assert diff["turns"] == 3
+  assert diff["missing_turns"] == 1
+  assert diff["extra_turns"] == 1
+  assert diff["changed_turns"] == 3
+  assert diff["baseline_turns"] == 4 and diff["current_turns"] == 4
+  assert diff["action"] == {"show_message -> open_lab_tool": 1}
+
+
+def test_diff_turns_compares_message_ids_as_numbers(tmp_path):
+  rows = [("a", 9, "x", "x", "x"), ("a", 10, "x", "x", "x")]
+  diff = diff_turns(_tsv(tmp_path / "new.tsv", rows), _tsv(tmp_path / "old.tsv", rows[1:]))
+  assert (diff["turns"], diff["extra_turns"], diff["missing_turns"]) == (1, 1, 0)
@@ -0,0 +1,137 @@
+import itertools
+from types import SimpleNamespace
+
+from app.reasoning.analyzer import analyze_message
+from app.reasoning.corpus import synthetic_conversations
+from app.reasoning.engine import ReasoningEngine
+from app.reasoning.memory import SessionMemory
+from app.reasoning.prepare import MARKER_GROUPS, prepare_message
+from app.reasoning.router import REPLIES, route_message
+from app.reasoning.state_machine import VALID_STATES
+
+
+def test_repeated_careers_message_gets_options():
+  engine = ReasoningEngine()
+  session = SessionMemory(session_id="repeat-1")
+
+  first = engine.process(session, "I am looking for a job", "/")
+  again = engine.process(session, "I am looking for a job", "/")
+
+  assert session.state == "careers"
+  assert first.action == "show_message"
+  assert again.action == "show_options"
+
+
+def test_different_careers_message_is_not_a_repeat():
+  engine = ReasoningEngine()
+  session = SessionMemory(session_id="repeat-2")
+
+  engine.process(session, "I am looking for a job", "/")
+  other = engine.process(session, "any open jobs for developers", "/")
+
+  assert session.state == "careers"
+  assert other.action == "show_message"
+
+
+# -----------------------------
+# Routing table vs the if / elif router it replaced
+# -----------------------------
+def _legacy_route(state, session, analysis):
+  """Reply name the if / elif router picked (markers as substring checks)."""
+  msg_type = analysis.get("message_type")
+  is_rejection = analysis.get("is_rejection")
+  clean = (analysis.get("clean") or "").lower()
+  topic_hint = analysis.get("topic_hint")
+
+  def has(group):
+    return any(m in clean for m in MARKER_GROUPS[group])
+
+  if state in ("contact_human", "handoff_ready"):
+    return state
+  if state == "careers":
+    if msg_type in ("confused", "meta", "insult") or is_rejection:
+      return "careers_options"
+    return "careers"
+  if state == "new_project":
+    if is_rejection:
+      return "project_rejection"
+    if has("company"):
+      return "project_company"
+    if has("cost"):
+      return "project_cost"
+    if has("suggest"):
+      return "project_suggest"
+    if has("tech"):
+      if has("comparison"):
+        return "project_tech_comparison"
+      if has("react") or has("nextjs"):
+        return "project_tech_react"
+      return "project_tech"
+    if msg_type == "trust" or has("trust_word"):
+      return "project_trust"
+    if msg_type in ("meta", "insult") and not has("cost"):
+      return "project_steer_back"
+    stage = getattr(session, "new_project_stage", "intro")
+    if stage == "intro":
+      session.new_project_stage = "idea"
+      return "project_intro"
+    if stage == "idea":
+      session.new_project_stage = "shaping"
+      return "project_idea"
+    if getattr(session, "last_action", None) == "show_message":
+      return "project_shaping_repeat"
+    return "project_shaping"
+  if state == "existing_system":
+    if is_rejection:
+      return "existing_rejection"
+    if not getattr(session, "goal", None):
+      return "existing_intro"
+    return "existing"
+  if state in ("pricing_engine", "data_platform"):
+    return state
+  if state == "unknown":
+    loops = getattr(session, "clarifier_loops", 0)
+    for hint in ("project_like", "existing_like", "careers_like"):
+      if topic_hint == hint and loops <= 2:
+        return f"unknown_{hint}"
+    if loops <= 1:
+      return "unknown_generic"
+    if loops == 2:
+      return "unknown_short"
+    return "unknown_escalate"
+  return "fallback"
+
+
+def _analyses():
+  messages = {turn.message for conv in synthetic_conversations(20) for turn in conv}
+  messages |= {phrase for phrases in MARKER_GROUPS.values() for phrase in phrases}
+  messages |= {"why not react instead of vue", "no, what does it cost in nextjs", "is this a scam?"}
+  for message in sorted(messages):
+    analysis = analyze_message(prepare_message(message))
+    yield analysis
+    # the session / analyzer predicates the rules read, forced
+    for msg_type, rejection in (("meta", False), ("insult", False), ("trust", False), ("normal", True)):
+      yield {**analysis, "message_type": msg_type, "is_rejection": rejection}
+
+
+def test_routing_table_equals_legacy_router():
+  # SimpleNamespace sessions have no recent_turns, so "repeat" (newer than the legacy router) never fires
+  sessions = list(itertools.product(
+    ("intro", "idea", "shaping"), (None, "show_message"), (None, "careers"), range(4),
+  ))
+  checked = 0
+  for analysis in _analyses():
+    for state in VALID_STATES + ("something_else",):
+      for stage, last_action, goal, loops in sessions:
+        fields = dict(new_project_stage=stage, last_action=last_action, goal=goal, clarifier_loops=loops)
+        legacy_session, session = SimpleNamespace(**fields), SimpleNamespace(**fields)
+
+        expected = REPLIES[_legacy_route(state, legacy_session, analysis)]
+        action = route_message(state, "unknown", 0.0, session, analysis)
+
+        assert (action.action, action.bot_reply, action.action_payload) == (
+          expected.action, expected.bot_reply, expected.action_payload,
+        ), (state, fields, analysis.get("clean"))
+        assert session == legacy_session
+        checked += 1
+  assert checked > 10000
@@ -0,0 +1,49 @@
+from app.chat_engine import ChatEngine, Message, SessionState, MAX_SESSION_MESSAGES
+from app.utils.session_lifecycle import SessionLifecycle, approx_sizeof, lifecycle_stats
+
+
+def _filled_session(session_id: str, messages: int, chars: int) -> SessionState:
+  session = SessionState(id=session_id)
+  session.messages = [Message(role="user", content=f"{i:06d}" + "x" * chars) for i in range(messages)]
+  return session
+
+
+def test_sizeof_counts_message_text():
+  session = _filled_session("s1", messages=100, chars=100 * 1024)
+  assert approx_sizeof(session) > 100 * 100 * 1024
+
+
+def test_byte_cap_evicts_filled_sessions():
+  sessions = SessionLifecycle("test-chat", max_bytes=1024 * 1024)
+  sessions.put("a", SessionState(id="a"))
+  sessions.put("b", SessionState(id="b"))
+
+  # grows in place between turns, as chat sessions do
+  sessions.get("a").messages.extend(_filled_session("a", messages=20, chars=100 * 1024).messages)
+  sessions.get("a")
+
+  assert sessions.stats()["evictions"]["memory"] == 1
+  assert "b" not in sessions
+  assert sessions.stats()["approx_bytes"] > 1024 * 1024
+
+
+def test_chat_session_transcript_is_bounded():
+  engine = ChatEngine()
+  session = engine.create_session()
+  for _ in range(MAX_SESSION_MESSAGES):
+    engine.handle_message(session.id, "y" * 100000)
+
+  session = engine.get_session(session.id)
+  assert len(session.messages) == MAX_SESSION_MESSAGES
+  assert max(len(message.content) for message in session.messages) < 100000
+
+
+def test_stats_keep_maps_with_the_same_name_apart():
+  first = SessionLifecycle("test-dup")
+  second = SessionLifecycle("test-dup")
+  first.put("k", "v")
+
+  stats = lifecycle_stats()
+  assert first.key != second.key
+  assert stats[first.key]["entries"] == 1
+  assert stats[second.key]["entries"] == 0
@@ -0,0 +1,110 @@
+import pytest
+
+from app.reasoning.corpus import synthetic_conversations
+from app.reasoning.engine import ReasoningEngine
+from app.reasoning.memory import SessionMemory
+from app.reasoning.session_store import (
+  CachedSessionStore, InMemorySessionStore, RedisSessionStore, SQLiteSessionStore,
+)
+
+
+class FakeRedis:
+  """The three redis-py calls RedisSessionStore makes, on a dict."""
+
+  def __init__(self):
+    self.data = {}
+
+  def get(self, key):
+    return self.data.get(key)
+
+  def set(self, key, value, ex=None):
+    self.data[key] = bytes(value)
+
+  def delete(self, key):
+    self.data.pop(key, None)
+
+
+STORES = {
+  "memory": lambda tmp_path: InMemorySessionStore(),
+  "sqlite": lambda tmp_path: SQLiteSessionStore(str(tmp_path / "sessions.db")),
+  "sqlite+cache": lambda tmp_path: CachedSessionStore(SQLiteSessionStore(str(tmp_path / "sessions.db"))),
+  "redis": lambda tmp_path: RedisSessionStore(FakeRedis()),
+  "redis+cache": lambda tmp_path: CachedSessionStore(RedisSessionStore(FakeRedis()), cache_ttl=0),
+}
+
+
+def _replay(load, save):
+  """Every corpus turn through load → process → save, sessions interleaved."""
+  engine = ReasoningEngine()
+  conversations = synthetic_conversations(40)
+  outcomes = []
+  for step in range(max(len(conv) for conv in conversations)):
+    for conv in conversations:
+      if step < len(conv):
+        turn = conv[step]
+        session = load(turn.session_id)
+        result = engine.process(session, turn.message, turn.page, option_id=turn.option_id)
+        save(session)
+        outcomes.append((turn.session_id, result.intent, result.action, result.bot_reply, session.state))
+  return outcomes
+
+
+@pytest.mark.parametrize("name", sorted(STORES))
+def test_store_replay_equals_live_sessions(name, tmp_path):
+  # reference: SessionMemory objects that never leave the process
+  live = {}
+  expected = _replay(lambda sid: live.setdefault(sid, SessionMemory(session_id=sid)), lambda session: None)
+
+  store = STORES[name](tmp_path)
+  assert _replay(store.get_or_create, store.put) == expected
+  for session_id, session in live.items():
+    stored = store.get(session_id)
+    assert stored.memory_snapshot() == session.memory_snapshot()
+    assert stored.recent_turns() == session.recent_turns()
+
+
+@pytest.mark.parametrize("name", sorted(STORES))
+def test_store_get_delete(name, tmp_path):
+  store = STORES[name](tmp_path)
+  assert store.get("missing") is None
+  assert store.get_or_create("missing").session_id == "missing"
+  assert store.get("missing") is None  # not stored until put()
+
+  session = SessionMemory(session_id="s1")
+  session.state = "careers"
+  store.put(session)
+  assert store.get("s1").state == "careers"
+
+  store.delete("s1")
+  assert store.get("s1") is None
+
+
+def test_sqlite_store_expires_sessions(tmp_path):
+  store = SQLiteSessionStore(str(tmp_path / "sessions.db"), ttl=-1)
+  store.put(SessionMemory(session_id="old"))
+  assert store.get("old") is None
+
+
+@pytest.mark.parametrize("name", ["sqlite", "sqlite+cache", "redis", "redis+cache"])
+@pytest.mark.parametrize("blob", [b"", b"garbage", b"\x02\x01", b"\x07" + bytes(64)], ids=["empty", "text", "short", "version"])
+def test_undecodable_session_starts_fresh(name, blob, tmp_path):
+  store = STORES[name](tmp_path)
+  session = SessionMemory(session_id="s1")
+  session.state = "careers"
+  store.put(session)
+  backend = getattr(store, "backend", store)
+  if isinstance(backend, SQLiteSessionStore):
+    backend._conn().execute("UPDATE reason_sessions SET data = ? WHERE session_id = 's1'", (blob,))
+  else:
+    backend.client.set(backend.prefix + "s1", blob)
+  if isinstance(store, CachedSessionStore):
+    store._cache.clear()
+
+  fresh = store.get_or_create("s1")
+  assert fresh.state == "unknown"
+  assert fresh.turn_count == 0
+  # the bad payload is gone, not decoded again on every turn
+  if isinstance(backend, SQLiteSessionStore):
+    assert backend._conn().execute("SELECT COUNT(*) FROM reason_sessions").fetchone() == (0,)
+  else:
+    assert backend.client.data == {}
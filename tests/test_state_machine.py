@@ -0,0 +1,80 @@
+import itertools
+
+from app.reasoning.memory import SessionMemory
+from app.reasoning.registry import INTENT_REGISTRY
+from app.reasoning.state_machine import MESSAGE_TYPES, VALID_STATES, StateMachine
+
+
+def _legacy_transition(current, intent, analysis, session):
+  """StateMachine.transition before the rule table (if / elif chain)."""
+  message_type = analysis.get("message_type")
+  if intent == "contact_human":
+    return "contact_human"
+  if session.frustration_level >= 4:
+    return "handoff_ready"
+  direct_map = {
+    "new_project": "new_project",
+    "existing_system": "existing_system",
+    "careers": "careers",
+    "pricing_engine": "pricing_engine",
+    "data_platform": "data_platform",
+  }
+  if intent in direct_map:
+    session.mode = direct_map[intent]
+    session.set_goal(intent)
+    session.reset_clarifier()
+    return direct_map[intent]
+  if intent == "unknown":
+    loops = session.increment_clarifier()
+    if session.mode:
+      return session.mode
+    if loops >= 2:
+      return "handoff_ready"
+    return "unknown"
+  if message_type in ["confused", "meta"]:
+    if session.mode:
+      return session.mode
+    return "unknown"
+  if message_type == "insult":
+    if session.mode:
+      return session.mode
+    return "unknown"
+  if session.mode:
+    return session.mode
+  return "unknown"
+
+
+def _session(mode, goal, frustration, loops):
+  session = SessionMemory(session_id="sm")
+  session.mode = mode
+  session.goal = goal
+  session.frustration_level = frustration
+  session.clarifier_loops = loops
+  return session
+
+
+def _fields(session):
+  return (session.mode, session.goal, session.clarifier_loops, session.frustration_level)
+
+
+def test_rule_table_equals_legacy_transitions():
+  sm = StateMachine()
+  states = VALID_STATES + ("raw_state",)
+  intents = tuple(INTENT_REGISTRY) + ("unknown", "contact_human", "raw_intent", None)
+  types = MESSAGE_TYPES + ("raw_type", None)
+  modes = (None, "new_project", "careers", "raw_mode")
+  goals = (None, "existing_system")
+
+  checked = 0
+  for current, intent, message_type, mode, goal, frustration, loops in itertools.product(
+    states, intents, types, modes, goals, range(6), range(4),
+  ):
+    analysis = {"message_type": message_type}
+    expected_session = _session(mode, goal, frustration, loops)
+    session = _session(mode, goal, frustration, loops)
+
+    expected = _legacy_transition(current, intent, analysis, expected_session)
+    assert sm.transition(current, intent, analysis, session) == expected, (current, intent, message_type, mode)
+    assert _fields(session) == _fields(expected_session)
+    checked += 1
+  assert checked > 50000
@@ -0,0 +1,25 @@
+from app.reasoning.engine import ReasoningEngine
+from app.reasoning.memory import SessionMemory
+
+
+def test_unscored_turns_do_not_escalate():
+  engine = ReasoningEngine()
+  session = SessionMemory(session_id="budget-1")
+  for message in ("hello there", "tell me more"):
+    # a budget that is spent before scoring starts
+    result = engine.process(session, message, "/", budget_ms=1e-9)
+    assert result.intent == "unknown"
+    assert "scoring" in result.meta["degraded"]
+
+  assert session.clarifier_loops == 0
+  assert session.state == "unknown"
+
+
+def test_scored_unknown_turns_still_escalate():
+  engine = ReasoningEngine()
+  session = SessionMemory(session_id="budget-2")
+  for message in ("hello there", "tell me more"):
+    engine.process(session, message, "/")
+
+  assert session.clarifier_loops == 2
+  assert session.state == "handoff_ready"